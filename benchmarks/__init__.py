@@ -0,0 +1,12 @@
+#!/usr/bin/python
+# coding=utf-8
+
+"""
+Benchmarks of Phobos, which are run as Blender scripts with Phobos installed as add-on, e.g.:
+
+    blender -b -P benchmarks/suite.py -- --links 10 100 1000 --output results.json
+
+suite.py times the export, import and inertia pipelines on the synthetic robots of synthetic.py and stores
+the results as JSON, so that they can be compared between releases with its --compare option. The other
+modules compare single optimizations with the implementations they replaced.
+"""
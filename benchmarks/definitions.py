@@ -0,0 +1,71 @@
+#!/usr/bin/python
+# coding=utf-8
+
+"""
+Copyright 2017, University of Bremen & DFKI GmbH Robotics Innovation Center
+
+This file is part of Phobos, a Blender Add-On to edit robot models.
+
+Phobos is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation, either version 3
+of the License, or (at your option) any later version.
+
+Phobos is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
+
+File definitions.py
+
+Measures the add-on startup time with and without the compiled definitions cache. Run with Phobos installed
+as add-on:
+
+    blender -b -P benchmarks/definitions.py -- [repetitions]
+
+Every measurement enables the add-on in a new background Blender process. The cache is removed before the
+uncached runs, so they parse all definition files as before the cache existed.
+"""
+
+import sys
+import shutil
+import subprocess
+import bpy
+from phobos.defs import getDefinitionsCachePath, loadDefinitions
+
+script = """
+import time
+import addon_utils
+start = time.perf_counter()
+addon_utils.enable('phobos', default_set=False)
+print('STARTUP', time.perf_counter() - start)
+"""
+
+
+def measureStartup():
+    """Enables the add-on in a new Blender process and returns the time it took."""
+    output = subprocess.run([bpy.app.binary_path, '-b', '--factory-startup', '--python-expr', script],
+                            stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return float([line for line in output.splitlines() if line.startswith('STARTUP')][-1].split()[1])
+
+
+def run(repetitions):
+    uncached = []
+    cached = []
+    for i in range(repetitions):
+        shutil.rmtree(getDefinitionsCachePath(), ignore_errors=True)
+        uncached.append(measureStartup())
+        cached.append(measureStartup())
+    print('{0:>10} {1:>12} {2:>12}'.format('variant', 'min. [s]', 'mean [s]'))
+    for name, times in (('uncached', uncached), ('cached', cached)):
+        print('{0:>10} {1:>12.4f} {2:>12.4f}'.format(name, min(times), sum(times) / len(times)))
+    # leave a valid cache behind
+    loadDefinitions()
+
+
+if __name__ == '__main__':
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    run(int(argv[0]) if argv else 5)
@@ -0,0 +1,106 @@
+#!/usr/bin/python
+# coding=utf-8
+
+"""
+Copyright 2017, University of Bremen & DFKI GmbH Robotics Innovation Center
+
+This file is part of Phobos, a Blender Add-On to edit robot models.
+
+Phobos is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation, either version 3
+of the License, or (at your option) any later version.
+
+Phobos is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
+
+File joints.py
+
+Compares the batched joint creation of phobos.model.joints.createJoints with the previous implementation, which
+selected every link, edited its bone in edit mode and added the constraints with operators in pose mode. Run with
+Phobos installed as add-on:
+
+    blender -b -P benchmarks/joints.py -- [number of joints] [repetitions]
+
+The links of a synthetic robot with revolute joints are created before each measurement. The joint axes cycle
+through x, y and z, so two thirds of the bones have to be turned.
+"""
+
+import os
+import sys
+import bpy
+import mathutils
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import synthetic
+from benchmarks.suite import clearScene, measure
+
+import phobos.defs as defs
+import phobos.model.links as linkmodel
+import phobos.model.joints as jointmodel
+import phobos.utils.blender as bUtils
+import phobos.utils.selection as sUtils
+
+
+def legacyCreateJoint(joint):
+    """The creation of a revolute joint before the batched joint creation."""
+    linkobj = bpy.data.objects[joint['child']]
+    if joint['name'] != linkobj.name:
+        linkobj['joint/name'] = joint['name']
+    bUtils.toggleLayer(defs.layerTypes['link'], True)
+    sUtils.selectObjects([linkobj], clear=True, active=0)
+    bpy.ops.object.mode_set(mode='EDIT')
+    editbone = linkobj.data.edit_bones[0]
+    editbone.tail = editbone.head + mathutils.Vector(tuple(joint['axis'])).normalized() * editbone.length
+    for param in ['effort', 'velocity']:
+        linkobj['joint/max' + param] = joint['limits'][param]
+    bpy.ops.object.mode_set(mode='POSE')
+    for c in linkobj.pose.bones[0].constraints:
+        linkobj.pose.bones[0].constraints.remove(c)
+    bpy.ops.pose.constraint_add(type='LIMIT_LOCATION')
+    cloc = jointmodel.getJointConstraint(linkobj, 'LIMIT_LOCATION')
+    cloc.use_min_x = cloc.use_min_y = cloc.use_min_z = True
+    cloc.use_max_x = cloc.use_max_y = cloc.use_max_z = True
+    cloc.owner_space = 'LOCAL'
+    bpy.ops.pose.constraint_add(type='LIMIT_ROTATION')
+    crot = jointmodel.getJointConstraint(linkobj, 'LIMIT_ROTATION')
+    crot.use_limit_x = crot.use_limit_y = crot.use_limit_z = True
+    crot.min_x = crot.max_x = crot.min_z = crot.max_z = 0
+    crot.min_y = joint['limits']['lower']
+    crot.max_y = joint['limits']['upper']
+    crot.owner_space = 'LOCAL'
+    linkobj['joint/type'] = joint['type']
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+
+def run(njoints, repeat):
+    model = synthetic.createRobotModel(njoints + 1, branching=2)
+    axes = [(1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0)]
+    joints = [model['joints'][name] for name in sorted(model['joints'], key=lambda name: int(name[4:]))]
+    for i, joint in enumerate(joints):
+        joint['axis'] = list(axes[i % 3])
+
+    def createLinks():
+        clearScene()
+        for link in model['links'].values():
+            linkmodel.createLink(link)
+        return ()
+
+    legacy = measure(lambda: [legacyCreateJoint(joint) for joint in joints], repeat, createLinks)[0]
+    single = measure(lambda: [jointmodel.createJoint(joint) for joint in joints], repeat, createLinks)[0]
+    batched = measure(lambda: jointmodel.createJoints(joints), repeat, createLinks)[0]
+    clearScene()
+    print('{0:>24} {1:>8} {2:>10}'.format('variant', 'joints', 'best [s]'))
+    for name, times in (('legacy createJoint', legacy), ('createJoint per joint', single),
+                        ('createJoints', batched)):
+        print('{0:>24} {1:>8} {2:>10.4f}'.format(name, njoints, min(times)))
+
+
+if __name__ == '__main__':
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    run(int(argv[0]) if argv else 200, int(argv[1]) if len(argv) > 1 else 3)
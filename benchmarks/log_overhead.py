@@ -0,0 +1,91 @@
+#!/usr/bin/python
+# coding=utf-8
+
+"""
+Copyright 2017, University of Bremen & DFKI GmbH Robotics Innovation Center
+
+This file is part of Phobos, a Blender Add-On to edit robot models.
+
+Phobos is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation, either version 3
+of the License, or (at your option) any later version.
+
+Phobos is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
+
+File log_overhead.py
+
+Measures the cost per call of phoboslog.log compared with the previous implementation, which looked up the
+preferences and opened the log file for every message. Run with Phobos installed as add-on:
+
+    blender -b -P benchmarks/log_overhead.py -- [number of calls]
+
+Suppressed messages are DEBUG messages at log level ERROR, emitted messages are written to a log file and to
+the terminal, which is redirected to os.devnull while measuring.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import contextlib
+from datetime import datetime
+import bpy
+from phobos import phoboslog
+from phobos.phoboslog import log, loglevels, decorate, col
+
+
+def legacyLog(message, level="INFO", origin=None, prefix=""):
+    """The terminal and file output of phoboslog.log before the buffered logger."""
+    originname = 'phoboslog' if origin is None else origin
+    prefs = bpy.context.user_preferences.addons["phobos"].preferences
+    if loglevels.index(level) <= loglevels.index(prefs.loglevel):
+        date = datetime.now().strftime("%Y%m%d_%H:%M")
+        msg = "[" + date + "] " + level + " " + message + " (" + originname + ")"
+        terminalmsg = prefix + "[" + date + "] " + decorate(level) + " " + message +\
+                      col.DIM + " (" + originname + ")" + col.ENDC
+        if prefs.logtofile:
+            with open(prefs.logfile, "a") as lf:
+                lf.write(date + "  " + msg + "\n")
+        if prefs.logtoterminal:
+            print(terminalmsg)
+
+
+def measure(function, calls, level):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for i in range(calls):
+            function('Message ' + str(i), level, 'benchmark')
+        phoboslog.closeLogFile()
+        return (time.perf_counter() - start) / calls
+
+
+def run(calls):
+    prefs = bpy.context.user_preferences.addons["phobos"].preferences
+    settings = (prefs.loglevel, prefs.logtofile, prefs.logtoterminal, prefs.logfile, prefs.logjson)
+    prefs.logfile = os.path.join(tempfile.mkdtemp(prefix='phobos_log_'), 'benchmark.log')
+    prefs.logtofile = True
+    prefs.logtoterminal = True
+    prefs.loglevel = 'ERROR'
+    print('{0:>12} {1:>12} {2:>14} {3:>14}'.format('variant', 'messages', 'legacy [us]', 'buffered [us]'))
+    try:
+        for name, level, json in (('suppressed', 'DEBUG', False), ('emitted', 'ERROR', False),
+                                  ('emitted', 'ERROR', True)):
+            prefs.logjson = json
+            legacy = measure(legacyLog, calls, level)
+            buffered = measure(log, calls, level)
+            print('{0:>12} {1:>12} {2:>14.2f} {3:>14.2f}'.format(name + (' json' if json else ''), calls,
+                                                                  legacy * 1e6, buffered * 1e6))
+    finally:
+        prefs.loglevel, prefs.logtofile, prefs.logtoterminal, prefs.logfile, prefs.logjson = settings
+
+
+if __name__ == '__main__':
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    run(int(argv[0]) if argv else 100000)
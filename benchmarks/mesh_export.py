@@ -0,0 +1,87 @@
+#!/usr/bin/python
+# coding=utf-8
+
+"""
+Copyright 2017, University of Bremen & DFKI GmbH Robotics Innovation Center
+
+This file is part of Phobos, a Blender Add-On to edit robot models.
+
+Phobos is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation, either version 3
+of the License, or (at your option) any later version.
+
+Phobos is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
+
+File mesh_export.py
+
+Compares the throughput of the direct stl and obj writers with Blender's export operators.
+Run with Phobos installed as add-on:
+
+    blender -b -P benchmarks/mesh_export.py -- [number of meshes] [subdivisions]
+
+Exports the given number of icospheres (default: 100 with 4 subdivisions, i.e. 5120 triangles each) in
+both formats with both variants and reports time, triangles per second and written megabytes per second,
+as well as the number of mesh datablocks left behind in the file.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import bpy
+from phobos.io.meshes import meshes
+
+
+def createTestObjects(nmeshes, subdivisions):
+    """Creates icospheres with a subdivision modifier on every second one."""
+    objects = []
+    for i in range(nmeshes):
+        bpy.ops.mesh.primitive_ico_sphere_add(subdivisions=subdivisions, size=0.5, location=(i, 0, 0))
+        obj = bpy.context.object
+        obj.name = obj.data.name = 'mesh' + str(i)
+        if i % 2:
+            obj.modifiers.new('subdivision', 'SUBSURF').levels = 1
+        objects.append(obj)
+    return objects
+
+
+def exportOperator(objects, path, meshtype):
+    for obj in objects:
+        meshes.exportMesh(obj, path, meshtype)
+
+
+def exportDirect(objects, path, meshtype):
+    export = meshes.exportStl if meshtype == 'stl' else meshes.exportObj
+    for obj in objects:
+        export(obj, path)
+
+
+def run(nmeshes, subdivisions):
+    objects = createTestObjects(nmeshes, subdivisions)
+    triangles = sum(len(meshes.getMeshBuffers(obj)['triangles']) for obj in objects)
+    print('{0} meshes, {1} triangles'.format(nmeshes, triangles))
+    print('{0:>6} {1:>10} {2:>10} {3:>14} {4:>8} {5:>14}'.format('format', 'variant', 'time [s]', 'triangles/s',
+                                                                 'MB/s', 'left meshes'))
+    for meshtype in ('stl', 'obj'):
+        for name, function in (('operator', exportOperator), ('direct', exportDirect)):
+            path = tempfile.mkdtemp(prefix='phobos_meshes_')
+            nblocks = len(bpy.data.meshes)
+            start = time.perf_counter()
+            function(objects, path, meshtype)
+            duration = time.perf_counter() - start
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            print('{0:>6} {1:>10} {2:>10.3f} {3:>14.0f} {4:>8.1f} {5:>14}'.format(
+                meshtype, name, duration, triangles / duration, size / duration / 2**20,
+                len(bpy.data.meshes) - nblocks))
+
+
+if __name__ == '__main__':
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    run(int(argv[0]) if len(argv) > 0 else 100, int(argv[1]) if len(argv) > 1 else 4)
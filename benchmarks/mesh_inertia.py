@@ -0,0 +1,117 @@
+#!/usr/bin/python
+# coding=utf-8
+
+"""
+Copyright 2017, University of Bremen & DFKI GmbH Robotics Innovation Center
+
+This file is part of Phobos, a Blender Add-On to edit robot models.
+
+Phobos is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation, either version 3
+of the License, or (at your option) any later version.
+
+Phobos is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
+
+File mesh_inertia.py
+
+Compares the numpy mesh inertia calculation with the previous per-triangle implementation.
+Run with Phobos installed as add-on:
+
+    blender -b -P benchmarks/mesh_inertia.py -- [subdivisions ...]
+
+Each subdivision level of the test icosphere quadruples the number of triangles (level 7: 327680).
+"""
+
+import sys
+import time
+import bpy
+import mathutils
+from phobos.model.inertia import calculateMeshInertia
+
+
+def legacyMeshInertia(data, mass):
+    """The per-triangle mesh inertia calculation Phobos used before the numpy implementation.
+    The mesh is expected to be triangulated already.
+
+    """
+    tetrahedra = []
+    mesh_volume = 0
+    origin = mathutils.Vector((0.0, 0.0, 0.0))
+    vertices = data.vertices
+    for triangle in data.polygons:
+        verts = [vertices[index].co for index in triangle.vertices]
+        ref_tri_vector = triangle.center - origin
+        normal_angle = ref_tri_vector.angle(triangle.normal, 90)
+        if normal_angle > 90:
+            sign = -1
+        elif normal_angle == 90:
+            sign = 0
+        else:
+            sign = 1
+        J = mathutils.Matrix(((verts[0][0], verts[0][1], verts[0][2], 1),
+                              (verts[1][0], verts[1][1], verts[1][2], 1),
+                              (verts[2][0], verts[2][1], verts[2][2], 1),
+                              (origin[0], origin[1], origin[2], 1)))
+        abs_det_J = J.determinant()
+        tetrahedra.append({'sign': sign, 'abs(det(J))': abs_det_J, 'J': J})
+        mesh_volume += sign * abs_det_J / 6
+
+    d = mass / mesh_volume
+    i = [0.0] * 6
+    for tetrahedron in tetrahedra:
+        J = tetrahedron['J']
+        (x1, y1, z1), (x2, y2, z2), (x3, y3, z3), (x4, y4, z4) = [J[k][:3] for k in range(4)]
+        f = tetrahedron['sign'] * d * tetrahedron['abs(det(J))']
+        a = f * (y1**2 + y1*y2 + y2**2 + y1*y3 + y2*y3 + y3**2 + y1*y4 + y2*y4 + y3*y4 + y4**2
+                 + z1**2 + z1*z2 + z2**2 + z1*z3 + z2*z3 + z3**2 + z1*z4 + z2*z4 + z3*z4 + z4**2) / 60
+        b = f * (x1**2 + x1*x2 + x2**2 + x1*x3 + x2*x3 + x3**2 + x1*x4 + x2*x4 + x3*x4 + x4**2
+                 + z1**2 + z1*z2 + z2**2 + z1*z3 + z2*z3 + z3**2 + z1*z4 + z2*z4 + z3*z4 + z4**2) / 60
+        c = f * (x1**2 + x1*x2 + x2**2 + x1*x3 + x2*x3 + x3**2 + x1*x4 + x2*x4 + x3*x4 + x4**2
+                 + y1**2 + y1*y2 + y2**2 + y1*y3 + y2*y3 + y3**2 + y1*y4 + y2*y4 + y3*y4 + y4**2) / 60
+        a_bar = f * (2*y1*z1 + y2*z1 + y3*z1 + y4*z1 + y1*z2 + 2*y2*z2 + y3*z2 + y4*z2
+                     + y1*z3 + y2*z3 + 2*y3*z3 + y4*z3 + y1*z4 + y2*z4 + y3*z4 + 2*y4*z4) / 120
+        b_bar = f * (2*x1*z1 + x2*z1 + x3*z1 + x4*z1 + x1*z2 + 2*x2*z2 + x3*z2 + x4*z2
+                     + x1*z3 + x2*z3 + 2*x3*z3 + x4*z3 + x1*z4 + x2*z4 + x3*z4 + 2*x4*z4) / 120
+        c_bar = f * (2*x1*y1 + x2*y1 + x3*y1 + x4*y1 + x1*y2 + 2*x2*y2 + x3*y2 + x4*y2
+                     + x1*y3 + x2*y3 + 2*x3*y3 + x4*y3 + x1*y4 + x2*y4 + x3*y4 + 2*x4*y4) / 120
+        for k, value in enumerate((a, -b_bar, -c_bar, b, -a_bar, c)):
+            i[k] += value
+    return tuple(i)
+
+
+def createTestMesh(subdivisions):
+    """Creates an off-center icosphere and returns its mesh."""
+    bpy.ops.mesh.primitive_ico_sphere_add(subdivisions=subdivisions, size=0.5, location=(0.1, -0.2, 0.3))
+    obj = bpy.context.object
+    bpy.ops.object.transform_apply(location=True, rotation=True, scale=True)
+    return obj.data
+
+
+def timeit(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run(levels):
+    print('{0:>12} {1:>12} {2:>12} {3:>9} {4:>12}'.format('triangles', 'legacy [s]', 'numpy [s]', 'speedup',
+                                                         'max. error'))
+    for level in levels:
+        data = createTestMesh(level)
+        new, tnew = timeit(calculateMeshInertia, data, 1.0)
+        old, told = timeit(legacyMeshInertia, data, 1.0)
+        error = max(abs(n - o) for n, o in zip(new, old))
+        print('{0:>12} {1:>12.4f} {2:>12.4f} {3:>9.1f} {4:>12.3e}'.format(len(data.polygons), told, tnew,
+                                                                          told / tnew, error))
+
+
+if __name__ == '__main__':
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    run([int(a) for a in argv] if argv else [3, 5, 7])
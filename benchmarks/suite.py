@@ -0,0 +1,261 @@
+#!/usr/bin/python
+# coding=utf-8
+
+"""
+Copyright 2017, University of Bremen & DFKI GmbH Robotics Innovation Center
+
+This file is part of Phobos, a Blender Add-On to edit robot models.
+
+Phobos is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation, either version 3
+of the License, or (at your option) any later version.
+
+Phobos is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
+
+File suite.py
+
+Times the export, import and inertia pipelines of Phobos on synthetic robots of growing size.
+Run with Phobos installed as add-on:
+
+    blender -b -P benchmarks/suite.py -- [options]
+
+Options:
+
+    --links N [N ...]          numbers of links of the benchmarked robots (default: 10 100 1000)
+    --branching N              maximum number of children per link (default: 2)
+    --visuals N                visuals and collisions per link (default: 2)
+    --triangles N              minimum triangles of the visual meshes, 0 for box visuals (default: 1280)
+    --meshes N                 number of different mesh files (default: 10)
+    --sensors N                number of sensors (default: 10)
+    --motors N                 number of motors (default: 10)
+    --inertia-triangles N ...  triangle counts of the mesh inertia benchmark (default: 1280 20480 327680)
+    --repeat N                 repetitions of every measurement, the fastest one is reported (default: 3)
+    --output FILE              JSON file to write the results to (default: phobos_benchmarks_<date>.json)
+    --compare FILE             JSON results of an earlier run to compare with
+
+For every robot size, the synthetic model is exported as URDF, SMURF and SRDF, the URDF is imported and
+built in the scene and the model dictionary is derived from that scene again. Everything runs on the CPU
+in a background Blender process, the scene is emptied between measurements.
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+
+import bpy
+
+# allow to run this file as Blender script as well as to import it as part of the benchmarks package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import synthetic
+
+import phobos.defs as defs
+import phobos.model.models as models
+import phobos.utils.io as ioUtils
+import phobos.utils.selection as sUtils
+from phobos.io.entities import urdf, smurf, srdf
+from phobos.model.inertia import calculateMeshInertia
+
+
+def parseArguments(argv):
+    """Parses the command line arguments given to the script after '--'.
+
+    :param argv: The complete argument list of the Blender process.
+    :type argv: list
+    :return: argparse.Namespace
+    """
+    argv = argv[argv.index('--') + 1:] if '--' in argv else []
+    parser = argparse.ArgumentParser(prog='blender -b -P benchmarks/suite.py --',
+                                     description='Benchmark Phobos on synthetic robots.')
+    parser.add_argument('--links', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--branching', type=int, default=2)
+    parser.add_argument('--visuals', type=int, default=2)
+    parser.add_argument('--triangles', type=int, default=1280)
+    parser.add_argument('--meshes', type=int, default=10)
+    parser.add_argument('--sensors', type=int, default=10)
+    parser.add_argument('--motors', type=int, default=10)
+    parser.add_argument('--inertia-triangles', type=int, nargs='+', default=[1280, 20480, 327680])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='phobos_benchmarks_' + datetime.now().strftime('%Y%m%d_%H%M%S')
+                        + '.json')
+    parser.add_argument('--compare', default=None)
+    return parser.parse_args(argv)
+
+
+def clearScene():
+    """Removes all objects and the meshes and materials they used from the scene.
+
+    """
+    if bpy.context.object is not None and bpy.context.object.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+    for collection in (bpy.data.meshes, bpy.data.armatures, bpy.data.materials):
+        for datablock in list(collection):
+            if datablock.users == 0:
+                collection.remove(datablock)
+
+
+def measure(function, repeat, setup=None):
+    """Calls function repeat times and returns the durations of the calls and the result of the last call.
+
+    :param function: The function to time.
+    :type function: function
+    :param repeat: The number of calls.
+    :type repeat: int
+    :param setup: A function returning the arguments of each call, which is not timed.
+    :type setup: function
+    :return: tuple -- list of durations in seconds and the last result.
+    """
+    times = []
+    result = None
+    for i in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        result = function(*args)
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def runModelBenchmarks(args, nlinks, outpath):
+    """Runs the benchmarks of the model pipelines for a synthetic robot with nlinks links.
+
+    :param args: The parsed command line arguments.
+    :type args: argparse.Namespace
+    :param nlinks: The number of links.
+    :type nlinks: int
+    :param outpath: The directory to export the robot to.
+    :type outpath: str
+    :return: list -- of result dictionaries.
+    """
+    model = synthetic.createRobotModel(nlinks, args.branching, args.visuals, args.triangles, args.meshes,
+                                       args.sensors, args.motors, name='synthetic' + str(nlinks))
+    modelpath = os.path.join(outpath, model['name'])
+    urdfpath = ioUtils.securepath(os.path.join(modelpath, 'urdf'))
+    smurfpath = ioUtils.securepath(os.path.join(modelpath, 'smurf'))
+    synthetic.writeMeshFiles(model, ioUtils.securepath(ioUtils.getOutputMeshpath(modelpath, 'stl')),
+                             args.triangles)
+    size = {'links': nlinks, 'joints': len(model['joints']), 'visuals': nlinks * args.visuals,
+            'triangles': args.triangles}
+    results = []
+
+    def record(name, times):
+        results.append(dict(size, benchmark=name, times=times, best=min(times)))
+        print('{0:>26} {1:>8} {2:>10.4f}'.format(name, nlinks, min(times)))
+
+    # the exporters may change the dictionary (e.g. annotations are removed), so each call gets a fresh copy
+    fresh = lambda: (copy.deepcopy(model),)
+    record('exportUrdf', measure(lambda m: urdf.exportUrdf(m, urdfpath), args.repeat, fresh)[0])
+    record('exportSmurf', measure(lambda m: smurf.exportSmurf(m, smurfpath), args.repeat, fresh)[0])
+    record('exportSRDF', measure(lambda m: srdf.exportSRDF(m, smurfpath), args.repeat, fresh)[0])
+
+    times, imported = measure(urdf.importUrdf, args.repeat,
+                              lambda: (os.path.join(urdfpath, model['name'] + '.urdf'),))
+    record('importUrdf', times)
+
+    def emptyScene():
+        clearScene()
+        return (copy.deepcopy(imported),)
+    record('buildModelFromDictionary', measure(models.buildModelFromDictionary, args.repeat, emptyScene)[0])
+    root = sUtils.getRoots()[0]
+    record('buildModelDictionary', measure(models.buildModelDictionary, args.repeat, lambda: (root,))[0])
+    clearScene()
+    return results
+
+
+def runInertiaBenchmarks(args):
+    """Times the mesh inertia calculation for icospheres with the given triangle counts.
+
+    :param args: The parsed command line arguments.
+    :type args: argparse.Namespace
+    :return: list -- of result dictionaries.
+    """
+    results = []
+    for ntriangles in args.inertia_triangles:
+        vertices, faces = synthetic.createIcosphere(synthetic.getSubdivisions(ntriangles))
+        mesh = bpy.data.meshes.new('inertia_benchmark')
+        mesh.from_pydata(vertices.tolist(), [], faces.tolist())
+        mesh.update()
+        times = measure(calculateMeshInertia, args.repeat, lambda: (mesh, 1.0))[0]
+        bpy.data.meshes.remove(mesh)
+        results.append({'benchmark': 'calculateMeshInertia', 'triangles': len(faces), 'times': times,
+                        'best': min(times)})
+        print('{0:>26} {1:>8} {2:>10.4f}'.format('calculateMeshInertia', len(faces), min(times)))
+    return results
+
+
+def getResultKey(result):
+    return (result['benchmark'], result.get('links'), result.get('triangles'))
+
+
+def compareResults(results, previouspath):
+    """Prints the ratio of each result to the matching result of an earlier run.
+
+    :param results: The results of this run.
+    :type results: list
+    :param previouspath: The path of the JSON file of the earlier run.
+    :type previouspath: str
+    """
+    with open(previouspath, 'r') as previousfile:
+        previous = json.load(previousfile)
+    earlier = {getResultKey(result): result['best'] for result in previous['results']}
+    print('compared with Phobos ' + previous['phobos'] + ' (' + previous['date'] + '):')
+    print('{0:>26} {1:>8} {2:>10} {3:>10} {4:>8}'.format('benchmark', 'size', 'before', 'now', 'ratio'))
+    for result in results:
+        key = getResultKey(result)
+        if key in earlier:
+            print('{0:>26} {1:>8} {2:>10.4f} {3:>10.4f} {4:>8.2f}'.format(
+                result['benchmark'], result.get('links') or result['triangles'], earlier[key], result['best'],
+                result['best'] / earlier[key]))
+
+
+def run(args):
+    """Runs all benchmarks, writes their results and compares them with an earlier run if requested.
+
+    :param args: The parsed command line arguments.
+    :type args: argparse.Namespace
+    :return: dict -- the results.
+    """
+    expsettings = ioUtils.getExpSettings()
+    settings = (expsettings.selectedOnly, expsettings.structureExport, expsettings.outputMeshtype)
+    expsettings.selectedOnly, expsettings.structureExport, expsettings.outputMeshtype = False, True, 'stl'
+    outpath = tempfile.mkdtemp(prefix='phobos_benchmarks_')
+    results = []
+    print('{0:>26} {1:>8} {2:>10}'.format('benchmark', 'size', 'best [s]'))
+    try:
+        clearScene()
+        for nlinks in args.links:
+            results += runModelBenchmarks(args, nlinks, outpath)
+        results += runInertiaBenchmarks(args)
+    finally:
+        expsettings.selectedOnly, expsettings.structureExport, expsettings.outputMeshtype = settings
+    report = {'phobos': defs.version,
+              'blender': bpy.app.version_string,
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'cpus': os.cpu_count(),
+              'date': datetime.now().strftime('%Y%m%d_%H:%M'),
+              'parameters': vars(args),
+              'results': results}
+    with open(args.output, 'w') as outputfile:
+        json.dump(report, outputfile, indent=2)
+    print('results written to ' + os.path.abspath(args.output))
+    if args.compare:
+        compareResults(results, args.compare)
+    return report
+
+
+if __name__ == '__main__':
+    run(parseArguments(sys.argv))
@@ -0,0 +1,196 @@
+#!/usr/bin/python
+# coding=utf-8
+
+"""
+Copyright 2017, University of Bremen & DFKI GmbH Robotics Innovation Center
+
+This file is part of Phobos, a Blender Add-On to edit robot models.
+
+Phobos is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation, either version 3
+of the License, or (at your option) any later version.
+
+Phobos is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
+
+File synthetic.py
+
+Generates synthetic robot models of a given size as Phobos model dictionaries, together with the mesh files
+their visuals refer to. The links form a tree in which every link has up to branching children, so the same
+number of links yields a long chain (branching 1) or a wide, shallow robot. The generated models are
+deterministic, so the results of different runs and releases can be compared.
+
+This module does not need Blender, the models can be exported with the entity exporters of Phobos.
+"""
+
+import os
+import numpy as np
+
+# binary STL triangle record, see phobos.io.meshes.meshes
+stlTriangle = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attributes', '<u2')])
+
+
+def createIcosphere(subdivisions, radius=0.05):
+    """Creates an icosphere with 20 * 4**subdivisions triangles.
+
+    :param subdivisions: The number of times each triangle is split into four.
+    :type subdivisions: int
+    :param radius: The radius of the sphere.
+    :type radius: float
+    :return: tuple -- the vertices as (n, 3) and the triangles as (m, 3) array.
+    """
+    t = (1.0 + 5 ** 0.5) / 2
+    vertices = [(-1, t, 0), (1, t, 0), (-1, -t, 0), (1, -t, 0), (0, -1, t), (0, 1, t), (0, -1, -t), (0, 1, -t),
+                (t, 0, -1), (t, 0, 1), (-t, 0, -1), (-t, 0, 1)]
+    faces = [(0, 11, 5), (0, 5, 1), (0, 1, 7), (0, 7, 10), (0, 10, 11), (1, 5, 9), (5, 11, 4), (11, 10, 2),
+             (10, 7, 6), (7, 1, 8), (3, 9, 4), (3, 4, 2), (3, 2, 6), (3, 6, 8), (3, 8, 9), (4, 9, 5), (2, 4, 11),
+             (6, 2, 10), (8, 6, 7), (9, 8, 1)]
+    for i in range(subdivisions):
+        midpoints = {}
+        newfaces = []
+        for face in faces:
+            middle = []
+            for a, b in ((face[0], face[1]), (face[1], face[2]), (face[2], face[0])):
+                key = (min(a, b), max(a, b))
+                if key not in midpoints:
+                    midpoints[key] = len(vertices)
+                    vertices.append(tuple((p + q) / 2 for p, q in zip(vertices[a], vertices[b])))
+                middle.append(midpoints[key])
+            newfaces += [(face[0], middle[0], middle[2]), (face[1], middle[1], middle[0]),
+                         (face[2], middle[2], middle[1]), (middle[0], middle[1], middle[2])]
+        faces = newfaces
+    vertices = np.array(vertices, dtype=np.float64)
+    vertices *= radius / np.linalg.norm(vertices, axis=1)[:, np.newaxis]
+    return vertices, np.array(faces, dtype=np.int64)
+
+
+def getSubdivisions(ntriangles):
+    """Returns the number of subdivisions of the smallest icosphere with at least ntriangles triangles.
+
+    """
+    subdivisions = 0
+    while 20 * 4 ** subdivisions < ntriangles:
+        subdivisions += 1
+    return subdivisions
+
+
+def writeStl(vertices, faces, filepath):
+    """Writes a triangle mesh as binary STL file.
+
+    """
+    triangles = np.zeros(len(faces), dtype=stlTriangle)
+    corners = vertices[faces]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    normals /= np.linalg.norm(normals, axis=1)[:, np.newaxis]
+    triangles['normal'] = normals
+    triangles['vertices'] = corners
+    with open(filepath, 'wb') as stlfile:
+        stlfile.write(b'synthetic phobos benchmark mesh'.ljust(80, b' '))
+        stlfile.write(np.array([len(faces)], dtype='<u4').tobytes())
+        triangles.tofile(stlfile)
+
+
+def createRobotModel(nlinks, branching=1, nvisuals=1, ntriangles=0, nmeshes=10, nsensors=0, nmotors=0,
+                     name='synthetic'):
+    """Creates the dictionary of a synthetic robot model.
+
+    Link i is the child of link (i - 1) // branching and carries nvisuals visuals and as many box collisions.
+    The visuals are boxes if ntriangles is 0, otherwise they refer to nmeshes shared icosphere meshes with at
+    least ntriangles triangles each. Sensors are attached to the first links and motors to the first joints.
+
+    :param nlinks: The number of links.
+    :type nlinks: int
+    :param branching: The maximum number of children of each link.
+    :type branching: int
+    :param nvisuals: The number of visuals and collisions per link.
+    :type nvisuals: int
+    :param ntriangles: The minimum number of triangles of each visual mesh, 0 for box visuals.
+    :type ntriangles: int
+    :param nmeshes: The number of different mesh files the visuals refer to.
+    :type nmeshes: int
+    :param nsensors: The number of sensors.
+    :type nsensors: int
+    :param nmotors: The number of motors.
+    :type nmotors: int
+    :param name: The name of the model.
+    :type name: str
+    :return: dict -- the model dictionary, with the names of its mesh files (without extension) in 'meshes'.
+    """
+    model = {'name': name, 'date': '20170101_00:00', 'links': {}, 'joints': {}, 'sensors': {}, 'motors': {},
+             'controllers': {}, 'materials': {}, 'meshes': {}, 'lights': {}, 'groups': {}, 'chains': {}}
+    for i in range(2):
+        model['materials']['material' + str(i)] = {
+            'name': 'material' + str(i), 'users': 0, 'shininess': 50, 'transparency': 0.0,
+            'diffuseColor': {'r': 0.2 + 0.6 * i, 'g': 0.5, 'b': 0.5, 'a': 1.0},
+            'specularColor': {'r': 1.0, 'g': 1.0, 'b': 1.0, 'a': 1.0}}
+    if ntriangles:
+        model['meshes'] = {'mesh' + str(i): None for i in range(nmeshes)}
+    depths = []
+    for i in range(nlinks):
+        linkname = 'link' + str(i)
+        parent = (i - 1) // branching if i > 0 else None
+        depths.append(depths[parent] + 1 if parent is not None else 0)
+        pose = {'translation': [0.0, 0.05 * (i % branching), 0.2], 'rotation_euler': [0.0, 0.0, 0.1 * (i % 7)]}
+        link = {'name': linkname, 'pose': pose, 'visual': {}, 'collision': {}, 'approxcollision': [],
+                'inertial': {'mass': 1.0, 'inertia': [0.01, 0.0, 0.0, 0.01, 0.0, 0.01],
+                             'pose': {'translation': [0.0, 0.0, 0.05], 'rotation_euler': [0.0, 0.0, 0.0]}},
+                # neighbouring links share no bit, so that they do not collide
+                'collision_bitmask': 1 << (depths[i] % 2)}
+        for j in range(nvisuals):
+            elementpose = {'translation': [0.0, 0.02 * j, 0.05], 'rotation_euler': [0.0, 0.0, 0.0]}
+            visualname = 'visual' + str(j) + '_' + linkname
+            material = 'material' + str((i + j) % 2)
+            if ntriangles:
+                geometry = {'type': 'mesh', 'filename': 'mesh' + str((i * nvisuals + j) % nmeshes),
+                            'scale': [1.0, 1.0, 1.0]}
+            else:
+                geometry = {'type': 'box', 'size': [0.1, 0.1, 0.1]}
+            link['visual'][visualname] = {'name': visualname, 'pose': elementpose, 'geometry': geometry,
+                                          'material': material}
+            model['materials'][material]['users'] += 1
+            collisionname = 'collision' + str(j) + '_' + linkname
+            link['collision'][collisionname] = {'name': collisionname, 'pose': elementpose,
+                                                'geometry': {'type': 'box', 'size': [0.1, 0.1, 0.1]},
+                                                'bitmask': link['collision_bitmask']}
+        model['links'][linkname] = link
+        if parent is not None:
+            link['parent'] = 'link' + str(parent)
+            model['joints'][linkname] = {'name': linkname, 'type': 'revolute', 'parent': link['parent'],
+                                         'child': linkname, 'axis': [0.0, 0.0, 1.0],
+                                         'limits': {'lower': -1.57, 'upper': 1.57, 'effort': 10.0, 'velocity': 2.0}}
+    jointnames = sorted(model['joints'], key=lambda joint: int(joint[4:]))
+    for i in range(min(nmotors, len(jointnames))):
+        motorname = 'motor' + str(i)
+        model['motors'][motorname] = {'name': motorname, 'joint': jointnames[i], 'type': 'PID', 'p': 20.0,
+                                      'i': 0.0, 'd': 0.1, 'maxEffort': 10.0, 'maxSpeed': 2.0}
+    for i in range(nsensors):
+        sensorname = 'sensor' + str(i)
+        model['sensors'][sensorname] = {'name': sensorname, 'type': 'NodePosition', 'link': 'link' + str(i % nlinks),
+                                        'rate': 100}
+    return model
+
+
+def writeMeshFiles(model, meshpath, ntriangles):
+    """Writes the mesh files of a synthetic model as binary STL to meshpath.
+
+    :param model: The model dictionary as returned by createRobotModel.
+    :type model: dict
+    :param meshpath: The directory to write the meshes to.
+    :type meshpath: str
+    :param ntriangles: The minimum number of triangles of each mesh.
+    :type ntriangles: int
+    :return: int -- the number of triangles of each mesh.
+    """
+    if not model['meshes']:
+        return 0
+    os.makedirs(meshpath, exist_ok=True)
+    vertices, faces = createIcosphere(getSubdivisions(ntriangles))
+    for meshname in model['meshes']:
+        writeStl(vertices, faces, os.path.join(meshpath, meshname + '.stl'))
+    return len(faces)
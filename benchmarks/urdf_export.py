@@ -0,0 +1,102 @@
+#!/usr/bin/python
+# coding=utf-8
+
+"""
+Copyright 2017, University of Bremen & DFKI GmbH Robotics Innovation Center
+
+This file is part of Phobos, a Blender Add-On to edit robot models.
+
+Phobos is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation, either version 3
+of the License, or (at your option) any later version.
+
+Phobos is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
+
+File urdf_export.py
+
+Compares the streaming URDF export with building the whole document in memory and joining it,
+as Phobos did before. Run with Phobos installed as add-on:
+
+    blender -b -P benchmarks/urdf_export.py -- [number of links] [visuals per link]
+
+Reports time, peak Python memory (tracemalloc) and the growth of the process' peak RSS for both
+variants and checks that both files are byte-identical.
+"""
+
+import os
+import sys
+import time
+import resource
+import tempfile
+import tracemalloc
+from phobos.io.entities import urdf
+
+
+def createModel(nlinks, nvisuals):
+    """Creates a chain model dictionary with box visuals and collisions."""
+    pose = {'translation': [0.1, 0.2, 0.3], 'rotation_euler': [0.0, 0.5, 1.0]}
+    model = {'name': 'benchmark', 'links': {}, 'joints': {}, 'materials': {
+        'mat': {'name': 'mat', 'users': nlinks * nvisuals, 'diffuseColor': {'r': 0.5, 'g': 0.5, 'b': 0.5}}}}
+    for i in range(nlinks):
+        name = 'link' + str(i)
+        link = {'name': name, 'pose': pose, 'visual': {}, 'collision': {},
+                'inertial': {'mass': 1.0, 'inertia': [0.1, 0.0, 0.0, 0.1, 0.0, 0.1], 'pose': pose}}
+        for j in range(nvisuals):
+            for kind in ('visual', 'collision'):
+                element = {'name': kind + str(j) + '_' + name, 'pose': pose,
+                           'geometry': {'type': 'box', 'size': [0.1, 0.2, 0.3]}}
+                if kind == 'visual':
+                    element['material'] = 'mat'
+                link[kind][element['name']] = element
+        model['links'][name] = link
+        if i > 0:
+            model['joints'][name] = {'name': name, 'type': 'revolute', 'parent': 'link' + str(i - 1), 'child': name,
+                                     'axis': [0.0, 0.0, 1.0],
+                                     'limits': {'lower': -1.0, 'upper': 1.0, 'effort': 10.0, 'velocity': 1.0}}
+    return model
+
+
+def exportJoined(model, outpath):
+    """Exports the URDF by collecting all lines in a list and joining them."""
+    output = []
+    urdf.writeUrdf(output, model, outpath)
+    with open(os.path.join(outpath, model['name'] + '_joined.urdf'), 'w') as outputfile:
+        outputfile.write(''.join(output))
+
+
+def measure(function, *args):
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    start = time.perf_counter()
+    function(*args)
+    duration = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duration, peak, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss
+
+
+def run(nlinks, nvisuals):
+    model = createModel(nlinks, nvisuals)
+    outpath = tempfile.mkdtemp(prefix='phobos_urdf_')
+    # the streaming export runs first, so that its RSS is not hidden by the peak of the joined export
+    results = [('streamed', measure(urdf.exportUrdf, model, outpath)),
+               ('joined', measure(exportJoined, model, outpath))]
+    print('{0} links, {1} visuals and collisions per link'.format(nlinks, nvisuals))
+    print('{0:>10} {1:>10} {2:>18} {3:>18}'.format('variant', 'time [s]', 'peak traced [MB]', 'RSS growth [MB]'))
+    for name, (duration, peak, rss) in results:
+        print('{0:>10} {1:>10.3f} {2:>18.1f} {3:>18.1f}'.format(name, duration, peak / 2**20, rss / 2**10))
+    with open(os.path.join(outpath, 'benchmark.urdf'), 'rb') as streamed, \
+            open(os.path.join(outpath, 'benchmark_joined.urdf'), 'rb') as joined:
+        print('identical output:', streamed.read() == joined.read())
+
+
+if __name__ == '__main__':
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    run(int(argv[0]) if len(argv) > 0 else 2000, int(argv[1]) if len(argv) > 1 else 5)
@@ -41,6 +41,7 @@ import phobos
 def import_submodules(package, recursive=True, verbose=False):
     """ Import all submodules of a module, recursively, including subpackages.
         If a module is already imported it is reloaded instead.
+        Submodules of packages with a true *lazyimport* attribute are only reloaded, not imported.
         Recursion can be turned off.
         The imported modules are returned as dictionary.
 
@@ -63,6 +64,10 @@ def import_submodules(package, recursive=True, verbose=False):
     for loader, name, is_pkg in pkgutil.walk_packages(package.__path__):
         full_name = package.__name__ + '.' + name
 
+        # the modules of plugin packages are imported on demand (see phobos.io.plugins)
+        if getattr(package, 'lazyimport', False) and full_name not in modules.keys():
+            continue
+
         # reload already imported modules
         if full_name in modules.keys():
             if verbose:
@@ -133,6 +138,11 @@ yaml.SafeLoader.add_constructor(u'tag:yaml.org,2002:bool', bool_constructor)
 print("Importing phobos")
 import_submodules(phobos, verbose=True)
 
+# the libyaml dumper and loader of phobos.utils.io follow the same conventions, they are only extended after the
+# submodules were (re)loaded, as reloading phobos.utils.io creates them again
+phobos.utils.io.TupleDumper.add_representer(str, bool_representer)
+phobos.utils.io.YAMLLoader.add_constructor(u'tag:yaml.org,2002:bool', bool_constructor)
+
 
 def register():
     """This function registers all modules to blender.
@@ -0,0 +1,213 @@
+#!/usr/bin/python
+# coding=utf-8
+
+"""
+.. module:: phobos.batchexport
+    :platform: Unix, Windows, Mac
+    :synopsis: Exports the models of many .blend files from the command line using background Blender processes.
+
+.. moduleauthor:: Kai von Szadkowski, Simon Reichel
+
+Copyright 2017, University of Bremen & DFKI GmbH Robotics Innovation Center
+
+This file is part of Phobos, a Blender Add-On to edit robot models.
+
+Phobos is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation, either version 3
+of the License, or (at your option) any later version.
+
+Phobos is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
+
+File batchexport.py
+
+Usage (with Phobos installed as add-on):
+
+    blender -b -P path/to/phobos/batchexport.py -- [options] robot1.blend robot2.blend ...
+
+Options:
+
+    --models NAME [NAME ...]  only export the models with these names
+    --output DIR              export to DIR/<modelname> instead of the export path stored in each .blend file
+    --jobs N                  number of Blender worker processes running in parallel (default: number of CPUs)
+    --timeout SECONDS         time after which a worker is stopped (default: no timeout)
+    --report FILE             write a JSON report of timings and failures to FILE
+
+Every .blend file is exported by its own background Blender process running this script in worker mode,
+so a crash or error while exporting one file does not affect the other files. The exit code is 1 if any
+export failed.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import traceback
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import bpy
+from phobos.phoboslog import log
+
+
+def parseArguments(argv):
+    """Parses the command line arguments given to the script after '--'.
+
+    :param argv: The complete argument list of the Blender process.
+    :type argv: list
+    :return: argparse.Namespace
+    """
+    argv = argv[argv.index('--') + 1:] if '--' in argv else []
+    parser = argparse.ArgumentParser(prog='blender -b -P batchexport.py --',
+                                     description='Export Phobos models from .blend files.')
+    parser.add_argument('files', nargs='*', help='.blend files to export')
+    parser.add_argument('--models', nargs='+', default=None, help='names of the models to export')
+    parser.add_argument('--output', default=None, help='export directory')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='number of worker processes')
+    parser.add_argument('--timeout', type=float, default=None, help='timeout per .blend file in seconds')
+    parser.add_argument('--report', default=None, help='path of the JSON report')
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def exportFile(models=None, output=None):
+    """Exports the models of the .blend file currently opened in this Blender process.
+
+    :param models: The names of the models to export, all models are exported if None.
+    :type models: list
+    :param output: The directory to export to, the export path stored in the file is used if None.
+    :type output: str
+    :return: list -- one result dictionary per model with its name, status, time and error.
+    """
+    import phobos.utils.io as ioUtils
+    import phobos.utils.selection as sUtils
+    from phobos.operators.io import exportModel
+
+    # there is no interactive selection in background mode
+    ioUtils.getExpSettings().selectedOnly = False
+    results = []
+    for root in sUtils.getRoots():
+        modelname = root['modelname']
+        if models is not None and modelname not in models:
+            continue
+        result = {'name': modelname, 'status': 'ok', 'error': None}
+        start = time.perf_counter()
+        try:
+            exportpath = os.path.join(output, modelname) if output else ioUtils.getExportPath()
+            exportModel(root, ioUtils.securepath(exportpath))
+        except Exception:
+            result['status'] = 'failed'
+            result['error'] = traceback.format_exc()
+            log("Export of model " + modelname + " failed:\n" + result['error'], "ERROR", "exportFile")
+        result['time'] = time.perf_counter() - start
+        results.append(result)
+    return results
+
+
+def runWorker(resultpath, models=None, output=None):
+    """Exports the currently opened .blend file and writes the results to a JSON file for the dispatcher.
+
+    :param resultpath: The path of the JSON file to write the results to.
+    :type resultpath: str
+    :param models: The names of the models to export.
+    :type models: list
+    :param output: The directory to export to.
+    :type output: str
+    """
+    results = exportFile(models, output)
+    with open(resultpath, 'w') as resultfile:
+        json.dump(results, resultfile)
+
+
+def runJob(blendfile, args):
+    """Exports a .blend file in a new background Blender process and collects its results.
+
+    :param blendfile: The path of the .blend file to export.
+    :type blendfile: str
+    :param args: The parsed command line arguments.
+    :type args: argparse.Namespace
+    :return: dict -- the report entry for blendfile.
+    """
+    report = {'file': blendfile, 'status': 'ok', 'error': None, 'models': []}
+    handle, resultpath = tempfile.mkstemp(suffix='.json', prefix='phobos_export_')
+    os.close(handle)
+    command = [bpy.app.binary_path, '-b', blendfile, '-P', os.path.abspath(__file__), '--',
+               '--worker', resultpath]
+    if args.models:
+        command += ['--models'] + args.models
+    if args.output:
+        command += ['--output', os.path.abspath(args.output)]
+    start = time.perf_counter()
+    try:
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                 universal_newlines=True, timeout=args.timeout)
+        report['returncode'] = process.returncode
+        try:
+            with open(resultpath, 'r') as resultfile:
+                report['models'] = json.load(resultfile)
+        except (OSError, ValueError):
+            report['status'] = 'failed'
+            report['error'] = 'Worker exited without results:\n' + process.stdout[-4000:]
+    except subprocess.TimeoutExpired:
+        report['status'] = 'failed'
+        report['error'] = 'Timeout after ' + str(args.timeout) + ' s'
+    finally:
+        os.remove(resultpath)
+    report['time'] = time.perf_counter() - start
+    if any(model['status'] != 'ok' for model in report['models']):
+        report['status'] = 'failed'
+    log(blendfile + ": " + report['status'] + " (" + '{0:.2f}'.format(report['time']) + " s)",
+        "INFO" if report['status'] == 'ok' else "ERROR", "runJob")
+    return report
+
+
+def runBatch(args):
+    """Distributes the .blend files over a pool of background Blender processes and writes the report.
+
+    :param args: The parsed command line arguments.
+    :type args: argparse.Namespace
+    :return: dict -- the report of the batch export.
+    """
+    start = time.perf_counter()
+    blendfiles = [os.path.abspath(f) for f in args.files]
+    # every job waits for its own Blender process, so threads are sufficient to run the pool
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        files = list(executor.map(lambda blendfile: runJob(blendfile, args), blendfiles))
+    report = {'jobs': args.jobs,
+              'time': time.perf_counter() - start,
+              'succeeded': sum(1 for f in files if f['status'] == 'ok'),
+              'failed': sum(1 for f in files if f['status'] != 'ok'),
+              'files': files}
+    if args.report:
+        with open(args.report, 'w') as reportfile:
+            json.dump(report, reportfile, indent=2)
+    log("Exported " + str(report['succeeded']) + " of " + str(len(files)) + " files in "
+        + '{0:.2f}'.format(report['time']) + " s", "INFO", "runBatch")
+    return report
+
+
+def main(argv=None):
+    """Entry point of the batch export when run as Blender script.
+
+    :param argv: The argument list of the Blender process, sys.argv if None.
+    :type argv: list
+    """
+    args = parseArguments(sys.argv if argv is None else argv)
+    if args.worker:
+        runWorker(args.worker, args.models, args.output)
+    else:
+        report = runBatch(args)
+        if report['failed']:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
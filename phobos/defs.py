@@ -31,8 +31,13 @@ Created on 7 Jan 2014
 """
 
 import os
+import json
+import pickle
+import hashlib
 import yaml
 from re import compile
+from collections.abc import MutableMapping
+import bpy
 from phobos.phoboslog import log
 
 # phobos version number
@@ -98,14 +103,50 @@ type_properties = {"undefined": (),
                    "light_default": ('new_light', 'true', '1.0')
                    }
 
+class Definitions(MutableMapping):
+    """The definitions of model elements by category, e.g. definitions['motors'].
+
+    Categories can be registered without their content, which is then loaded by calling the loader with the
+    category's name when the category is first accessed. Checking whether a category exists or iterating
+    over the categories does not load them.
+
+    """
+    def __init__(self, categories, loader=None):
+        self.categories = dict(categories)
+        self.loader = loader
+
+    def __getitem__(self, category):
+        if self.categories[category] is None:
+            self.categories[category] = self.loader(category)
+        return self.categories[category]
+
+    def __setitem__(self, category, value):
+        self.categories[category] = value
+
+    def __delitem__(self, category):
+        del self.categories[category]
+
+    def __contains__(self, category):
+        return category in self.categories
+
+    def __iter__(self):
+        return iter(self.categories)
+
+    def __len__(self):
+        return len(self.categories)
+
+
 # definitions of model elements to be read in
-definitions = {'motors': {},
-               'sensors': {},
-               'controllers': {},
-               'algorithms': {},
-               'materials': {},
-               'model': {}
-               }
+definitions = Definitions({'motors': {},
+                           'sensors': {},
+                           'controllers': {},
+                           'algorithms': {},
+                           'materials': {},
+                           'model': {}
+                           })
+
+# folder of the yml files the definitions are read from
+definitionsFolder = os.path.join(os.path.dirname(__file__), 'definitions')
 
 
 def updateDefs(defsFolderPath):
@@ -115,7 +156,11 @@ def updateDefs(defsFolderPath):
     :type defsFolderPath: str
 
     """
-    dicts = __parseAllYAML(defsFolderPath)
+    __mergeDefinitions(__parseAllYAML(defsFolderPath))
+    __linkDefinitions('model')
+
+
+def __mergeDefinitions(dicts):
     for dict in dicts:
         for category in dict:
             for key, value in dict[category].items():
@@ -124,8 +169,16 @@ def updateDefs(defsFolderPath):
                 if key in definitions[category]:
                     log("Entry for "+category+'/'+key+" will be overwritten while parsing definitions.", "WARNING")
                 definitions[category][key] = value
-    # Extending model definition
-    definitions['model']['sensors']['$forElem']['$selection__type'] = definitions['sensors']
+
+
+def __linkDefinitions(category):
+    """Links definitions of a category to those of other categories after the category was loaded.
+
+    """
+    if category == 'model':
+        # Extending model definition
+        definitions['model']['sensors']['$forElem']['$selection__type'] = definitions['sensors']
+    return definitions[category]
 
 
 def __evaluateString(s):
@@ -147,6 +200,14 @@ def __evaluateString(s):
     return s
 
 
+def __findYAMLFiles(path):
+    """Returns the paths of the .yml files which are read by __parseAllYAML, in the same order.
+
+    """
+    return [os.path.join(path, file) for root, dirs, files in os.walk(path) for file in files
+            if file.endswith(".yml")]
+
+
 def __parseAllYAML(path):
     """Reads all .yml files in the given path and loads them.
     It also evaluates the expressions enclosed by '&' in those files.
@@ -157,24 +218,132 @@ def __parseAllYAML(path):
 
     """
     dicts = []
-    for root, dirs, files in os.walk(path):
-        for file in files:
-            print('  '+file)
-            if file.endswith(".yml"):
-                try:
-                    f = open(os.path.join(path, file), 'r')
-                    tmpstring = f.read()
-                    f.close()
-                    try:
-                        tmpyaml = yaml.load(__evaluateString(tmpstring))
-                        dicts.append(tmpyaml)
-                    except yaml.scanner.ScannerError:
-                        log("Error while parsing YAML file", "ERROR")
-                except FileNotFoundError:
-                    log("The file "+file+" was not found.", "ERROR")
+    for filepath in __findYAMLFiles(path):
+        try:
+            f = open(filepath, 'r')
+            tmpstring = f.read()
+            f.close()
+            try:
+                tmpyaml = yaml.load(__evaluateString(tmpstring))
+                dicts.append(tmpyaml)
+            except yaml.scanner.ScannerError:
+                log("Error while parsing YAML file", "ERROR")
+        except FileNotFoundError:
+            log("The file "+os.path.basename(filepath)+" was not found.", "ERROR")
     return dicts
 
 
-# Update definitions from files
-print("Parsing definitions from: " + os.path.dirname(__file__) + "/definitions")
-updateDefs(os.path.dirname(__file__) + "/definitions")
+def __hashFile(path):
+    with open(path, 'rb') as hashedfile:
+        return hashlib.sha1(hashedfile.read()).hexdigest()
+
+
+def __getSourceSignatures(path, cachedsources):
+    """Returns the modification time, size and hash of the definition files. The files are only hashed if their
+    modification time or size differs from the cached sources, whose hashes are taken over otherwise.
+
+    """
+    sources = {}
+    for filepath in __findYAMLFiles(path):
+        stat = os.stat(filepath)
+        signature = {'mtime': stat.st_mtime_ns, 'size': stat.st_size}
+        cached = cachedsources.get(filepath, {})
+        if cached.get('mtime') == signature['mtime'] and cached.get('size') == signature['size']:
+            signature['sha1'] = cached['sha1']
+        else:
+            signature['sha1'] = __hashFile(filepath)
+        sources[filepath] = signature
+    return sources
+
+
+def getDefinitionsCachePath():
+    """Returns the folder of the compiled definitions, in Blender's user configuration folder.
+
+    """
+    return os.path.join(bpy.utils.user_resource('CONFIG', path='phobos', create=True), 'definitions')
+
+
+def loadDefinitions(path=definitionsFolder):
+    """Loads the definitions from the yml files in path, using the compiled definitions of the cache folder if
+    it was compiled from files with the same hashes. The categories are then only registered and each one is
+    unpickled when it is accessed for the first time. Otherwise, all files are parsed and the cache is updated.
+
+    :param path: The path to the folder with the definitions yaml files.
+    :type path: str
+    :return: bool -- True if the cached definitions were used.
+
+    """
+    cachepath = getDefinitionsCachePath()
+    indexpath = os.path.join(cachepath, 'index.json')
+    try:
+        with open(indexpath, 'r') as indexfile:
+            index = json.load(indexfile)
+    except (OSError, ValueError):
+        index = {}
+    sources = __getSourceSignatures(path, index.get('sources', {}))
+    hashes = {filepath: sources[filepath]['sha1'] for filepath in sources}
+    cachedhashes = {filepath: source['sha1'] for filepath, source in index.get('sources', {}).items()}
+    cachedcategories = index.get('categories', {}).values()
+    if (index.get('version') == version and hashes == cachedhashes
+            and all(os.path.isfile(os.path.join(cachepath, filename)) for filename in cachedcategories)):
+        def loadCategory(category):
+            try:
+                with open(os.path.join(cachepath, index['categories'][category]), 'rb') as categoryfile:
+                    definitions[category] = pickle.load(categoryfile)
+            except (OSError, pickle.UnpicklingError, EOFError) as error:
+                # the cache is compiled again, the categories loaded before are kept as they are
+                log("Could not read cached definitions of " + category + ", parsing " + path + " again: "
+                    + str(error), "WARNING")
+                parsed = {cachedcategory: {} for cachedcategory in definitions.categories}
+                for parseddict in __parseAllYAML(path):
+                    for parsedcategory, entries in (parseddict or {}).items():
+                        parsed.setdefault(parsedcategory, {}).update(entries)
+                index['categories'] = __writeDefinitionsCache(cachepath, sources, parsed)['categories']
+                definitions[category] = parsed[category]
+            return __linkDefinitions(category)
+
+        definitions.loader = loadCategory
+        for category in index['categories']:
+            definitions[category] = None
+        if sources != index['sources']:
+            # the files were only touched, remember their new modification times
+            index['sources'] = sources
+            __writeJSON(indexpath, index)
+        return True
+
+    print("Parsing definitions from: " + path)
+    __mergeDefinitions(__parseAllYAML(path))
+    __writeDefinitionsCache(cachepath, sources, definitions)
+    __linkDefinitions('model')
+    return False
+
+
+def __writeDefinitionsCache(cachepath, sources, categories):
+    """Pickles each category of definitions into a file of the cache folder and writes the index of the cache.
+
+    :return: dict -- the index of the cache.
+
+    """
+    index = {'version': version, 'sources': sources, 'categories': {}}
+    try:
+        os.makedirs(cachepath, exist_ok=True)
+        for number, category in enumerate(sorted(categories)):
+            index['categories'][category] = 'category' + str(number) + '.pickle'
+            temppath = os.path.join(cachepath, index['categories'][category] + '.part')
+            with open(temppath, 'wb') as categoryfile:
+                pickle.dump(categories[category], categoryfile, pickle.HIGHEST_PROTOCOL)
+            os.replace(temppath, os.path.join(cachepath, index['categories'][category]))
+        __writeJSON(os.path.join(cachepath, 'index.json'), index)
+    except OSError as error:
+        log("Could not write definitions cache to " + cachepath + ": " + str(error), "ERROR")
+    return index
+
+
+def __writeJSON(path, data):
+    with open(path + '.part', 'w') as jsonfile:
+        json.dump(data, jsonfile, indent=1, sort_keys=True)
+    os.replace(path + '.part', path)
+
+
+# Update definitions from files, or register the categories of the cached definitions
+loadDefinitions()
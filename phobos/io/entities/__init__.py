@@ -1,13 +1,7 @@
 import os
-import imp
+from phobos.io.plugins import loadPluginManifest
 
-entity_types = dict()
-for filename in os.listdir(os.path.dirname(__file__)):
-    mod_name, file_ext = os.path.splitext(os.path.split(filename)[-1])
-    if (filename != os.path.split(__file__)[-1]) and (file_ext.lower() == '.py'):
-        py_mod = imp.load_source(mod_name, os.path.join(os.path.dirname(__file__), filename))
-        try:
-            entity_types.update(py_mod.entity_type_dict.copy())
-            print('Registering entity plugin:', list(py_mod.entity_type_dict.keys()))
-        except AttributeError:
-            print('ERROR in entities/__init__: "'+filename+'" has no valid entity plugin interface.')
+# the plugin modules are imported when their functions are first called, not with the package
+lazyimport = True
+
+entity_types = loadPluginManifest(os.path.dirname(__file__), __name__)['entities']
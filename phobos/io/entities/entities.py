@@ -55,7 +55,3 @@ def deriveGenericEntity(entityobj, outpath=None):
 def exportGenericEntity(entity, outpath):
     pass
 
-# registering import/export functions of types with Phobos
-entity_type_dict = {'generic': {'export': exportGenericEntity,
-                              'extensions': ('yaml',)}
-                    }
@@ -65,8 +65,3 @@ def deriveEntity(light, outpath):
         entity["angle"] = lightobj.data.spot_size
     return entity
 
-
-
-#  registering import/export functions of types with Phobos
-entity_type_dict = {'light': {'derive': deriveEntity}
-                    }
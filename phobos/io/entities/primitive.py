@@ -73,6 +73,3 @@ def deriveEntity(primitive, outpath):
 def exportPrimitive():
     pass
 
-# registering export functions of types with Phobos
-entity_type_dict = {'primitive': {'derive': deriveEntity}
-                    }
@@ -32,12 +32,17 @@ Created on 12 Sep 2016
 
 import os
 import yaml
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 import bpy
 import phobos.defs as defs
 import phobos.model.models as models
 import phobos.utils.io as ioUtils
+import phobos.io.entities.urdf as urdf
+import phobos.io.entities.srdf as srdf
 from phobos.io.entities.urdf import sort_urdf_elements
 from phobos.phoboslog import log
+from phobos.utils.profiling import profiled, phase, count
 
 
 def deriveEntity(root, outpath):
@@ -275,17 +280,20 @@ def exportSmurf(model, path):
 
     infostring = ' definition SMURF file for "' + model['name'] + '", ' + model["date"] + "\n\n"
 
+    # collect the files to write, their contents are serialized while they are written (see ioUtils.writeTextFiles)
+    files = []
+
     # write model information
     log("Writing SMURF model to " + smurf_filename, "INFO", "exportModelToSMURF")
     modeldata = {"date": model["date"],
                  "files": [urdf_path + urdf_filename] + [filenames[f] for f in fileorder if exportdata[f]]}
     # append custom data
-    with open(os.path.join(path, smurf_filename), 'w') as op:
-        op.write('# main SMURF file of model "' + model['name'] + '"\n')
-        op.write('# created with Phobos ' + defs.version + ' - https://github.com/rock-simulation/phobos\n\n')
-        op.write("SMURF version: " + defs.version + "\n")
-        op.write("modelname: " + model['name'] + "\n")
-        op.write(yaml.dump(modeldata, default_flow_style=False))
+    files.append((os.path.join(path, smurf_filename),
+                  lambda: '# main SMURF file of model "' + model['name'] + '"\n'
+                  + '# created with Phobos ' + defs.version + ' - https://github.com/rock-simulation/phobos\n\n'
+                  + "SMURF version: " + defs.version + "\n"
+                  + "modelname: " + model['name'] + "\n"
+                  + ioUtils.dumpYAML(modeldata, default_flow_style=False)))
 
     # #write semantics (SRDF information in YML format)
     # if export['semantics']:
@@ -308,52 +316,55 @@ def exportSmurf(model, path):
             if 'state' in joint:  # this should always be the case, but testing doesn't hurt
                 tmpstate = joint['state'].copy()
                 tmpstate['name'] = jointname
-                states.append(joint['state'])
-        with open(os.path.join(path, filenames['state']), 'w') as op:
-            op.write('#state' + infostring)
-            op.write("modelname: " + model['name'] + '\n')
-            op.write(yaml.dump(states))  #, default_flow_style=False))
+                states.append(tmpstate)
+        files.append((os.path.join(path, filenames['state']),
+                      lambda: '#state' + infostring + "modelname: " + model['name'] + '\n'
+                      + ioUtils.dumpYAML(states)))  #, default_flow_style=False))
 
     # write materials, sensors, motors & controllers
+    # sections which were exported from the same data before are skipped (see utils.io.ExportManifest)
     for data in ['materials', 'sensors', 'motors', 'controllers', 'lights']:
-        if exportdata[data]:
-            with open(os.path.join(path, filenames[data]), 'w') as op:
-                op.write('#' + data + infostring)
-                op.write(yaml.dump(sort_for_yaml_dump({data: list(model[data].values())}, data),
-                                   default_flow_style=False))
-                #op.write(yaml.dump({data: list(model[data].values())}, default_flow_style=False))
+        filepath = os.path.join(path, filenames[data])
+        if exportdata[data] and not ioUtils.skipUnchanged(filepath, ioUtils.hashObject([infostring, model[data]])):
+            files.append((filepath, lambda data=data: '#' + data + infostring + ioUtils.dumpYAML(
+                sort_for_yaml_dump({data: list(model[data].values())}, data), default_flow_style=False)))
 
     # write additional collision information
-    if exportdata['collision']:
-        with open(os.path.join(path, filenames['collision']), 'w') as op:
-            op.write('#collision data' + infostring)
-            #op.write(yaml.dump({'collision': list(bitmasks.values())}, default_flow_style=False))
-            op.write(yaml.dump({'collision': [collisiondata[key] for key in sorted(collisiondata.keys())]},
-                               default_flow_style=False))
+    filepath = os.path.join(path, filenames['collision'])
+    if exportdata['collision'] and not ioUtils.skipUnchanged(filepath,
+                                                             ioUtils.hashObject([infostring, collisiondata])):
+        #op.write(yaml.dump({'collision': list(bitmasks.values())}, default_flow_style=False))
+        files.append((filepath, lambda: '#collision data' + infostring + ioUtils.dumpYAML(
+            {'collision': [collisiondata[key] for key in sorted(collisiondata.keys())]}, default_flow_style=False)))
 
     # write visual information (level of detail, ...)
-    if exportdata['visuals']:
-        with open(os.path.join(path, filenames['visuals']), 'w') as op:
-            op.write('#visual data' + infostring)
-            op.write(yaml.dump({'visuals': list(lodsettings.values())}, default_flow_style=False))
+    filepath = os.path.join(path, filenames['visuals'])
+    if exportdata['visuals'] and not ioUtils.skipUnchanged(filepath, ioUtils.hashObject([infostring, lodsettings])):
+        files.append((filepath, lambda: '#visual data' + infostring + ioUtils.dumpYAML(
+            {'visuals': list(lodsettings.values())}, default_flow_style=False)))
 
     # write additional information
+    def annotationString(category):
+        outstring = '#' + category + infostring
+        for elementtype in annotationdict[category]:
+            outstring += elementtype + ':\n'
+            outstring += ioUtils.dumpYAML(annotationdict[category][elementtype], default_flow_style=False) + "\n"
+        return outstring
+
     for category in annotationdict.keys():
-        if exportdata[category]:
-            outstring = '#' + category + infostring
-            for elementtype in annotationdict[category]:
-                outstring += elementtype + ':\n'
-                outstring += yaml.dump(annotationdict[category][elementtype],
-                                       default_flow_style=False) + "\n"
-            with open(os.path.join(path, filenames[category]), 'w') as op:
-                op.write(outstring)
+        filepath = os.path.join(path, filenames[category])
+        if exportdata[category] and not ioUtils.skipUnchanged(
+                filepath, ioUtils.hashObject([infostring, annotationdict[category]])):
+            files.append((filepath, lambda category=category: annotationString(category)))
 
     # write custom data from textfiles
     for data in customdatalist:
-        if exportdata[data]:
-            with open(os.path.join(path, filenames[data]), 'w') as op:
-                op.write('#' + data + infostring)
-                op.write(yaml.dump({data: list(model[data].values())}, default_flow_style=False))
+        filepath = os.path.join(path, filenames[data])
+        if exportdata[data] and not ioUtils.skipUnchanged(filepath, ioUtils.hashObject([infostring, model[data]])):
+            files.append((filepath, lambda data=data: '#' + data + infostring + ioUtils.dumpYAML(
+                {data: list(model[data].values())}, default_flow_style=False)))
+
+    ioUtils.writeTextFiles(files)
 
     ## write custom yml files
     #if bpy.data.worlds[0].exportCustomData:
@@ -363,102 +374,140 @@ def exportSmurf(model, path):
     #            op.write('\n'.join(line.body for line in text.lines))
 
 
-# class SMURFModelParser(RobotModelParser):
-#     """Class derived from RobotModelParser which parses a SMURF model"""
-#
-#     def __init__(self, filepath):
-#         RobotModelParser.__init__(self, filepath)
-#
-#     def parseModel(self):
-#         print("Parsing SMURF model...")
-#         #smurf = None
-#         with open(self.filepath, 'r') as smurffile:
-#             smurf = yaml.load(smurffile)
-#         if smurf is None:
-#             log('No valid SMURF file.', "ERROR")
-#             return None
-#         urdffile = None
-#         srdffile = None
-#         ymlfiles = [f for f in smurf['files'] if f.endswith('.yml') or f.endswith('.yaml')]
-#         for f in smurf['files']:
-#             if f.endswith('.urdf'):
-#                 urdffile = f
-#             if f.endswith('.srdf'):
-#                 srdffile = f
-#         # get URDF info
-#         if urdffile is None:
-#             log("Did not find URDF file associated with SMURF.", "ERROR")
-#             return None
-#         urdfparser = URDFModelParser(os.path.join(self.path, urdffile))
-#         urdfparser.parseModel()
-#         if srdffile is not None:
-#             srdfparser = SRDFModelParser(os.path.join(self.path, srdffile))
-#             self.robot = srdfparser.parseModel(urdfparser.robot)
-#         else:
-#             self.robot = urdfparser.robot
-#         # make sure all types exist
-#         typelist = ['links', 'joints', 'materials', 'sensors', 'motors', 'controllers', 'groups', 'chains']
-#         for key in typelist:
-#             if key not in self.robot:
-#                 self.robot[key] = {}
-#         #add the smurf information
-#         custom_dicts = {}
-#         for yml in ymlfiles:
-#             with open(os.path.join(self.path, yml), 'r') as ymlfile:
-#                 ymldict = yaml.load(ymlfile)
-#             for key in ymldict:
-#                 print(key)
-#                 if key in ['materials', 'sensors', 'motors', 'controllers']:
-#                     for element in ymldict[key]:
-#                         if element['name'] not in self.robot[key]:
-#                             self.robot[key][element['name']] = element
-#                         else:
-#                             for tag in element:
-#                                 self.robot[key][element['name']][tag] = element[tag]
-#                 elif key in 'state':
-#                     pass  # TODO: handle state
-#                 else:
-#                     custom_dicts[key] = ymldict[key]
-#
-#         for key in custom_dicts:
-#             print('assign custom properties:', key, custom_dicts[key])
-#             for element in custom_dicts[key]:  # iterate over list with custom annotations
-#                 print(element)
-#                 try:
-#                     objtype = element['type']
-#                 except KeyError:
-#                     log("Could not find 'type' in custom annotation: " + str(element), "ERROR")
-#                 try:
-#                     objname = element['name']
-#                 except KeyError:
-#                     log("Could not find 'name' in custom annotation: " + str(element), "ERROR")
-#                 try:
-#                     if objtype+'s' in typelist:  #FIXME: this is a total hack!
-#                         objtype += 's'
-#                     else:
-#                         raise TypeError(objtype)
-#                     if objname in self.robot[objtype]:
-#                         for tag in element:
-#                             if tag not in ['type', 'name']:
-#                                 if not '$'+key in self.robot[objtype][objname]:
-#                                     self.robot[objtype][objname]['$'+key] = {tag: element[tag]}
-#                                 else:
-#                                     self.robot[objtype][objname]['$'+key][tag] = element[tag]
-#                     else:
-#                         raise NameError(objname)
-#                 except TypeError:
-#                     print("###ERROR: could not find 'type' or 'name' in custom annotation", objtype, objname)
-#                 except NameError:
-#                     log("Element " + str(objname) + " of type " + str(objtype) + " does not exist in this model.", "ERROR")
-#
-#         #now some debug output
-#         with open(self.filepath+'_SMURF_debug.yml', 'w') as outputfile:
-#             outputfile.write(yaml.dump(self.robot))#, default_flow_style=False)) #last parameter prevents inline formatting for lists and dictionaries
-
-
-# registering import/export functions of types with Phobos
-entity_type_dict = {'smurf': {'export': exportSmurf,
-                              'derive': deriveEntity,
-                              'extensions': ('smurf',)}
-                    }
+# the files of a SMURF which are merged into the model dictionary, by their key in the files, all files not listed
+# here are annotations (see gatherAnnotations) or custom data
+smurfDataFiles = ('materials', 'sensors', 'motors', 'controllers', 'lights', 'collision', 'visuals', 'state')
+
+
+def getSmurfFileKey(modelname, filename):
+    """Returns the key of a YAML file of a SMURF, i.e. the category or data name it was exported for.
+
+    """
+    name = os.path.splitext(os.path.basename(filename))[0]
+    return name[len(modelname) + 1:] if name.startswith(modelname + '_') else name
+
+
+def isCustomDataFile(path, key):
+    """Checks whether a YAML file of a SMURF holds custom data, which is written as a list named like its key, and
+    not annotations, which are lists named by element types. Only the first lines of the file are read.
+
+    """
+    try:
+        with open(path, 'r') as yamlfile:
+            for line in yamlfile:
+                if line.strip() and not line.startswith('#'):
+                    return line.startswith(key + ':')
+    except OSError:
+        pass
+    return False
+
+
+def loadYAMLFile(path):
+    with open(path, 'r') as yamlfile:
+        return ioUtils.loadYAML(yamlfile) or {}
+
+
+def mergeSmurfData(model, key, data):
+    """Merges the content of one of the data files of a SMURF into the model dictionary.
 
+    :param model: The model dictionary as imported from the URDF.
+    :type model: dict
+    :param key: The key of the file (see smurfDataFiles).
+    :type key: str
+    :param data: The parsed content of the file.
+    :type data: dict
+
+    """
+    if key in ('materials', 'sensors', 'motors', 'controllers', 'lights'):
+        for element in data.get(key) or []:
+            model[key].setdefault(element['name'], {}).update(element)
+    elif key in ('collision', 'visuals'):
+        elementtype = 'collision' if key == 'collision' else 'visual'
+        # the elements are looked up by name, as the level of detail settings do not name their link
+        elements = {name: element for link in model['links'].values()
+                    for name, element in link.get(elementtype, {}).items()}
+        for entry in data.get(key) or []:
+            if entry['name'] in elements:
+                elements[entry['name']].update({tag: entry[tag] for tag in entry if tag not in ('name', 'link')})
+            else:
+                log("Could not find " + elementtype + " " + entry['name'] + " of file " + key + ".", "WARNING",
+                    "importSmurf")
+    elif key == 'state':
+        # the states of the joints are written as list
+        for entry in data if isinstance(data, list) else data.get(key) or []:
+            if isinstance(entry, dict) and entry.get('name') in model['joints']:
+                model['joints'][entry['name']]['state'] = {tag: entry[tag] for tag in entry if tag != 'name'}
+            else:
+                log("Could not find joint of state " + str(entry) + ".", "WARNING", "importSmurf")
+
+
+@profiled
+def importSmurf(filepath):
+    """Imports a robot model from a SMURF file, i.e. the URDF it refers to and the YAML files adding sensors,
+    motors, materials and collision and visual settings to it. The disabled collisions of its SRDF files set the
+    collision bitmasks of the links (see io.entities.srdf.parseSRDFModel).
+
+    The YAML files are parsed in a pool of threads while the URDF is parsed, and their data and annotations are
+    merged into the elements of the model. Custom data files, which the model is built without, are not parsed
+    here: they are added to the model as lazily loaded files in 'customdata'.
+
+    :param filepath: The path of the .smurf file.
+    :type filepath: str
+    :return: dict -- the model dictionary, None if the SMURF is invalid.
+
+    """
+    log("Parsing SMURF model from " + filepath, "INFO", "importSmurf")
+    phase('manifest')
+    smurf = loadYAMLFile(filepath)
+    if not isinstance(smurf, dict) or 'files' not in smurf:
+        log("No valid SMURF file: " + filepath, "ERROR", "importSmurf")
+        return None
+    path = os.path.dirname(filepath)
+    modelname = smurf.get('modelname', os.path.splitext(os.path.basename(filepath))[0])
+    urdffiles = [f for f in smurf['files'] if f.endswith('.urdf')]
+    if not urdffiles:
+        log("Did not find URDF file associated with SMURF.", "ERROR", "importSmurf")
+        return None
+    srdffiles = [f for f in smurf['files'] if f.endswith('.srdf')]
+    datafiles = {}
+    customdata = {}
+    for f in smurf['files']:
+        if f.endswith('.yml') or f.endswith('.yaml'):
+            key = getSmurfFileKey(modelname, f)
+            if key not in smurfDataFiles and isCustomDataFile(os.path.join(path, f), key):
+                customdata[key] = ioUtils.LazyYAMLFile(os.path.join(path, f))
+            else:
+                datafiles[key] = os.path.join(path, f)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(datafiles), os.cpu_count() or 1))) as pool:
+        futures = {key: pool.submit(loadYAMLFile, datafiles[key]) for key in datafiles}
+        phase('urdf')
+        model = urdf.importUrdf(os.path.join(path, urdffiles[0]))
+        phase('merging')
+        # the URDF importer lists its materials, the SMURF ones are merged by name
+        model['materials'] = {material['name']: material for material in model.get('materials', [])}
+        for key in ('sensors', 'motors', 'controllers', 'lights', 'groups', 'chains'):
+            model.setdefault(key, {})
+        annotations = {}
+        for key in sorted(futures):
+            try:
+                data = futures[key].result()
+            except (OSError, yaml.YAMLError) as error:
+                log("Could not read " + datafiles[key] + ": " + str(error), "ERROR", "importSmurf")
+                continue
+            if key in smurfDataFiles:
+                mergeSmurfData(model, key, data)
+            else:
+                annotations[key] = data
+        models.mergeAnnotations(model, annotations)
+    for f in srdffiles:
+        # the disabled collisions of the SRDF become collision bitmasks, the other SRDF elements are not read
+        try:
+            srdf.parseSRDFModel(os.path.join(path, f), model)
+        except (OSError, ET.ParseError, KeyError) as error:
+            log("Could not read " + f + ": " + str(error), "ERROR", "importSmurf")
+    model['customdata'] = customdata
+    if 'date' in smurf:
+        model['date'] = smurf['date']
+    count('files', len(datafiles) + len(customdata) + len(srdffiles) + 1)
+    return model
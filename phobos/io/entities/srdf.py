@@ -33,7 +33,12 @@ Created on Nov 8 2016
 import itertools
 import os
 import xml.etree.ElementTree as ET
-from phobos.utils.io import l2str, xmlline, indent, xmlHeader
+from phobos.utils.io import l2str, xmlline, indent, xmlHeader, StreamWriter, getExpSettings
+from phobos.phoboslog import log
+from phobos.model.collisions import generateDisabledCollisions
+
+# number of collision groups of Blender's rigid bodies, i.e. of bits in a collision bitmask
+maxCollisionBits = 20
 
 
 def exportSRDF(model, path, mesh_format=''):
@@ -63,7 +68,9 @@ def exportSRDF(model, path, mesh_format=''):
 
     <disable_collisions>
     Disables collisions between pairs of links to simplify collision checking and avoid collisions
-    of parents and children at their joints.
+    of parents and children at their joints. The pairs of links whose collision bitmasks share no bit are
+    written with reason "User". If SRDF collision samples are set in the export settings, the adjacent, never and
+    always colliding pairs found by phobos.model.collisions.generateDisabledCollisions are added.
 
 
     Currently not supported:
@@ -120,117 +127,162 @@ def exportSRDF(model, path, mesh_format=''):
         # TODO: we might want to automatically add parent/child link combinations
         try:
             if link1['collision_bitmask'] & link2['collision_bitmask'] == 0:
-                #output.append(xmlline(2, 'disable_collisions', ('link1', 'link2'), (link1['name'], link2['name'])))
-                collisionExclusives.append((link1['name'], link2['name']))
+                collisionExclusives.append((link1['name'], link2['name'], 'User'))
         except KeyError:
             pass
-    with open(os.path.join(path, model['name'] + '.srdf'), 'w') as outputfile:
+    expsettings = getExpSettings()
+    if expsettings.srdfCollisionSamples > 0:
+        collisionExclusives += generateDisabledCollisions(model, expsettings.srdfCollisionSamples,
+                                                          jobs=expsettings.srdfCollisionJobs,
+                                                          processes=expsettings.srdfCollisionProcesses)
+    disabled = set()
+    for link1, link2, reason in collisionExclusives:
+        pair = tuple(sorted((link1, link2)))
+        if pair not in disabled:
+            disabled.add(pair)
+            output.append(xmlline(2, 'disable_collisions', ('link1', 'link2', 'reason'), (link1, link2, reason)))
+    output.append(indent + '</robot>\n')
+    with StreamWriter(os.path.join(path, model['name'] + '.srdf')) as outputfile:
         outputfile.write(''.join(output))
 
 
-def parseSRDFModel(self, robot):
-    collision_Exclusives = self.buildCollisionExclusives()
-    collision_Dic = self.buildCollisionDictionary(collision_Exclusives, robot)
-    collision_Groups = self.buildCollisionGroups(collision_Dic)
-    robot = self.buildBitmasks(collision_Groups, robot)
-    return robot
+def parseSRDFModel(filepath, robot):
+    """Sets the collision bitmasks of the links of a robot model from the disabled collisions of an SRDF file.
+
+    :param filepath: The path of the SRDF file.
+    :type filepath: str
+    :param robot: The robot model dictionary, whose collision bitmasks are set.
+    :type robot: dict
+    :return: dict -- the report of buildBitmasks.
 
+    """
+    return buildBitmasks(buildCollisionExclusives(filepath), robot)
 
-def buildBitmasks(self, collision_Groups, robot):
-    bits = len(collision_Groups)
-    if bits > 20:
-        print("The blender bitmask is not capable of more than 20 bit. The bitmask will be cutted!")
-        bits = 20
-    for link in robot['links']:
-        for i in range(0, bits):
-            if link in collision_Groups[i]:
-                for coll in robot['links'][link]['collision']:
-                    try:
-                        robot['links'][link]['collision'][coll]['bitmask'] += 2**i
-                    except KeyError:
-                        robot['links'][link]['collision'][coll]['bitmask'] = 2**i
-    return robot
 
+def buildCollisionExclusives(filepath):
+    """Reads the pairs of links whose collisions are disabled from an SRDF file.
 
-def buildCollisionExclusives(self):
-    print("\nParsing SRDF extensions from", self.filepath)
-    self.tree = ET.parse(self.filepath)
-    self.root = self.tree.getroot()
+    :param filepath: The path of the SRDF file.
+    :type filepath: str
+    :return: list -- of pairs of link names.
 
+    """
+    log("Parsing SRDF extensions from " + filepath, "INFO", "buildCollisionExclusives")
+    root = ET.parse(filepath).getroot()
     collision_Exclusives = []
-    for disabled_coll in self.root.iter('disable_collisions'):
-        pair = (disabled_coll.attrib['link1'], disabled_coll.attrib['link2'])
-        collision_Exclusives.append(pair)
-        #print("Append ", pair, " to collision Exclusives")
+    for disabled_coll in root.iter('disable_collisions'):
+        collision_Exclusives.append((disabled_coll.attrib['link1'], disabled_coll.attrib['link2']))
     return collision_Exclusives
 
 
-def buildCollisionDictionary(self, collision_exclusives, robot):
-    dic = {}
-    for pair in collision_exclusives:
-        if 'root' in pair or (pair[0] != robot['joints'][pair[1]]['parent'] and pair[1] != robot['joints'][pair[0]]['parent']):
-            if pair[0] not in dic:
-                dic[pair[0]]=[]
-                dic[pair[0]].append(pair[1])
-            else:
-                if pair[1] not in dic[pair[0]]:
-                    dic[pair[0]].append(pair[1])
-            if pair[1] not in dic:
-                dic[pair[1]]=[]
-                dic[pair[1]].append(pair[0])
-            else:
-                if pair[0] not in dic[pair[1]]:
-                    dic[pair[1]].append(pair[0])
-        else:
-            pass
-            #print("Pair: ", pair, " not included")
-    print("Collision Dictionary:\n", dic)
-    return dic
-
-
-def checkGroup(self, group, colls):
-    cut = []
-    for elem in group:
-        if elem in colls:
-            cut.append(elem)
-    if len(cut) == len(group):
-        return cut
-    else:
-        return []
-
-
-def processGroup(self, group, link, colls):
-    if link in group:
-        for coll in colls:
-            if coll in group:
-                colls.remove(coll)
-    else:
-        cut = self.checkGroup(group, colls)
-        if len(cut) > 0:
-            group.append(link)
-            for l in cut:
-                colls.remove(l)
-
-
-def buildCollisionGroups(self, dic):
-    groups=[]
-    for link in dic:
-        #rint("Current link: ", link)
-        colls = dic[link]
-        #print("Current colls: ", colls)
-        for group in groups:
-            #print("Current group: ", group)
-            self.processGroup(group, link, colls)
-        while len(colls) > 0:
-            newgroup = [link, colls.pop()]
-            groups.append(newgroup)
-            self.processGroup(newgroup, link, colls)
-    print ("Number of collision Groups: ", len(groups))
-    #print ("Collision Groups:\n", groups)
+def countBits(bits):
+    return bin(bits).count('1')
+
+
+def iterateBits(bits):
+    """Yields the indices of the set bits of an integer in ascending order.
+
+    """
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+def buildCollisionGraph(linknames, collision_exclusives):
+    """Builds the graph of the links which may collide with each other, i.e. of all pairs of links which are
+    not listed as collision-exclusive. Each link's neighbours are stored as integer bitset.
+
+    :param linknames: The names of the links with collision objects.
+    :type linknames: list
+    :param collision_exclusives: The pairs of link names whose collisions are disabled.
+    :type collision_exclusives: list
+    :return: tuple -- the sorted link names and a list with the bitset of each link, in which bit j is set if the
+        link may collide with link j.
+
+    """
+    names = sorted(linknames)
+    index = {name: i for i, name in enumerate(names)}
+    full = (1 << len(names)) - 1
+    graph = [full & ~(1 << i) for i in range(len(names))]
+    for link1, link2 in collision_exclusives:
+        if link1 in index and link2 in index:
+            i, j = index[link1], index[link2]
+            graph[i] &= ~(1 << j)
+            graph[j] &= ~(1 << i)
+    return names, graph
+
+
+def buildCollisionGroups(graph):
+    """Covers all edges of the collision graph with cliques, i.e. groups of links which may all collide with
+    each other. Each group becomes a bit of the collision bitmask, so two links collide if and only if they share
+    a group. The groups are grown greedily from the link with most uncovered edges and add the link covering
+    most uncovered edges in each step, which yields few groups for the dense graphs of real robots.
+
+    :param graph: The bitsets of the collision graph as returned by buildCollisionGraph.
+    :type graph: list
+    :return: list -- the groups as bitsets of link indices, in the order they were found.
+
+    """
+    uncovered = list(graph)
+    groups = []
+    while True:
+        degrees = [countBits(edges) for edges in uncovered]
+        first = max(range(len(graph)), key=lambda k: degrees[k], default=None)
+        if first is None or degrees[first] == 0:
+            break
+        second = max(iterateBits(uncovered[first]), key=lambda k: degrees[k])
+        group = (1 << first) | (1 << second)
+        candidates = graph[first] & graph[second]
+        while candidates:
+            gain, degree, best = max((countBits(uncovered[k] & group), degrees[k], k)
+                                     for k in iterateBits(candidates))
+            if gain == 0:
+                break
+            group |= 1 << best
+            candidates &= graph[best]
+        for k in iterateBits(group):
+            uncovered[k] &= ~group
+        groups.append(group)
     return groups
 
 
-# registering export functions of types with Phobos
-entity_type_dict = {'srdf': {'export': exportSRDF,
-                             'extensions': ('srdf', 'xml')}
-                    }
+def buildBitmasks(collision_exclusives, robot, maxbits=maxCollisionBits):
+    """Sets the collision bitmasks of the links of a robot so that exactly the pairs of links which are not
+    collision-exclusive share a bit.
+
+    If more groups than maxbits are needed, the groups found last are dropped and the pairs of links which can
+    then no longer collide are reported as conflicts.
+
+    :param collision_exclusives: The pairs of link names whose collisions are disabled.
+    :type collision_exclusives: list
+    :param robot: The robot model dictionary, whose collision bitmasks are set.
+    :type robot: dict
+    :param maxbits: The number of bits available in the bitmask.
+    :type maxbits: int
+    :return: dict -- the report with the number of 'bits' needed, the 'maxbits', the 'groups' as lists of link
+        names and the 'conflicts' as pairs of link names which should collide but share no bit.
+
+    """
+    linknames = [link for link in robot['links'] if robot['links'][link].get('collision')]
+    names, graph = buildCollisionGraph(linknames, collision_exclusives)
+    groups = buildCollisionGroups(graph)
+    masks = [0] * len(names)
+    for bit, group in enumerate(groups[:maxbits]):
+        for k in iterateBits(group):
+            masks[k] |= 1 << bit
+    conflicts = [(names[i], names[j]) for i in range(len(names)) for j in iterateBits(graph[i])
+                 if j > i and not masks[i] & masks[j]]
+    for i, name in enumerate(names):
+        link = robot['links'][name]
+        link['collision_bitmask'] = masks[i]
+        for collision in link['collision'].values():
+            collision['bitmask'] = masks[i]
+    log("Collision bitmasks of " + str(len(names)) + " links need " + str(len(groups)) + " of "
+        + str(maxbits) + " bits.", "INFO", "buildBitmasks")
+    if conflicts:
+        log(str(len(conflicts)) + " pairs of links cannot collide with " + str(maxbits) + " bits: "
+            + ", ".join(a + "/" + b for a, b in conflicts[:10]) + (", ..." if len(conflicts) > 10 else ""),
+            "WARNING", "buildBitmasks")
+    return {'bits': len(groups), 'maxbits': maxbits, 'conflicts': conflicts,
+            'groups': [[names[k] for k in iterateBits(group)] for group in groups]}
@@ -37,6 +37,7 @@ import phobos.model.materials as materials
 import phobos.utils.general as gUtils
 import phobos.utils.io as ioUtils
 from phobos.phoboslog import log
+from phobos.utils.profiling import profiled, phase, count
 
 
 def sort_urdf_elements(elems):
@@ -104,7 +105,28 @@ def exportUrdf(model, outpath):
     if order_file_name in bpy.data.texts:
         stored_element_order = yaml.load(bpy.data.texts[order_file_name].as_string())
 
-    output = [xmlHeader, indent + '<robot name="' + model['name'] + '">\n\n']
+    with ioUtils.StreamWriter(filename) as output:
+        writeUrdf(output, model, outpath, stored_element_order)
+    # FIXME: different joint transformations needed for fixed joints
+    log("Writing model data to " + filename, "INFO", "exportModelToURDF")
+
+
+def writeUrdf(output, model, outpath, stored_element_order=None):
+    """This function writes the URDF of a given model line by line to an output, which can be any object
+    providing *append*, e.g. a list or a phobos.utils.io.StreamWriter.
+
+    :param output: The output to append the lines of the URDF to.
+    :type output: list or StreamWriter
+    :param model: Dictionary of the model to be exported as URDF.
+    :type model: dict
+    :param outpath: The path the URDF is exported to.
+    :type outpath: str
+    :param stored_element_order: The order of the model's elements as stored in the .blend file.
+    :type stored_element_order: dict
+
+    """
+    output.append(xmlHeader)
+    output.append(indent + '<robot name="' + model['name'] + '">\n\n')
     # export link information
     if stored_element_order is None:
         sorted_link_keys = sorted(model['links'])
@@ -243,10 +265,6 @@ def exportUrdf(model, outpath):
                 output.append(indent * 2 + '</material>\n\n')
     # finish the export
     output.append(indent + '</robot>\n')
-    with open(filename, 'w') as outputfile:
-        outputfile.write(''.join(output))
-    # FIXME: different joint transformations needed for fixed joints
-    log("Writing model data to " + filename, "INFO", "exportModelToURDF")
 
 
 def store_element_order(element_order, path):
@@ -495,42 +513,69 @@ def parsePose(origin):
     return pose
 
 
+@profiled
 def importUrdf(filepath):
     """This function parses the whole URDF representation of the model and builds the model dictionary from it.
     The created model is stored in the model value of the parser and the URDF file is specified by the filepath
     given to the Parser.
 
+    The file is parsed incrementally in a single pass. Every top-level element is discarded as soon as its links,
+    joints and materials are parsed, so that memory use does not grow with the size of the file.
+
     :return: Nothing.
 
     """
     model = {}
     #element_order = {'links': [], 'joints': [], 'viscol': {}, 'materials': []}
     log("Parsing URDF model from " + filepath, "INFO", 'importUrdf')
-    tree = ET.parse(filepath)
-    root = tree.getroot()#[0]
-    model["name"] = root.attrib["name"]
-    if 'version' in root.attrib:
-        model["version"] = root.attrib['version']
-
-    # parse links
     links = {}
-    log("Parsing links...", "INFO", 'importUrdf')
-    for link in root.iter('link'):
-        links[link.attrib['name']] = parseLink(link, filepath)
-        #element_order['links'].append(links.attrib['name'])
-        #viscol_order = {'visual': [], 'collision': []}
-    model['links'] = links
-
-    # parse joints
     joints = {}
-    log("Parsing joints...", "INFO", 'importUrdf')
-    for joint in root.iter('joint'):
-        if joint.find('parent') is not None:  # this is needed as there are "joint" tags e.g. in transmission
-            newjoint, pose = parseJoint(joint)
-            #element_order['joints'].append(joint.attrib['name'])
-            model['links'][newjoint['child']]['pose'] = pose
-            joints[newjoint['name']] = newjoint
+    jointposes = []
+    model['materials'] = []
+    materialindex = set()
+    root = None
+    depth = 0
+    log("Parsing links, joints and materials...", "INFO", 'importUrdf')
+    phase('parsing')
+    for event, element in ET.iterparse(filepath, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+                model["name"] = root.attrib["name"]
+                if 'version' in root.attrib:
+                    model["version"] = root.attrib['version']
+            depth += 1
+            continue
+        depth -= 1
+        if element.tag == 'link':
+            links[element.attrib['name']] = parseLink(element, filepath)
+            #element_order['links'].append(links.attrib['name'])
+            #viscol_order = {'visual': [], 'collision': []}
+        elif element.tag == 'joint':
+            if element.find('parent') is not None:  # this is needed as there are "joint" tags e.g. in transmission
+                newjoint, pose = parseJoint(element)
+                #element_order['joints'].append(joint.attrib['name'])
+                jointposes.append((newjoint['child'], pose))
+                joints[newjoint['name']] = newjoint
+        elif element.tag == 'material':
+            newmaterial = parseMaterial(element)
+            if newmaterial is not None:
+                key = materialKey(newmaterial)
+                if key not in materialindex:
+                    materialindex.add(key)
+                    model['materials'].append(newmaterial)
+        if depth == 1:
+            # all information of this top-level element has been parsed
+            root.remove(element)
+    model['links'] = links
     model['joints'] = joints
+    count('links', len(links))
+    count('joints', len(joints))
+
+    # joints may precede their child links in the file, so their poses are applied after parsing
+    phase('poses')
+    for child, pose in jointposes:
+        model['links'][child]['pose'] = pose
 
     # find any links that still have no pose (most likely because they had no parent)
     for link in links:
@@ -539,20 +584,14 @@ def importUrdf(filepath):
 
     # write parent-child information to nodes
     log("Writing parent-child information to nodes...", "INFO", 'importUrdf')
+    phase('tree')
     for j in model['joints']:
         joint = model['joints'][j]
         model['links'][joint['child']]['parent'] = joint['parent']
 
-    # parse materials
-    model['materials'] = []
-    log("Parsing materials..", 'INFO', 'importUrdf')
-    for material in root.iter('material'):
-        newmaterial = {a: material.attrib[a] for a in material.attrib}
-        color = material.find('color')
-        if color is not None:
-            newmaterial['color'] = gUtils.parse_text(color.attrib['rgba'])
-            if newmaterial not in model['materials']:
-                model['materials'].append(newmaterial)
+    # create materials
+    log("Creating materials..", 'INFO', 'importUrdf')
+    phase('materials')
     for m in model['materials']:
         #TODO: handle duplicate names? urdf_modelname_xxx?
         materials.createMaterial(m['name'], tuple(m['color'][0:3]), (1, 1, 1), m['color'][-1])
@@ -560,6 +599,34 @@ def importUrdf(filepath):
     return model
 
 
+def parseMaterial(material):
+    """This function parses a material from its xml element if it defines a color.
+
+    :param material: The xml element of the material.
+    :type material: xml.etree.ElementTree.Element
+    :return: dict -- the material or None if the element defines no color.
+
+    """
+    color = material.find('color')
+    if color is None:
+        return None
+    newmaterial = {a: material.attrib[a] for a in material.attrib}
+    newmaterial['color'] = gUtils.parse_text(color.attrib['rgba'])
+    return newmaterial
+
+
+def materialKey(material):
+    """Returns a hashable representation of a parsed material, so that duplicates can be detected.
+
+    :param material: The material as returned by parseMaterial.
+    :type material: dict
+    :return: tuple
+
+    """
+    return tuple(sorted((key, tuple(value) if isinstance(value, list) else value)
+                        for key, value in material.items()))
+
+
 def parseLink(link, sourcefilepath=None):
     """This function parses the link from the given link dict object.
 
@@ -653,10 +720,3 @@ def parseJoint(joint):
     #safety_controller
     return newjoint, pose
 
-
-# registering export functions of types with Phobos
-entity_type_dict = {'urdf': {'export': exportUrdf,
-                             'import': importUrdf,
-                             'extensions': ('urdf', 'xml')}
-                    }
-
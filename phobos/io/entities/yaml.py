@@ -1,7 +1,6 @@
-import yaml
 import os
-from datetime import datetime
 import phobos.defs as defs
+import phobos.utils.io as ioUtils
 from phobos.phoboslog import log
 
 
@@ -15,15 +14,9 @@ def exportYAML(model, path):
 
     """
     log("phobos YAML export: Writing model data to " + path, "INFO", "exportModelToYAML")
-    with open(os.path.join(path, model['name'] + '.yaml'), 'w') as outputfile:
-        outputfile.write('# YAML dump of robot model "' + model['name'] + '", ' + datetime.now().strftime(
-            "%Y%m%d_%H:%M") + "\n")
+    with ioUtils.StreamWriter(os.path.join(path, model['name'] + '.yaml')) as outputfile:
+        outputfile.write('# YAML dump of robot model "' + model['name'] + '", ' + model['date'] + "\n")
         outputfile.write("# created with Phobos" + defs.version + " - https://github.com/rock-simulation/phobos\n\n")
-        outputfile.write(yaml.dump(
+        outputfile.write(ioUtils.dumpYAML(
             model))  # default_flow_style=False)) #last parameter prevents inline formatting for lists and dictionaries
 
-
-# registering export functions of types with Phobos
-entity_type_dict = {'yaml': {'export': exportYAML,
-                             'extensions': ('yaml', 'yml')}
-                    }
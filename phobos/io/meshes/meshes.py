@@ -31,18 +31,32 @@ Created on 12 Sep 2016
 """
 
 import os
+import hashlib
 import bpy
+import numpy as np
 import phobos.utils.naming as nUtils
 import phobos.utils.blender as bUtils
 from phobos.phoboslog import log
+from phobos.io.meshes import mesh_types
+
+
+# binary STL: 80 byte header, number of triangles and 50 bytes per triangle
+stlHeader = b'Exported by Phobos'.ljust(80, b' ')
+stlTriangle = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attributes', '<u2')])
 
 
 def exportMesh(obj, path, meshtype):
+    """Exports the mesh of an object using Blender's export operators, which work on the selection.
+    This is still used for Collada, obj and stl files are written directly by writeObj and writeStl.
+
+    """
     objname = nUtils.getObjectName(obj)
     tmpobjname = obj.name
     obj.name = 'tmp_export_666'  # surely no one will ever name an object like so
     tmpobject = bUtils.createPrimitive(objname, 'box', (1.0, 1.0, 1.0))
+    boxmesh = tmpobject.data
     tmpobject.data = obj.data  # copy the mesh here
+    bpy.data.meshes.remove(boxmesh)
     outpath = os.path.join(path, obj.data.name + "." + meshtype)
     if meshtype == 'obj':
         bpy.ops.export_scene.obj(filepath=outpath, use_selection=True, use_normals=True, use_materials=False,
@@ -60,6 +74,167 @@ def exportMesh(obj, path, meshtype):
     obj.name = tmpobjname
 
 
+def getMeshBuffers(obj, use_mesh_modifiers=True):
+    """Reads the geometry of an object's mesh into numpy arrays, without changing the scene.
+    The coordinates are those of the mesh itself, i.e. the object's transformation is not applied.
+
+    :param obj: The object to read the mesh of.
+    :type obj: bpy.types.Object
+    :param use_mesh_modifiers: Whether to read the mesh with the object's modifiers applied.
+    :type use_mesh_modifiers: bool
+    :return: dict -- with the arrays 'vertices', 'loops' (vertex index per loop), 'loop_starts', 'loop_totals',
+        'smooth', 'vertex_normals', 'polygon_normals', 'triangles' (vertex indices of the tessellated polygons) and
+        'uvs' (None if the mesh has no UV map), and the 'name' of the object and 'mesh' name.
+
+    """
+    data = obj.data
+    if use_mesh_modifiers and obj.modifiers:
+        # a temporary mesh with the modifiers applied, which is removed again below
+        data = obj.to_mesh(bpy.context.scene, True, 'PREVIEW')
+    try:
+        nvertices, nloops, npolygons = len(data.vertices), len(data.loops), len(data.polygons)
+        buffers = {'name': nUtils.getObjectName(obj), 'mesh': obj.data.name,
+                   'vertices': np.empty(nvertices * 3, dtype=np.float32),
+                   'vertex_normals': np.empty(nvertices * 3, dtype=np.float32),
+                   'loops': np.empty(nloops, dtype=np.int32),
+                   'loop_starts': np.empty(npolygons, dtype=np.int32),
+                   'loop_totals': np.empty(npolygons, dtype=np.int32),
+                   'polygon_normals': np.empty(npolygons * 3, dtype=np.float32),
+                   'smooth': np.empty(npolygons, dtype=np.bool_),
+                   'uvs': None}
+        data.vertices.foreach_get('co', buffers['vertices'])
+        data.vertices.foreach_get('normal', buffers['vertex_normals'])
+        data.loops.foreach_get('vertex_index', buffers['loops'])
+        data.polygons.foreach_get('loop_start', buffers['loop_starts'])
+        data.polygons.foreach_get('loop_total', buffers['loop_totals'])
+        data.polygons.foreach_get('normal', buffers['polygon_normals'])
+        data.polygons.foreach_get('use_smooth', buffers['smooth'])
+        # Blender's tessellation also splits concave polygons correctly
+        data.calc_tessface()
+        tessfaces = np.empty(len(data.tessfaces) * 4, dtype=np.int32)
+        data.tessfaces.foreach_get('vertices_raw', tessfaces)
+        buffers['triangles'] = splitTessfaces(tessfaces.reshape(-1, 4))
+        if data.uv_layers.active:
+            buffers['uvs'] = np.empty(nloops * 2, dtype=np.float32)
+            data.uv_layers.active.data.foreach_get('uv', buffers['uvs'])
+            buffers['uvs'] = buffers['uvs'].reshape(-1, 2)
+    finally:
+        if data is not obj.data:
+            bpy.data.meshes.remove(data)
+    for key in ('vertices', 'vertex_normals', 'polygon_normals'):
+        buffers[key] = buffers[key].reshape(-1, 3)
+    return buffers
+
+
+def hashMeshBuffers(buffers):
+    """Returns a SHA-1 hash of the geometry in mesh buffers as returned by getMeshBuffers, including the names.
+
+    """
+    sha = hashlib.sha1((buffers['name'] + '/' + buffers['mesh']).encode('utf-8'))
+    for key in ('vertices', 'vertex_normals', 'loops', 'loop_starts', 'loop_totals', 'polygon_normals', 'smooth',
+                'uvs'):
+        if buffers[key] is not None:
+            sha.update(key.encode('utf-8'))
+            sha.update(buffers[key].tobytes())
+    return sha.hexdigest()
+
+
+def splitTessfaces(tessfaces):
+    """Splits the tessellated faces of a mesh into triangles, each quad (v0, v1, v2, v3) into the triangles
+    (v0, v1, v2) and (v2, v3, v0) like Blender's STL exporter does.
+
+    :param tessfaces: The vertex indices of the tessfaces as read from their 'vertices_raw', of shape (faces, 4).
+        The fourth index of triangles is 0, which Blender never uses as fourth index of a quad.
+    :type tessfaces: numpy.ndarray
+    :return: numpy.ndarray -- the vertex indices of the triangles, of shape (number of triangles, 3)
+
+    """
+    triangles = np.stack((tessfaces[:, [0, 1, 2]], tessfaces[:, [2, 3, 0]]), axis=1)
+    keep = np.ones((len(tessfaces), 2), dtype=np.bool_)
+    keep[:, 1] = tessfaces[:, 3] != 0
+    return triangles[keep]
+
+
+def uniqueRows(array):
+    """Returns the unique rows of a 2D array in order of their first occurrence and the index of each row in them.
+
+    """
+    array = np.ascontiguousarray(array)
+    rows = array.view(np.dtype((np.void, array.dtype.itemsize * array.shape[1]))).ravel()
+    _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    # np.unique sorts the rows, renumber them by their first occurrence
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return array[first[order]], rank[inverse.ravel()]
+
+
+def writeStl(buffers, filepath):
+    """Writes the mesh buffers to a binary STL file.
+
+    :param buffers: The mesh buffers as returned by getMeshBuffers.
+    :type buffers: dict
+    :param filepath: The path of the file to write.
+    :type filepath: str
+
+    """
+    corners = buffers['vertices'][buffers['triangles']]
+    triangles = np.zeros(len(corners), dtype=stlTriangle)
+    triangles['vertices'] = corners
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    np.divide(normals, lengths[:, None], out=normals, where=lengths[:, None] > 0)
+    triangles['normal'] = normals
+    with open(filepath, 'wb') as stlfile:
+        stlfile.write(stlHeader)
+        stlfile.write(np.array([len(triangles)], dtype='<u4').tobytes())
+        triangles.tofile(stlfile)
+
+
+def writeObj(buffers, filepath):
+    """Writes the mesh buffers to a Wavefront obj file the way Blender's obj exporter does with its default
+    axes (forward -Z, up Y), including normals and UV coordinates, but without materials.
+
+    :param buffers: The mesh buffers as returned by getMeshBuffers.
+    :type buffers: dict
+    :param filepath: The path of the file to write.
+    :type filepath: str
+
+    """
+    # Blender's Z-up to the Y-up convention of obj files
+    axes = np.array(((1, 0, 0), (0, 0, -1), (0, 1, 0)), dtype=np.float32)
+    loops, totals = buffers['loops'], buffers['loop_totals']
+    polygons = np.repeat(np.arange(len(totals)), totals)
+    # flat polygons use their face normal, smooth polygons the normals of their vertices
+    loopnormals = np.where(buffers['smooth'][polygons, None], buffers['vertex_normals'][loops],
+                           buffers['polygon_normals'][polygons])
+    # adding 0 turns -0.0 into 0.0, which would otherwise be a different row
+    normals, normalindices = uniqueRows(np.round(loopnormals, 4) + 0.0)
+    if buffers['uvs'] is not None:
+        uvs, uvindices = uniqueRows(buffers['uvs'])
+        corners = np.stack((loops, uvindices, normalindices), axis=1) + 1
+        cornerformat = '{0}/{1}/{2}'
+    else:
+        uvs = np.empty((0, 2))
+        corners = np.stack((loops, normalindices), axis=1) + 1
+        cornerformat = '{0}//{1}'
+
+    name = buffers['name'] if buffers['name'] == buffers['mesh'] else buffers['name'] + '_' + buffers['mesh']
+    with open(filepath, 'w', buffering=1 << 20) as objfile:
+        objfile.write('# Phobos OBJ File\no ' + name.replace(' ', '_') + '\n')
+        np.savetxt(objfile, buffers['vertices'].dot(axes), fmt='v %.6f %.6f %.6f')
+        np.savetxt(objfile, uvs, fmt='vt %.6f %.6f')
+        np.savetxt(objfile, normals.dot(axes), fmt='vn %.4f %.4f %.4f')
+        cornerstrings = [cornerformat.format(*corner) for corner in corners.tolist()]
+        smooth = None
+        for start, total, polysmooth in zip(buffers['loop_starts'].tolist(), totals.tolist(),
+                                            buffers['smooth'].tolist()):
+            if polysmooth != smooth:
+                smooth = polysmooth
+                objfile.write('s 1\n' if smooth else 's off\n')
+            objfile.write('f ' + ' '.join(cornerstrings[start:start + total]) + '\n')
+
+
 def importMesh(filepath, meshtype):
     # tag all objects
     for obj in bpy.data.objects:
@@ -67,7 +242,7 @@ def importMesh(filepath, meshtype):
 
     # import mesh
     try:
-        mesh_type_dict[meshtype]['import'](filepath)
+        mesh_types[meshtype]['import'](filepath)
     except KeyError:
         log('Unknown mesh type: ' + meshtype, 'ERROR', 'importMesh')
 
@@ -104,28 +279,32 @@ def importDae(filepath):
     bpy.ops.wm.collada_import(filepath=filepath)
 
 
-def exportObj(obj, path):
+def exportObj(obj, path, use_mesh_modifiers=True):
     """This function exports a specific object to a chosen path as an .obj
 
     :param path: The path you want the object export to. *without the filename!*
     :type path: str
     :param obj: The blender object you want to export.
     :type obj: .types.Object
+    :param use_mesh_modifiers: Whether to export the mesh with the object's modifiers applied.
+    :type use_mesh_modifiers: bool
 
     """
-    exportMesh(obj, path, 'obj')
+    writeObj(getMeshBuffers(obj, use_mesh_modifiers), os.path.join(path, obj.data.name + '.obj'))
 
 
-def exportStl(obj, path):
+def exportStl(obj, path, use_mesh_modifiers=True):
     """This function exports a specific object to a chosen path as a .stl
 
     :param path: The path you want the object exported to. *without filename!*
     :type path: str
     :param obj: The blender object you want to export.
     :type obj: bpy.types.Object
+    :param use_mesh_modifiers: Whether to export the mesh with the object's modifiers applied.
+    :type use_mesh_modifiers: bool
 
     """
-    exportMesh(obj, path, 'stl')
+    writeStl(getMeshBuffers(obj, use_mesh_modifiers), os.path.join(path, obj.data.name + '.stl'))
 
 
 def exportDae(obj, path):
@@ -139,15 +318,3 @@ def exportDae(obj, path):
     """
     exportMesh(obj, path, 'dae')
 
-
-# registering mesh types with Phobos
-mesh_type_dict = {'obj': {'export': exportObj,
-                          'import': importObj,
-                          'extensions': ('obj',)},
-                  'stl': {'export': exportStl,
-                          'import': importStl,
-                          'extensions': ('stl',)},
-                  'dae': {'export': exportDae,
-                          'import': importDae,
-                          'extensions': ('dae',)}
-                  }
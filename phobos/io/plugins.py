@@ -0,0 +1,156 @@
+#!/usr/bin/python
+# coding=utf-8
+
+"""
+.. module:: phobos.io.plugins
+    :platform: Unix, Windows, Mac
+    :synopsis: This module registers the entity, mesh and scene plugins from their manifests
+
+.. moduleauthor:: Kai von Szadkowski, Simon Reichel
+
+Copyright 2017, University of Bremen & DFKI GmbH Robotics Innovation Center
+
+This file is part of Phobos, a Blender Add-On to edit robot models.
+
+Phobos is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation, either version 3
+of the License, or (at your option) any later version.
+
+Phobos is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
+
+Plugins are described by a plugins.yml manifest in their folder, for example:
+
+    entities:
+        urdf:
+            module: urdf
+            extensions: [urdf, xml]
+            export: exportUrdf
+            import: importUrdf
+
+The manifest lists the formats of each kind (entities, meshes or scenes) with the module implementing them,
+their file extensions and the names of the functions providing their capabilities (export, import, derive,
+write). The modules are only imported when one of these functions is called for the first time.
+"""
+
+import os
+import sys
+import importlib
+import importlib.util
+import yaml
+
+# name of the manifest file of a plugin folder
+manifestName = 'plugins.yml'
+
+# kinds of plugins which can be listed in a manifest
+pluginKinds = ('entities', 'meshes', 'scenes')
+
+
+class PluginFunction(object):
+    """A function of a plugin module, which imports the module when it is called for the first time.
+    It can be pickled, e.g. to be called in another process, which then imports the module itself.
+
+    """
+    def __init__(self, module, name, path=None):
+        self.module = module
+        self.name = name
+        self.path = path
+        self.function = None
+
+    def __call__(self, *args, **kwargs):
+        if self.function is None:
+            self.function = getattr(importPluginModule(self.module, self.path), self.name)
+        return self.function(*args, **kwargs)
+
+    def __getstate__(self):
+        return {'module': self.module, 'name': self.name, 'path': self.path, 'function': None}
+
+    def __repr__(self):
+        return '<plugin function ' + self.module + '.' + self.name + '>'
+
+
+def importPluginModule(module, path=None):
+    """Imports the module of a plugin, either from a package of Phobos or, for third-party plugins, from a file.
+
+    :param module: The full name of the module.
+    :type module: str
+    :param path: The path of the module's file, None for modules of Phobos.
+    :type path: str
+    :return: module
+
+    """
+    if path is None:
+        return importlib.import_module(module)
+    if module not in sys.modules:
+        spec = importlib.util.spec_from_file_location(module, path)
+        pluginmodule = importlib.util.module_from_spec(spec)
+        sys.modules[module] = pluginmodule
+        try:
+            spec.loader.exec_module(pluginmodule)
+        except Exception:
+            del sys.modules[module]
+            raise
+    return sys.modules[module]
+
+
+def loadPluginManifest(folder, package=None):
+    """Reads the plugins.yml manifest of a folder and returns the formats it registers, without importing
+    any of their modules.
+
+    :param folder: The folder containing the manifest and the plugin modules.
+    :type folder: str
+    :param package: The package of the folder for plugins of Phobos, None for third-party plugins.
+    :type package: str
+    :return: dict -- the dictionaries of the formats of each kind of plugin, with their extensions as tuple and
+        a PluginFunction for each capability.
+
+    """
+    with open(os.path.join(folder, manifestName), 'r') as manifestfile:
+        manifest = yaml.safe_load(manifestfile) or {}
+    plugins = {kind: {} for kind in pluginKinds}
+    for kind in pluginKinds:
+        for formatname, entry in (manifest.get(kind) or {}).items():
+            if package:
+                module, path = package + '.' + entry['module'], None
+            else:
+                module = 'phobosplugins.' + entry['module']
+                path = os.path.join(folder, entry['module'] + '.py')
+            plugins[kind][formatname] = {key: PluginFunction(module, value, path) for key, value in entry.items()
+                                         if key not in ('module', 'extensions')}
+            if 'extensions' in entry:
+                plugins[kind][formatname]['extensions'] = tuple(entry['extensions'])
+    return plugins
+
+
+def registerPluginFolder(folder):
+    """Registers the third-party plugins listed in the manifest of a folder, e.g. the export plugins folder of the
+    preferences, with the entity, mesh and scene types of Phobos.
+
+    :param folder: The folder containing the manifest and the plugin modules.
+    :type folder: str
+    :return: dict -- the registered formats of each kind of plugin, empty if there is no manifest.
+
+    """
+    from phobos.io import entities, meshes, scenes
+    from phobos.phoboslog import log
+    if not folder or not os.path.isfile(os.path.join(folder, manifestName)):
+        return {kind: {} for kind in pluginKinds}
+    try:
+        plugins = loadPluginManifest(os.path.abspath(folder))
+    except (OSError, yaml.YAMLError, KeyError, AttributeError) as error:
+        log("Could not read plugin manifest in " + folder + ": " + str(error), "ERROR", "registerPluginFolder")
+        return {kind: {} for kind in pluginKinds}
+    entities.entity_types.update(plugins['entities'])
+    meshes.mesh_types.update(plugins['meshes'])
+    scenes.scene_types.update(plugins['scenes'])
+    for kind in pluginKinds:
+        if plugins[kind]:
+            log("Registered " + kind + " plugins from " + folder + ": " + ", ".join(sorted(plugins[kind])),
+                "INFO", "registerPluginFolder")
+    return plugins
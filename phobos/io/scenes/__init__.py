@@ -1,13 +1,8 @@
 import os
-import imp
+from phobos.io.plugins import loadPluginManifest
 
-scene_types = dict()
-structure_export_folders = []
-for filename in os.listdir(os.path.dirname(__file__)):
-    mod_name, file_ext = os.path.splitext(os.path.split(filename)[-1])
-    if (filename != os.path.split(__file__)[-1]) and (file_ext.lower() == '.py'):
-        py_mod = imp.load_source(mod_name, os.path.join(os.path.dirname(__file__), filename))
+# the plugin modules are imported when their functions are first called, not with the package
+lazyimport = True
 
-        if hasattr(py_mod, 'scene_type_dict'):
-            # scene_types = {**scene_types, **py_mod.scene_type_dict}  # unpacking (> Python 3.5)
-            scene_types.update(py_mod.scene_type_dict.copy())
+scene_types = loadPluginManifest(os.path.dirname(__file__), __name__)['scenes']
+structure_export_folders = []
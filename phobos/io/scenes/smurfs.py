@@ -26,13 +26,12 @@ Created on 3 Nov 2016
 @author: Kai von Szadkowski
 """
 
-import yaml
 from datetime import datetime
 import bpy
 from phobos.defs import version
 from phobos.utils.general import epsilonToZero
 from phobos.phoboslog import log
-from phobos.utils.io import securepath
+from phobos.utils.io import securepath, dumpYAML
 
 
 def exportSMURFScene(entities, path):
@@ -55,9 +54,5 @@ def exportSMURFScene(entities, path):
         outputfile.write(sceneinfo)
         epsilon = 10**(-bpy.data.worlds[0].phobosexportsettings.decimalPlaces)  # TODO: implement this separately
         entitiesdict = epsilonToZero({'entities': entities}, epsilon, bpy.data.worlds[0].phobosexportsettings.decimalPlaces)
-        outputfile.write(yaml.dump(entitiesdict))
+        outputfile.write(dumpYAML(entitiesdict))
 
-# registering import/export functions of types with Phobos
-scene_type_dict = {'smurfs': {'export': exportSMURFScene,
-                              'extensions': ('smurfs',)}
-                    }
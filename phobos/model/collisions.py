@@ -0,0 +1,308 @@
+#!/usr/bin/python
+# coding=utf-8
+
+"""
+.. module:: phobos.model.collisions
+    :platform: Unix, Windows, Mac
+    :synopsis: This module finds the pairs of links whose collisions can be disabled by sampling joint configurations
+
+.. moduleauthor:: Kai von Szadkowski, Simon Reichel
+
+Copyright 2017, University of Bremen & DFKI GmbH Robotics Innovation Center
+
+This file is part of Phobos, a Blender Add-On to edit robot models.
+
+Phobos is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation, either version 3
+of the License, or (at your option) any later version.
+
+Phobos is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
+
+The pairs of links are classified like the MoveIt setup assistant does for the disable_collisions of an SRDF:
+
+- Adjacent: the links are connected by a joint (links without collision objects are skipped),
+- Always: the links collide in (almost) every sampled configuration,
+- Never: the links do not collide in any sampled configuration.
+
+The link poses of all samples are computed at once with the KinematicModel of phobos.model.kinematics. Pairs are
+tested with the axis-aligned bounding boxes of the links first, then with their oriented bounding boxes, both for
+all samples at once. Only the remaining samples are tested with BVH trees of the collision geometry
+(mathutils.bvhtree), optionally by a pool of workers.
+The triangle test does not detect a link completely inside another one.
+"""
+
+import os
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from mathutils.bvhtree import BVHTree
+
+from phobos.phoboslog import log
+from phobos.io.meshes.meshes import getMeshBuffers
+from phobos.model.kinematics import KinematicModel, poseToMatrix
+
+# number of samples whose link poses are computed at once
+sampleChunkSize = 2000
+
+
+def getPrimitiveTriangles(geometry):
+    """Returns a triangle mesh approximating a primitive collision geometry of a model dictionary.
+
+    :param geometry: The geometry dictionary.
+    :type geometry: dict
+    :return: tuple -- vertices as (n, 3) and triangles as (m, 3) array, or None for unknown geometries.
+
+    """
+    gtype = geometry['type']
+    if gtype in ('box', 'mesh'):
+        # meshes without mesh data are approximated by their bounding box
+        hx, hy, hz = (s / 2 for s in geometry['size'])
+        vertices = np.array([(x, y, z) for x in (-hx, hx) for y in (-hy, hy) for z in (-hz, hz)])
+        triangles = np.array([(0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5), (0, 4, 5), (0, 5, 1),
+                              (2, 3, 7), (2, 7, 6), (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3)])
+        return vertices, triangles
+    if gtype in ('cylinder', 'capsule', 'sphere'):
+        radius = geometry['radius']
+        if gtype == 'sphere':
+            halflength = radius
+        else:
+            halflength = geometry['length'] / 2 + (radius if gtype == 'capsule' else 0.0)
+        segments = 16
+        angles = np.arange(segments) * 2 * np.pi / segments
+        ring = np.stack((radius * np.cos(angles), radius * np.sin(angles), np.zeros(segments)), axis=1)
+        vertices = np.concatenate((ring - (0, 0, halflength), ring + (0, 0, halflength),
+                                   [(0, 0, -halflength), (0, 0, halflength)]))
+        k = np.arange(segments)
+        n = (k + 1) % segments
+        triangles = np.concatenate((np.stack((k, n, segments + n), axis=1),
+                                    np.stack((k, segments + n, segments + k), axis=1),
+                                    np.stack((np.full(segments, 2 * segments), n, k), axis=1),
+                                    np.stack((np.full(segments, 2 * segments + 1), segments + k, segments + n),
+                                             axis=1)))
+        return vertices, triangles
+    return None
+
+
+def getLinkGeometry(model, linkname):
+    """Collects the collision objects of a link as one triangle mesh in the link's frame.
+
+    :param model: The robot model dictionary.
+    :type model: dict
+    :param linkname: The name of the link.
+    :type linkname: str
+    :return: tuple -- vertices as (n, 3) and triangles as (m, 3) array, or None if the link has no collision.
+
+    """
+    vertices, triangles, count = [], [], 0
+    for collision in model['links'][linkname].get('collision', {}).values():
+        geometry = collision['geometry']
+        mesh = None
+        if geometry['type'] == 'mesh' and model.get('meshes', {}).get(geometry['filename']) is not None:
+            buffers = getMeshBuffers(model['meshes'][geometry['filename']], use_mesh_modifiers=False)
+            mesh = (buffers['vertices'].astype(np.float64) * geometry.get('scale', (1.0, 1.0, 1.0)),
+                    buffers['triangles'])
+        elif 'size' in geometry or geometry['type'] != 'mesh':
+            mesh = getPrimitiveTriangles(geometry)
+        if mesh is None:
+            log("Skipping collision " + collision['name'] + " without geometry data.", "WARNING",
+                "getLinkGeometry")
+            continue
+        matrix = poseToMatrix(collision.get('pose'))
+        vertices.append(mesh[0].dot(matrix[:3, :3].T) + matrix[:3, 3])
+        triangles.append(mesh[1] + count)
+        count += len(mesh[0])
+    if not vertices:
+        return None
+    return np.concatenate(vertices), np.concatenate(triangles).astype(np.int64)
+
+
+def getAdjacentPairs(model, linknames):
+    """Returns the pairs of links with collision objects which are connected by a joint, skipping the links without
+    collision objects in between.
+
+    """
+    parents = {joint['child']: joint['parent'] for joint in model['joints'].values()}
+    linkset = set(linknames)
+    pairs = set()
+    for linkname in linknames:
+        parent = parents.get(linkname)
+        while parent is not None and parent not in linkset:
+            parent = parents.get(parent)
+        if parent is not None:
+            pairs.add(tuple(sorted((linkname, parent))))
+    return pairs
+
+
+def testBoxes(transforms, centers, halves, first, second):
+    """Tests the oriented bounding boxes of two links for overlap in all samples (separating axis theorem).
+
+    :return: numpy.ndarray -- bool per sample, True if the boxes overlap.
+
+    """
+    ra = transforms[:, first, :3, :3]
+    rb = transforms[:, second, :3, :3]
+    ca = np.einsum('sij,j->si', ra, centers[first]) + transforms[:, first, :3, 3]
+    cb = np.einsum('sij,j->si', rb, centers[second]) + transforms[:, second, :3, 3]
+    # rotation and translation of b in the frame of a
+    r = np.matmul(ra.transpose(0, 2, 1), rb)
+    t = np.einsum('sji,sj->si', ra, cb - ca)
+    absr = np.abs(r) + 1e-9
+    a, b = halves[first], halves[second]
+    separated = np.zeros(len(transforms), dtype=bool)
+    for i in range(3):
+        separated |= np.abs(t[:, i]) > a[i] + absr[:, i, :].dot(b)
+        separated |= np.abs(np.einsum('si,si->s', t, r[:, :, i])) > absr[:, :, i].dot(a) + b[i]
+    for i in range(3):
+        i1, i2 = (i + 1) % 3, (i + 2) % 3
+        for j in range(3):
+            j1, j2 = (j + 1) % 3, (j + 2) % 3
+            ra_ = a[i1] * absr[:, i2, j] + a[i2] * absr[:, i1, j]
+            rb_ = b[j1] * absr[:, i, j2] + b[j2] * absr[:, i, j1]
+            separated |= np.abs(t[:, i2] * r[:, i1, j] - t[:, i1] * r[:, i2, j]) > ra_ + rb_
+    return ~separated
+
+
+def testPair(firstgeometry, secondgeometry, relatives, maxfree, collided=False):
+    """Tests a pair of links with the BVH trees of their geometry, also used by the workers.
+
+    :param firstgeometry: The vertices and triangles of the first link.
+    :type firstgeometry: tuple
+    :param secondgeometry: The vertices and triangles of the second link.
+    :type secondgeometry: tuple
+    :param relatives: The transformations of the second link into the frame of the first for the samples to test.
+    :type relatives: numpy.ndarray
+    :param maxfree: The number of non-colliding samples after which testing stops.
+    :type maxfree: int
+    :param collided: Whether the pair collided in samples tested before.
+    :type collided: bool
+    :return: tuple -- the number of collisions and of tested samples.
+
+    """
+    vertices, triangles = firstgeometry
+    tree = BVHTree.FromPolygons(vertices.tolist(), triangles.tolist())
+    vertices, triangles = secondgeometry
+    triangles = triangles.tolist()
+    collisions = tested = 0
+    for relative in relatives:
+        tested += 1
+        other = BVHTree.FromPolygons((vertices.dot(relative[:3, :3].T) + relative[:3, 3]).tolist(), triangles)
+        if tree.overlap(other):
+            collisions += 1
+        if (collided or collisions) and tested - collisions > maxfree:
+            # the pair collides in some, but not (almost) all samples
+            break
+    return collisions, tested
+
+
+def generateDisabledCollisions(model, samples=10000, always=0.95, seed=0, jobs=1, processes=False):
+    """Finds the pairs of links whose collisions can be disabled by sampling random joint configurations.
+
+    The samples are processed in chunks, and the candidate samples of each pair are tested as soon as their chunk
+    is computed, so only the transformations of a few chunks of one pair are kept at a time.
+
+    :param model: The robot model dictionary.
+    :type model: dict
+    :param samples: The number of sampled joint configurations.
+    :type samples: int
+    :param always: The fraction of samples in which a pair has to collide to be classified as always colliding.
+    :type always: float
+    :param seed: The seed of the random number generator.
+    :type seed: int
+    :param jobs: The number of workers for the BVH tests (0: one per CPU, 1: no workers).
+    :type jobs: int
+    :param processes: Whether the workers are forked processes instead of threads. Processes need to be forked
+        from Blender, as mathutils is not available in the processes spawned on Windows or macOS.
+    :type processes: bool
+    :return: list -- of (link1, link2, reason) tuples sorted by link names, reason being 'Adjacent', 'Always' or
+        'Never'.
+
+    """
+    start = time.perf_counter()
+    geometries = {}
+    linknames = []
+    for linkname in sorted(model['links']):
+        geometry = getLinkGeometry(model, linkname)
+        if geometry is not None:
+            geometries[len(linknames)] = geometry
+            linknames.append(linkname)
+    adjacent = getAdjacentPairs(model, linknames)
+    pairs = [(i, j) for i in range(len(linknames)) for j in range(i + 1, len(linknames))
+             if (linknames[i], linknames[j]) not in adjacent]
+    lower = np.array([geometries[i][0].min(axis=0) for i in range(len(linknames))]).reshape(-1, 3)
+    upper = np.array([geometries[i][0].max(axis=0) for i in range(len(linknames))]).reshape(-1, 3)
+    centers, halves = (lower + upper) / 2, (upper - lower) / 2
+
+    kinematics = KinematicModel(model)
+    linkindices = np.array([kinematics.index[linkname] for linkname in linknames], dtype=np.int64)
+    configurations = kinematics.sampleConfigurations(samples, seed)
+    maxfree = int((1 - always) * samples)
+    # the collisions found so far and the samples known to be free of collisions of each pair
+    collisions = {pair: 0 for pair in pairs}
+    free = {pair: 0 for pair in pairs}
+    testedpairs = set()
+    jobs = jobs or os.cpu_count() or 1
+    pool = (ProcessPoolExecutor if processes else ThreadPoolExecutor)(max_workers=jobs) if jobs > 1 else None
+    pending = deque()
+
+    def collect(pair, result):
+        collisions[pair] += result[0]
+        free[pair] += result[1] - result[0]
+
+    try:
+        for chunk in range(0, samples, sampleChunkSize):
+            transforms = kinematics.getTransforms(configurations[chunk:chunk + sampleChunkSize])[:, linkindices]
+            # axis-aligned boxes of the links in the root frame
+            worldcenters = np.einsum('slij,lj->sli', transforms[:, :, :3, :3], centers) + transforms[:, :, :3, 3]
+            worldhalves = np.einsum('slij,lj->sli', np.abs(transforms[:, :, :3, :3]), halves)
+            for pair in pairs:
+                i, j = pair
+                overlap = np.all(np.abs(worldcenters[:, i] - worldcenters[:, j])
+                                 <= worldhalves[:, i] + worldhalves[:, j], axis=1)
+                selected = np.flatnonzero(overlap)
+                if len(selected):
+                    selected = selected[testBoxes(transforms[selected], centers, halves, i, j)]
+                # samples without overlapping boxes are free of collisions, too
+                free[pair] += len(transforms) - len(selected)
+                if not len(selected) or (collisions[pair] and free[pair] > maxfree):
+                    continue
+                # pairs whose boxes overlap are tested with their geometry
+                testedpairs.add(pair)
+                args = (geometries[i], geometries[j],
+                        np.matmul(np.linalg.inv(transforms[selected, i]), transforms[selected, j]),
+                        maxfree - free[pair], collisions[pair] > 0)
+                if pool is None:
+                    collect(pair, testPair(*args))
+                    continue
+                pending.append((pair, pool.submit(testPair, *args)))
+                # only a few tasks per worker are queued, so the transformations do not pile up
+                while len(pending) > jobs * 4:
+                    queued, future = pending.popleft()
+                    collect(queued, future.result())
+        while pending:
+            queued, future = pending.popleft()
+            collect(queued, future.result())
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    disabled = [(a, b, 'Adjacent') for a, b in adjacent]
+    for pair in pairs:
+        # a pair whose testing stopped early collides in less than always * samples samples
+        if collisions[pair] == 0:
+            disabled.append((linknames[pair[0]], linknames[pair[1]], 'Never'))
+        elif collisions[pair] >= always * samples:
+            disabled.append((linknames[pair[0]], linknames[pair[1]], 'Always'))
+    disabled.sort()
+    log("Sampled " + str(samples) + " configurations of " + str(len(kinematics.joints)) + " joints for "
+        + str(len(pairs) + len(adjacent)) + " link pairs in " + '{0:.2f}'.format(time.perf_counter() - start)
+        + " s: " + str(len(testedpairs)) + " pairs tested with their geometry, " + str(len(disabled))
+        + " pairs disabled.", "INFO", "generateDisabledCollisions")
+    return disabled
@@ -59,6 +59,32 @@ def deriveGeometry(obj):
         return None
 
 
+# names of the mesh datablocks imported for each mesh file (by absolute path) and the counters of the current import
+meshimports = {'meshes': {}, 'instances': set(), 'loaded': 0, 'referenced': 0}
+
+
+def resetMeshImportStats():
+    """Resets the counters of loaded and referenced mesh files, e.g. before importing a new model.
+    Already imported meshes stay available for reuse.
+
+    """
+    meshimports['instances'] = set()
+    meshimports['loaded'] = 0
+    meshimports['referenced'] = 0
+
+
+def getMeshImportStats():
+    """Returns how many mesh files were loaded by createGeometry since the last call of resetMeshImportStats,
+    compared with how many times mesh files were referenced by visual and collision elements.
+
+    :return: dict -- with the numbers of 'loaded' files, 'referenced' files and unique (file path, scale) 'instances'.
+
+    """
+    return {'loaded': meshimports['loaded'],
+            'referenced': meshimports['referenced'],
+            'instances': len(meshimports['instances'])}
+
+
 def createGeometry(viscol, geomsrc):
     """Creates geometrical Blender object for visual or collision objects.
 
@@ -97,27 +123,37 @@ def createGeometry(viscol, geomsrc):
 
         bpy.context.scene.layers = bUtils.defLayers(defs.layerTypes[geomsrc])
         meshname = "".join(os.path.basename(geom["filename"]).split(".")[:-1])
-        if not os.path.isfile(geom_path):
+        meshpath = os.path.abspath(geom_path)
+        scale = tuple(geom['scale']) if 'scale' in geom else (1.0, 1.0, 1.0)
+        meshimports['referenced'] += 1
+        meshimports['instances'].add((meshpath, scale))
+        mesh = bpy.data.meshes.get(meshimports['meshes'].get(meshpath, ''))
+        if mesh:
+            # every file is only imported once, all other elements using it share the mesh datablock
+            log('Linking mesh ' + mesh.name + ' to ' + viscol['name'], 'DEBUG', 'createGeometry')
+            newgeom = bpy.data.objects.new(viscol['name'], mesh)
+            bpy.context.scene.objects.link(newgeom)
+            newgeom.layers = bUtils.defLayers(defs.layerTypes[geomsrc])
+        elif not os.path.isfile(geom_path):
             log(geom_path + " is no file. Object " + viscol['name']
                 + " will have empty mesh!", "ERROR", "createGeometry")
-            bpy.data.meshes.new(meshname)
-        if meshname in bpy.data.meshes:
-            log('Assigning copy of existing mesh ' + meshname + ' to ' + viscol['name'], 'INFO', 'createGeometry')
-            bpy.ops.object.add(type='MESH')
-            newgeom = bpy.context.object
-            newgeom.data = bpy.data.meshes[meshname]
+            mesh = bpy.data.meshes.new(meshname)
+            meshimports['meshes'][meshpath] = mesh.name
+            newgeom = bpy.data.objects.new(viscol['name'], mesh)
+            bpy.context.scene.objects.link(newgeom)
+            newgeom.layers = bUtils.defLayers(defs.layerTypes[geomsrc])
         else:
             log('Importing mesh for link element ' + viscol['name'], 'INFO', 'createGeometry')
             filetype = geom['filename'].split('.')[-1].lower()
             newgeom = meshes.importMesh(geom_path, filetype)
-            newgeom.data.name = meshname
             if not newgeom:
                 log('Failed to import mesh file ' + geom['filename'], 'ERROR', 'createGeometry')
                 return
-            # scale imported object
-            if 'scale' in geom:
-                sUtils.selectObjects((newgeom,), clear=True)
-                newgeom.scale = geom['scale']
+            newgeom.data.name = meshname
+            meshimports['meshes'][meshpath] = newgeom.data.name
+            meshimports['loaded'] += 1
+        # the scale belongs to the object, so instances of the same file may be scaled differently
+        newgeom.scale = scale
     else:
         if geomtype == 'box':
             dimensions = geom['size']
@@ -29,7 +29,12 @@ File inertia.py
 Created on 13 Feb 2014
 """
 
+import os
 import math
+import json
+import hashlib
+from collections import OrderedDict
+import numpy as np
 import bpy
 import mathutils
 import phobos.defs as defs
@@ -42,6 +47,13 @@ from phobos.model.geometries import deriveGeometry
 from phobos.model.materials import assignMaterial
 from phobos.model.poses import deriveObjectPose
 
+# maximum number of meshes kept in the mesh inertia cache
+meshInertiaCacheSize = 2048
+
+# unit-density mass properties of meshes, see getMeshMassProperties
+meshInertiaCache = {'loaded': False, 'path': None, 'entries': OrderedDict(), 'hits': 0, 'misses': 0,
+                    'changed': False}
+
 
 def createInertialFromDictionary(name, inertial):
     """Creates the Blender representation of a given intertial provided a dictionary.
@@ -127,9 +139,7 @@ def createInertials(link, empty=False, preserve_children=False):
                 geometry = deriveGeometry(obj)
                 if mass is not None and geometry is not None:
                     if geometry['type'] == 'mesh':
-                        sUtils.selectObjects([obj])
-                        bpy.context.scene.objects.active = obj
-                        inert = calculateMeshInertia(obj.data, mass)
+                        inert = calculateCachedMeshInertia(obj, mass)
                     else:
                         inert = calculateInertia(mass, geometry)
                     if inert is not None:
@@ -317,105 +327,208 @@ def calculateMeshInertia(data, mass):
     with formulas for tetrahedron inertia from 'Explicit Exact Formulas for the 3-D Tetrahedron
     Inertia Tensor in Terms of its Vertex Coordinates' (2004) by F. Tonon. (2)
 
+    The mesh is read into numpy arrays and its polygons are split into triangle fans, so the mesh
+    itself is not changed. All tetrahedra spanned by the triangles and the origin are evaluated at once.
+
     Links: (1) http://number-none.com/blow/inertia/body_i.html
            (2) http://docsdrive.com/pdfs/sciencepublications/jmssp/2005/8-11.pdf
 
     :param data: The mesh object's data.
-    :type data: bpy.types.BlendData.
+    :type data: bpy.types.Mesh.
     :param mass: The object's mass.
     :type mass: float.
     :return: tuple(6)
     """
-    tetrahedra = []
-    mesh_volume = 0
-    origin = mathutils.Vector((0.0, 0.0, 0.0))
-
-    vertices = data.vertices
-    prev_mode = bpy.context.mode
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.mesh.quads_convert_to_tris(quad_method='FIXED')
-    bpy.ops.object.mode_set(mode=prev_mode)
-    polygons = data.polygons
-
-    for triangle in polygons:
-        verts = [vertices[index].co for index in triangle.vertices]
-
-        tri_normal = triangle.normal
-        tri_centre = triangle.center
-        ref_tri_vector = tri_centre - origin
-        normal_angle = ref_tri_vector.angle(tri_normal, 90)
-        if normal_angle > 90:
-            sign = -1
-        elif normal_angle == 90:
-            sign = 0
-        else:
-            sign = 1
-
-        J = mathutils.Matrix(((verts[0][0], verts[0][1], verts[0][2], 1),
-                              (verts[1][0], verts[1][1], verts[1][2], 1),
-                              (verts[2][0], verts[2][1], verts[2][2], 1),
-                              (origin[0], origin[1], origin[2], 1)))
+    volume, com, inertia = calculateMeshMassProperties(data)
+    if volume == 0:
+        log("Mesh " + data.name + " encloses no volume.", "ERROR", "calculateMeshInertia")
+        return None
+    return tuple(mass / volume * i for i in inertia)
+
+
+def calculateMeshMassProperties(data, scale=(1.0, 1.0, 1.0)):
+    """Calculates volume, center of mass and inertia tensor of a mesh with unit density.
+    See calculateMeshInertia for the method used.
+
+    :param data: The mesh to calculate the mass properties for.
+    :type data: bpy.types.Mesh
+    :param scale: The scale applied to the mesh's vertices.
+    :type scale: list(3)
+    :return: tuple(3) -- volume, center of mass as tuple(3) and upper diagonal of the inertia tensor as tuple(6).
+    """
+    triangles = getMeshTriangles(data) * np.asarray(scale, dtype=np.float64)
+    # Tonon's formulas for tetrahedra with the fourth vertex at the origin
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    vertexsums = triangles.sum(axis=1)
+    # tetrahedra are counted positively if the triangle faces away from the origin
+    sign = np.sign(np.einsum('ij,ij->i', vertexsums, normals))
+    det_J = np.einsum('ij,ij->i', triangles[:, 0], np.cross(triangles[:, 1], triangles[:, 2]))
+    weights = sign * det_J
+
+    volume = float(weights.sum() / 6)
+    if volume == 0:
+        return 0.0, (0.0, 0.0, 0.0), (0.0,) * 6
+    com = tuple(float(c) for c in np.einsum('t,tj->j', weights, vertexsums) / 24 / volume)
+
+    # sum_i(p_i * q_i) + sum_i(p_i) * sum_i(q_i) covers all coordinate products in Tonon's formulas
+    products = (np.einsum('t,tij,tik->jk', weights, triangles, triangles)
+                + np.einsum('t,tj,tk->jk', weights, vertexsums, vertexsums))
+
+    a = (products[1, 1] + products[2, 2]) / 120
+    b = (products[0, 0] + products[2, 2]) / 120
+    c = (products[0, 0] + products[1, 1]) / 120
+    a_bar = products[1, 2] / 120
+    b_bar = products[0, 2] / 120
+    c_bar = products[0, 1] / 120
+
+    return volume, com, (float(a), float(-b_bar), float(-c_bar), float(b), float(-a_bar), float(c))
+
+
+def calculateCachedMeshInertia(obj, mass):
+    """Calculates the inertia tensor of a mesh object including its scale, reusing the mass
+    properties stored in the mesh inertia cache if the mesh did not change.
+
+    :param obj: The mesh object.
+    :type obj: bpy_types.Object
+    :param mass: The object's mass.
+    :type mass: float
+    :return: tuple(6)
+    """
+    volume, com, inertia = getMeshMassProperties(obj.data, obj.scale)
+    if volume == 0:
+        log("Mesh " + obj.data.name + " encloses no volume.", "ERROR", "calculateCachedMeshInertia")
+        return None
+    return tuple(mass / volume * i for i in inertia)
 
-        abs_det_J = J.determinant()
 
-        volume = sign * abs_det_J / 6
+def hashMesh(data, scale=(1.0, 1.0, 1.0)):
+    """Returns a hash of a mesh's vertex and face buffers and the given scale.
 
-        centre_of_mass = mathutils.Vector(((verts[0][0] + verts[1][0] + verts[2][0] + origin[0]) / 4,
-                                           (verts[0][1] + verts[1][1] + verts[2][1] + origin[1]) / 4,
-                                           (verts[0][2] + verts[1][2] + verts[2][2] + origin[2]) / 4))
+    :param data: The mesh to hash.
+    :type data: bpy.types.Mesh
+    :param scale: The scale applied to the mesh.
+    :type scale: list(3)
+    :return: str
+    """
+    meshhash = hashlib.sha1()
+    buffers = ((data.vertices, 'co', np.float32, 3), (data.loops, 'vertex_index', np.int32, 1),
+               (data.polygons, 'loop_start', np.int32, 1), (data.polygons, 'loop_total', np.int32, 1))
+    for collection, attribute, dtype, size in buffers:
+        buffer = np.empty(len(collection) * size, dtype=dtype)
+        collection.foreach_get(attribute, buffer)
+        meshhash.update(buffer.tobytes())
+    meshhash.update(np.asarray(scale, dtype=np.float32).tobytes())
+    return meshhash.hexdigest()
 
-        tetrahedra.append({'sign': sign, 'abs(det(J))': abs_det_J, 'J': J, 'centre_of_mass': centre_of_mass})
-        mesh_volume += volume
 
-    d = mass / mesh_volume
-    i = mathutils.Matrix().to_3x3()
-    i.zero()
-    for tetrahedron in tetrahedra:
+def getMeshInertiaCachePath():
+    """Returns the path of the mesh inertia cache file next to the current .blend file.
 
-        J = tetrahedron['J']
-        x1 = J[0][0]
-        y1 = J[0][1]
-        z1 = J[0][2]
-        x2 = J[1][0]
-        y2 = J[1][1]
-        z2 = J[1][2]
-        x3 = J[2][0]
-        y3 = J[2][1]
-        z3 = J[2][2]
-        x4 = J[3][0]
-        y4 = J[3][1]
-        z4 = J[3][2]
+    :return: str -- the path or None if the .blend file has not been saved yet.
+    """
+    if not bpy.data.filepath:
+        return None
+    return os.path.splitext(bpy.data.filepath)[0] + '.inertiacache.json'
 
-        abs_det_J = tetrahedron['abs(det(J))']
-        sign = tetrahedron['sign']
 
-        a = sign * d * abs_det_J * (y1**2 + y1*y2 + y2**2 + y1*y3 + y2*y3 + y3**2
-            + y1*y4 + y2*y4 + y3*y4 + y4**2 + z1**2 + z1*z2 + z2**2 + z1*z3
-            + z2*z3 + z3**2 + z1*z4 + z2*z4 + z3*z4 + z4**2) / 60
+def loadMeshInertiaCache():
+    """Loads the mesh inertia cache of the current .blend file, if it is not loaded yet.
 
-        b = sign * d * abs_det_J * (x1**2 + x1*x2 + x2**2 + x1*x3 + x2*x3 + x3**2
-            + x1*x4 + x2*x4 + x3*x4 + x4**2 + z1**2 + z1*z2 + z2**2 + z1*z3
-            + z2*z3 + z3**2 + z1*z4 + z2*z4 + z3*z4 + z4**2) / 60
+    """
+    path = getMeshInertiaCachePath()
+    if meshInertiaCache['loaded'] and path == meshInertiaCache['path']:
+        return
+    meshInertiaCache.update({'loaded': True, 'path': path, 'entries': OrderedDict(), 'hits': 0, 'misses': 0,
+                             'changed': False})
+    if path and os.path.isfile(path):
+        try:
+            with open(path, 'r') as cachefile:
+                entries = json.load(cachefile)
+            for key, (volume, com, inertia) in entries:
+                meshInertiaCache['entries'][key] = (volume, tuple(com), tuple(inertia))
+            log("Loaded " + str(len(entries)) + " entries from mesh inertia cache " + path, "DEBUG",
+                "loadMeshInertiaCache")
+        except (ValueError, TypeError, OSError) as e:
+            log("Could not read mesh inertia cache " + path + ": " + str(e), "WARNING", "loadMeshInertiaCache")
 
-        c = sign * d * abs_det_J * (x1**2 + x1*x2 + x2**2 + x1*x3 + x2*x3 + x3**2
-            + x1*x4 + x2*x4 + x3*x4 + x4**2 + y1**2 + y1*y2 + y2**2 + y1*y3
-            + y2*y3 + y3**2 + y1*y4 + y2*y4 + y3*y4 + y4**2) / 60
 
-        a_bar = sign * d * abs_det_J * (2*y1*z1 + y2*z1 + y3*z1 + y4*z1 + y1*z2
-                + 2*y2*z2 + y3*z2 + y4*z2 + y1*z3 + y2*z3 + 2*y3*z3
-                + y4*z3 + y1*z4 + y2*z4 + y3*z4 + 2*y4*z4) / 120
+def saveMeshInertiaCache():
+    """Writes the mesh inertia cache to its file next to the current .blend file, if it changed.
 
-        b_bar = sign * d * abs_det_J * (2*x1*z1 + x2*z1 + x3*z1 + x4*z1 + x1*z2
-                + 2*x2*z2 + x3*z2 + x4*z2 + x1*z3 + x2*z3 + 2*x3*z3
-                + x4*z3 + x1*z4 + x2*z4 + x3*z4 + 2*x4*z4) / 120
+    """
+    path = meshInertiaCache['path']
+    if not path or not meshInertiaCache['changed']:
+        return
+    try:
+        with open(path, 'w') as cachefile:
+            # stored from least to most recently used to preserve the eviction order
+            json.dump(list(meshInertiaCache['entries'].items()), cachefile)
+        meshInertiaCache['changed'] = False
+    except OSError as e:
+        log("Could not write mesh inertia cache " + path + ": " + str(e), "WARNING", "saveMeshInertiaCache")
+
+
+def getMeshMassProperties(data, scale=(1.0, 1.0, 1.0)):
+    """Returns the unit-density mass properties of a mesh as calculated by calculateMeshMassProperties.
+    Results are stored in a least-recently-used cache keyed by the mesh's content and scale.
+
+    :param data: The mesh to get the mass properties for.
+    :type data: bpy.types.Mesh
+    :param scale: The scale applied to the mesh's vertices.
+    :type scale: list(3)
+    :return: tuple(3) -- volume, center of mass as tuple(3) and upper diagonal of the inertia tensor as tuple(6).
+    """
+    loadMeshInertiaCache()
+    entries = meshInertiaCache['entries']
+    key = hashMesh(data, scale)
+    if key in entries:
+        entries.move_to_end(key)
+        meshInertiaCache['hits'] += 1
+        return entries[key]
+    meshInertiaCache['misses'] += 1
+    entries[key] = calculateMeshMassProperties(data, scale)
+    while len(entries) > meshInertiaCacheSize:
+        entries.popitem(last=False)
+    meshInertiaCache['changed'] = True
+    return entries[key]
+
+
+def getMeshInertiaCacheStats():
+    """Returns the statistics of the mesh inertia cache for the current session.
+
+    :return: dict -- with number of hits, misses and entries and the path of the cache file.
+    """
+    return {'hits': meshInertiaCache['hits'],
+            'misses': meshInertiaCache['misses'],
+            'entries': len(meshInertiaCache['entries']),
+            'path': meshInertiaCache['path']}
 
-        c_bar = sign * d * abs_det_J * (2*x1*y1 + x2*y1 + x3*y1 + x4*y1 + x1*y2
-                + 2*x2*y2 + x3*y2 + x4*y2 + x1*y3 + x2*y3 + 2*x3*y3
-                + x4*y3 + x1*y4 + x2*y4 + x3*y4 + 2*x4*y4) / 120
 
-        i += inertiaListToMatrix([a, -b_bar, -c_bar, b, -a_bar, c])
+def getMeshTriangles(data):
+    """Returns the vertex coordinates of all triangles of a mesh, splitting its polygons into triangle fans.
 
-    return i[0][0], i[0][1], i[0][2], i[1][1], i[1][2], i[2][2]
+    :param data: The mesh to read the triangles from.
+    :type data: bpy.types.Mesh
+    :return: numpy.ndarray -- of shape (number of triangles, 3, 3)
+    """
+    vertices = np.empty(len(data.vertices) * 3, dtype=np.float32)
+    data.vertices.foreach_get('co', vertices)
+    vertices = vertices.reshape(-1, 3).astype(np.float64)
+
+    loops = np.empty(len(data.loops), dtype=np.int32)
+    data.loops.foreach_get('vertex_index', loops)
+    loop_starts = np.empty(len(data.polygons), dtype=np.int32)
+    data.polygons.foreach_get('loop_start', loop_starts)
+    loop_totals = np.empty(len(data.polygons), dtype=np.int32)
+    data.polygons.foreach_get('loop_total', loop_totals)
+
+    # polygon (v0, v1, ..., vn) is split into the triangles (v0, vk, vk+1)
+    tricounts = np.maximum(loop_totals - 2, 0)
+    polygons = np.repeat(np.arange(len(tricounts)), tricounts)
+    k = np.arange(len(polygons)) - np.repeat(np.cumsum(tricounts) - tricounts, tricounts) + 1
+    first = loop_starts[polygons]
+    triloops = np.stack((first, first + k, first + k + 1), axis=1)
+    return vertices[loops[triloops]]
 
 
 def inertiaListToMatrix(il):
@@ -496,32 +609,110 @@ def fuseInertiaData(inertials):
     :return: tuple(3) -- see description for content.
 
     """
-    objects = []
-    for o in inertials:
-        objdict = None
-        try:
-            pose = deriveObjectPose(o)
-            # FIXME the following is really a short cut that points to a bigger problem
-            inertia = o['inertia'] if 'inertia' in o else o['inertial/inertia']
-            mass = o['mass'] if 'mass' in o else o['inertial/mass']
-            objdict = {'name': o.name,
-                       'mass': mass,
-                       'com': mathutils.Vector(pose['translation']),  # FIXME: this is not nice, as we invert what is one when deriving the pose
-                       'rot': pose['rawmatrix'].to_3x3(),
-                       'inertia': inertia
-                       }
-        except KeyError as e:
-            log('Inertial object ' + o.name + ' is missing data: '+str(e), "WARNING", "fuseInertiaData")
-        if objdict:
-            objects.append(objdict)
-    if len(objects) > 0:
-        log("Fusing inertials: " + str([i.name for i in inertials]), "DEBUG", "fuseInertiaData")
-        mass, com, inertia = compound_inertia_analysis_3x3(objects)
-        log("Fused mass: " + str(mass), "DEBUG", "fuseInertiaData")
-        return mass, com, inertia
-    else:
-        log("No inertial found to fuse.", "DEBUG", "fuseInertiaData")
+    fused = fuseInertiaDataOfLinks({None: inertials})
+    if None not in fused:
         return None, None, None
+    mass, com, inertia = fused[None]
+    return mass, mathutils.Vector(com), inertiaListToMatrix(inertia)
+
+
+def fuseInertiaDataOfLinks(inertialgroups):
+    """Returns mass, center of mass and inertia for a number of links at once, taking a dictionary
+    of the inertials of each link. The inertials of all links are fused in a single call of
+    compound_inertia_analysis_batch.
+
+    :param inertialgroups: The lists of objects relevant for the inertia of each link by link name.
+    :type inertialgroups: dict
+    :return: dict -- (mass, com as list(3), upper diagonal of inertia as tuple(6)) by link name.
+      Links without valid inertials are omitted.
+
+    """
+    linknames = []
+    groups, masses, coms, rotations, inertias = [], [], [], [], []
+    for linkname, inertials in inertialgroups.items():
+        names = []
+        for o in inertials:
+            try:
+                pose = deriveObjectPose(o)
+                # FIXME the following is really a short cut that points to a bigger problem
+                inertia = o['inertia'] if 'inertia' in o else o['inertial/inertia']
+                mass = o['mass'] if 'mass' in o else o['inertial/mass']
+            except KeyError as e:
+                log('Inertial object ' + o.name + ' is missing data: '+str(e), "WARNING", "fuseInertiaDataOfLinks")
+                continue
+            groups.append(len(linknames))
+            masses.append(mass)
+            # FIXME: this is not nice, as we invert what is one when deriving the pose
+            coms.append(pose['translation'])
+            rotations.append(pose['rawmatrix'].to_3x3())
+            inertias.append(list(inertia))
+            names.append(o.name)
+        if names:
+            log("Fusing inertials: " + str(names), "DEBUG", "fuseInertiaDataOfLinks")
+            linknames.append(linkname)
+        else:
+            log("No inertial found to fuse for link " + str(linkname) + ".", "DEBUG", "fuseInertiaDataOfLinks")
+    if not linknames:
+        return {}
+    totalmasses, commoncoms, totalinertias = compound_inertia_analysis_batch(
+        np.array(masses, dtype=np.float64), np.array(coms, dtype=np.float64),
+        np.array(rotations, dtype=np.float64), np.array(inertias, dtype=np.float64),
+        np.array(groups), len(linknames))
+    fused = {}
+    for i, linkname in enumerate(linknames):
+        if totalmasses[i] <= 0:
+            log("Inertials of link " + str(linkname) + " have no mass.", "WARNING", "fuseInertiaDataOfLinks")
+            continue
+        log("Fused mass: " + str(totalmasses[i]), "DEBUG", "fuseInertiaDataOfLinks")
+        fused[linkname] = (float(totalmasses[i]), [float(c) for c in commoncoms[i]],
+                           inertiaMatrixToList(totalinertias[i].tolist()))
+    return fused
+
+
+def compound_inertia_analysis_batch(masses, coms, rotations, inertias, groups=None, ngroups=None):
+    """Computes total mass, common center of mass and inertia matrix at the common center of mass for
+    groups of bodies, e.g. all inertials of all links of a model, in one vectorized operation.
+    This is the batched equivalent of compound_inertia_analysis_3x3.
+
+    Each inertia is spun into the group's frame (passive rotation, see spin_inertia_3x3) and shifted
+    to the group's common center of mass with the parallel axis theorem (see shift_com_inertia_3x3).
+
+    :param masses: The masses of the N bodies.
+    :type masses: numpy.ndarray of shape (N,)
+    :param coms: The centers of mass of the bodies.
+    :type coms: numpy.ndarray of shape (N, 3)
+    :param rotations: The orientations of the bodies.
+    :type rotations: numpy.ndarray of shape (N, 3, 3)
+    :param inertias: The upper diagonals of the bodies' inertia tensors.
+    :type inertias: numpy.ndarray of shape (N, 6)
+    :param groups: The index of the group each body belongs to, all bodies form one group if omitted.
+    :type groups: numpy.ndarray of shape (N,)
+    :param ngroups: The number of groups G, derived from groups if omitted.
+    :type ngroups: int
+    :return: tuple(3) -- masses of shape (G,), centers of mass of shape (G, 3) and inertia tensors of shape (G, 3, 3).
+    """
+    if groups is None:
+        groups = np.zeros(len(masses), dtype=np.intp)
+    if ngroups is None:
+        ngroups = int(groups.max()) + 1 if len(groups) else 0
+
+    total_masses = np.bincount(groups, weights=masses, minlength=ngroups)
+    common_coms = np.zeros((ngroups, 3))
+    np.add.at(common_coms, groups, masses[:, None] * coms)
+    common_coms /= np.where(total_masses > 0, total_masses, 1.0)[:, None]
+
+    # full symmetric tensors from upper diagonals
+    tensors = inertias[:, [0, 1, 2, 1, 3, 4, 2, 4, 5]].reshape(-1, 3, 3)
+    # passive rotation R^T * I * R
+    tensors = np.einsum('nji,njk,nkl->nil', rotations, tensors, rotations)
+    # parallel axis theorem I + m * ((c . c) * E - c x c)
+    c = coms - common_coms[groups]
+    tensors += masses[:, None, None] * (np.einsum('ni,ni->n', c, c)[:, None, None] * np.eye(3)
+                                        - np.einsum('ni,nj->nij', c, c))
+
+    total_inertias = np.zeros((ngroups, 3, 3))
+    np.add.at(total_inertias, groups, tensors)
+    return total_masses, common_coms, total_inertias
 
 
 ################################################################################
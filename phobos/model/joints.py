@@ -41,47 +41,82 @@ import phobos.utils.editing as eUtils
 
 
 def createJoint(joint, linkobj=None):
-    # add joint information
-    if not linkobj:
-        linkobj = bpy.data.objects[joint['child']]  # TODO: Make this generic?
-    if joint['name'] != linkobj.name:
-        linkobj['joint/name'] = joint['name']
-    # get hold of object
+    """Creates the Blender representation of a joint in the link object of its child.
+
+    :param joint: The joint dictionary.
+    :type joint: dict
+    :param linkobj: The child link of the joint, which is looked up by the joint's child if None.
+    :type linkobj: bpy_types.Object
+
+    """
+    createJoints([joint], [linkobj] if linkobj else None)
+
+
+def createJoints(joints, linkobjs=None):
+    """Creates the Blender representations of a batch of joints in the link objects of their children.
+
+    The limits and constraints are set on the pose bones directly, which does not need any mode switch or
+    selection. The bone of a link only has to be edited if it does not already point along its joint's axis. As
+    Blender edits one armature at a time, these bones are turned in one edit session per armature, right after
+    another and without changing the selection.
+
+    :param joints: The joint dictionaries.
+    :type joints: list
+    :param linkobjs: The child link of each joint, which are looked up by the joints' children if None.
+    :type linkobjs: list
+
+    """
+    if not linkobjs:
+        linkobjs = [bpy.data.objects[joint['child']] for joint in joints]  # TODO: Make this generic?
     bUtils.toggleLayer(defs.layerTypes['link'], True)
-    sUtils.selectObjects([linkobj], clear=True, active=0)
+    # bones which have to be turned to the joint axis in edit mode
+    turned = []
+    for joint, linkobj in zip(joints, linkobjs):
+        # add joint information
+        if joint['name'] != linkobj.name:
+            linkobj['joint/name'] = joint['name']
 
-    # set axis
-    if 'axis' in joint:
-        # Providing a zero axis joint will size the editbone to zero scale
-        if mathutils.Vector(tuple(joint['axis'])).length == 0.:
-            log('Faulty joint definition ({0}): Axis is of zero length.'.format(joint['name']), 'ERROR')
-        else:
-            bpy.ops.object.mode_set(mode='EDIT')
-            editbone = linkobj.data.edit_bones[0]
-            #oldaxis = editbone.vector
-            length = editbone.length
+        # set axis
+        if 'axis' in joint:
             axis = mathutils.Vector(tuple(joint['axis']))
-            #oldaxis.cross(axis) # rotation axis
-            editbone.tail = editbone.head + axis.normalized() * length
+            # Providing a zero axis joint will size the editbone to zero scale
+            if axis.length == 0.:
+                log('Faulty joint definition ({0}): Axis is of zero length.'.format(joint['name']), 'ERROR')
+            elif linkobj.data.bones[0].vector.normalized().dot(axis.normalized()) < 1 - 1e-9:
+                turned.append((linkobj, axis.normalized()))
 
-    # add constraints
-    for param in ['effort', 'velocity']:
+        # add constraints
+        for param in ['effort', 'velocity']:
+            try:
+                if 'limits' in joint:
+                    linkobj['joint/max'+param] = joint['limits'][param]
+            except KeyError:
+                log("Key Error in adding joint constraints for joint", joint['name']) #Todo: more details
         try:
-            if 'limits' in joint:
-                linkobj['joint/max'+param] = joint['limits'][param]
+            lower = joint['limits']['lower']
+            upper = joint['limits']['upper']
         except KeyError:
-            log("Key Error in adding joint constraints for joint", joint['name']) #Todo: more details
-    try:
-        lower = joint['limits']['lower']
-        upper = joint['limits']['upper']
-    except KeyError:
-        lower = 0.0
-        upper = 0.0
-    setJointConstraints(linkobj, joint['type'], lower, upper)
-    for prop in joint:
-        if prop.startswith('$'):
-            for tag in joint[prop]:
-                linkobj['joint/'+prop[1:]+'/'+tag] = joint[prop][tag]
+            lower = 0.0
+            upper = 0.0
+        setJointConstraints(linkobj, joint['type'], lower, upper)
+        for prop in joint:
+            if prop.startswith('$'):
+                for tag in joint[prop]:
+                    linkobj['joint/'+prop[1:]+'/'+tag] = joint[prop][tag]
+
+    if turned:
+        active = bpy.context.scene.objects.active
+        if active is not None and active.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        for linkobj, axis in turned:
+            bpy.context.scene.objects.active = linkobj
+            bpy.ops.object.mode_set(mode='EDIT')
+            editbone = linkobj.data.edit_bones[0]
+            editbone.tail = editbone.head + axis * editbone.length
+            bpy.ops.object.mode_set(mode='OBJECT')
+        bpy.context.scene.objects.active = active
+    log("Created " + str(len(joints)) + " joints, turned " + str(len(turned)) + " bones to their axes.", 'DEBUG',
+        'createJoints')
 
 
 def deriveJointType(joint, adjust=False):
@@ -222,13 +257,14 @@ def setJointConstraints(joint, jointtype, lower=0.0, upper=0.0, spring=0.0, damp
 
     """
     log("Processing joint: " + joint.name, 'DEBUG', 'setJointConstraints')
-    bpy.ops.object.mode_set(mode='POSE')
-    for c in joint.pose.bones[0].constraints:
+    # the constraints are added to the pose bone directly, which works in any mode
+    for c in list(joint.pose.bones[0].constraints):
         joint.pose.bones[0].constraints.remove(c)
     if joint.phobostype == 'link':
         # add spring & damping
         if jointtype in ['revolute', 'prismatic'] and (spring or damping):
             try:
+                bpy.context.scene.objects.active = joint
                 bpy.ops.rigidbody.constraint_add(type='GENERIC_SPRING')
                 bpy.context.object.rigid_body_constraint.spring_stiffness_y = spring
                 bpy.context.object.rigid_body_constraint.spring_damping_y = damping
@@ -243,8 +279,7 @@ def setJointConstraints(joint, jointtype, lower=0.0, upper=0.0, spring=0.0, damp
         # add constraints
         if jointtype == 'revolute':
             # fix location
-            bpy.ops.pose.constraint_add(type='LIMIT_LOCATION')
-            cloc = getJointConstraint(joint, 'LIMIT_LOCATION')
+            cloc = joint.pose.bones[0].constraints.new('LIMIT_LOCATION')
             cloc.use_min_x = True
             cloc.use_min_y = True
             cloc.use_min_z = True
@@ -253,8 +288,7 @@ def setJointConstraints(joint, jointtype, lower=0.0, upper=0.0, spring=0.0, damp
             cloc.use_max_z = True
             cloc.owner_space = 'LOCAL'
             # fix rotation x, z and limit y
-            bpy.ops.pose.constraint_add(type='LIMIT_ROTATION')
-            crot = getJointConstraint(joint, 'LIMIT_ROTATION')
+            crot = joint.pose.bones[0].constraints.new('LIMIT_ROTATION')
             crot.use_limit_x = True
             crot.min_x = 0
             crot.max_x = 0
@@ -267,8 +301,7 @@ def setJointConstraints(joint, jointtype, lower=0.0, upper=0.0, spring=0.0, damp
             crot.owner_space = 'LOCAL'
         elif jointtype == 'continuous':
             # fix location
-            bpy.ops.pose.constraint_add(type='LIMIT_LOCATION')
-            cloc = getJointConstraint(joint, 'LIMIT_LOCATION')
+            cloc = joint.pose.bones[0].constraints.new('LIMIT_LOCATION')
             cloc.use_min_x = True
             cloc.use_min_y = True
             cloc.use_min_z = True
@@ -277,8 +310,7 @@ def setJointConstraints(joint, jointtype, lower=0.0, upper=0.0, spring=0.0, damp
             cloc.use_max_z = True
             cloc.owner_space = 'LOCAL'
             # fix rotation x, z
-            bpy.ops.pose.constraint_add(type='LIMIT_ROTATION')
-            crot = getJointConstraint(joint, 'LIMIT_ROTATION')
+            crot = joint.pose.bones[0].constraints.new('LIMIT_ROTATION')
             crot.use_limit_x = True
             crot.min_x = 0
             crot.max_x = 0
@@ -288,8 +320,7 @@ def setJointConstraints(joint, jointtype, lower=0.0, upper=0.0, spring=0.0, damp
             crot.owner_space = 'LOCAL'
         elif jointtype == 'prismatic':
             # fix location except for y axis
-            bpy.ops.pose.constraint_add(type='LIMIT_LOCATION')
-            cloc = getJointConstraint(joint, 'LIMIT_LOCATION')
+            cloc = joint.pose.bones[0].constraints.new('LIMIT_LOCATION')
             cloc.use_min_x = True
             cloc.use_min_y = True
             cloc.use_min_z = True
@@ -304,8 +335,7 @@ def setJointConstraints(joint, jointtype, lower=0.0, upper=0.0, spring=0.0, damp
                 cloc.max_y = upper
             cloc.owner_space = 'LOCAL'
             # fix rotation
-            bpy.ops.pose.constraint_add(type='LIMIT_ROTATION')
-            crot = getJointConstraint(joint, 'LIMIT_ROTATION')
+            crot = joint.pose.bones[0].constraints.new('LIMIT_ROTATION')
             crot.use_limit_x = True
             crot.min_x = 0
             crot.max_x = 0
@@ -318,8 +348,7 @@ def setJointConstraints(joint, jointtype, lower=0.0, upper=0.0, spring=0.0, damp
             crot.owner_space = 'LOCAL'
         elif jointtype == 'fixed':
             # fix location
-            bpy.ops.pose.constraint_add(type='LIMIT_LOCATION')
-            cloc = getJointConstraint(joint, 'LIMIT_LOCATION')
+            cloc = joint.pose.bones[0].constraints.new('LIMIT_LOCATION')
             cloc.use_min_x = True
             cloc.use_min_y = True
             cloc.use_min_z = True
@@ -328,8 +357,7 @@ def setJointConstraints(joint, jointtype, lower=0.0, upper=0.0, spring=0.0, damp
             cloc.use_max_z = True
             cloc.owner_space = 'LOCAL'
             # fix rotation
-            bpy.ops.pose.constraint_add(type='LIMIT_ROTATION')
-            crot = getJointConstraint(joint, 'LIMIT_ROTATION')
+            crot = joint.pose.bones[0].constraints.new('LIMIT_ROTATION')
             crot.use_limit_x = True
             crot.min_x = 0
             crot.max_x = 0
@@ -345,14 +373,12 @@ def setJointConstraints(joint, jointtype, lower=0.0, upper=0.0, spring=0.0, damp
             pass
         elif jointtype == 'planar':
             # fix location
-            bpy.ops.pose.constraint_add(type='LIMIT_LOCATION')
-            cloc = getJointConstraint(joint, 'LIMIT_LOCATION')
+            cloc = joint.pose.bones[0].constraints.new('LIMIT_LOCATION')
             cloc.use_min_y = True
             cloc.use_max_y = True
             cloc.owner_space = 'LOCAL'
             # fix rotation
-            bpy.ops.pose.constraint_add(type='LIMIT_ROTATION')
-            crot = getJointConstraint(joint, 'LIMIT_ROTATION')
+            crot = joint.pose.bones[0].constraints.new('LIMIT_ROTATION')
             crot.use_limit_x = True
             crot.min_x = 0
             crot.max_x = 0
@@ -366,7 +392,6 @@ def setJointConstraints(joint, jointtype, lower=0.0, upper=0.0, spring=0.0, damp
         else:
             log("Unknown joint type for joint " + joint.name, "WARNING", "setJointConstraints")
         joint['joint/type'] = jointtype
-        bpy.ops.object.mode_set(mode='OBJECT')
 
         # approximation functions for effort and speed
         if jointtype in ['revolute', 'continuous', 'prismatic']:
@@ -0,0 +1,206 @@
+#!/usr/bin/python
+# coding=utf-8
+
+"""
+.. module:: phobos.model.kinematics
+    :platform: Unix, Windows, Mac
+    :synopsis: This module computes the forward kinematics of model dictionaries for batches of joint configurations
+
+.. moduleauthor:: Kai von Szadkowski, Simon Reichel
+
+Copyright 2017, University of Bremen & DFKI GmbH Robotics Innovation Center
+
+This file is part of Phobos, a Blender Add-On to edit robot models.
+
+Phobos is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation, either version 3
+of the License, or (at your option) any later version.
+
+Phobos is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
+
+The kinematics are computed from the joints of a model dictionary as derived by buildModelDictionary or
+imported from URDF, without using the Blender scene. This module only depends on numpy, so it can also be loaded
+from its file in a Python process without Blender:
+
+    spec = importlib.util.spec_from_file_location('kinematics', 'phobos/model/kinematics.py')
+
+A KinematicModel compiles the joints once into arrays. The links are ordered by their depth in the kinematic tree,
+so the transformations of all links of one depth are computed together for all configurations of a batch:
+
+    kinematics = KinematicModel(model)
+    configurations = kinematics.sampleConfigurations(1000)
+    transforms = kinematics.getTransforms(configurations)  # shape (1000, number of links, 4, 4)
+    transforms[:, kinematics.index['link3']]
+"""
+
+import numpy as np
+
+# joint types with one degree of freedom, floating and planar joints keep their origin pose
+revoluteJointTypes = ('revolute', 'continuous')
+prismaticJointTypes = ('prismatic',)
+
+
+def eulerToMatrix(euler):
+    """Returns the rotation matrix of XYZ Euler angles, as used for the poses in model dictionaries.
+
+    """
+    x, y, z = euler
+    cx, sx, cy, sy, cz, sz = np.cos(x), np.sin(x), np.cos(y), np.sin(y), np.cos(z), np.sin(z)
+    return np.array([[cy * cz, sx * sy * cz - cx * sz, cx * sy * cz + sx * sz],
+                     [cy * sz, sx * sy * sz + cx * cz, cx * sy * sz - sx * cz],
+                     [-sy, sx * cy, cx * cy]])
+
+
+def poseToMatrix(pose):
+    """Returns the 4x4 transformation of a pose dictionary with 'translation' and 'rotation_euler'.
+
+    """
+    matrix = np.identity(4)
+    if pose:
+        matrix[:3, :3] = eulerToMatrix(pose.get('rotation_euler', (0.0, 0.0, 0.0)))
+        matrix[:3, 3] = pose.get('translation', (0.0, 0.0, 0.0))
+    return matrix
+
+
+class KinematicModel(object):
+    """The kinematic tree of a model dictionary compiled into arrays.
+
+    :ivar links: The link names ordered by depth, i.e. every parent precedes its children.
+    :ivar index: The position of each link name in links.
+    :ivar joints: The names of the joints with one degree of freedom, in the order of the configuration columns.
+    :ivar parents: The index of each link's parent link, -1 for roots.
+    :ivar origins: The transformation of each link relative to its parent at joint position 0, shape (links, 4, 4).
+    :ivar lower: The lower limit of each joint in joints.
+    :ivar upper: The upper limit of each joint in joints.
+
+    """
+    def __init__(self, model):
+        parentjoint = {joint['child']: joint for joint in model['joints'].values()}
+        depths = {}
+
+        def getDepth(linkname):
+            if linkname not in depths:
+                joint = parentjoint.get(linkname)
+                depths[linkname] = 0 if joint is None else getDepth(joint['parent']) + 1
+            return depths[linkname]
+
+        self.links = sorted(model['links'], key=lambda name: (getDepth(name), name))
+        self.index = {name: i for i, name in enumerate(self.links)}
+        nlinks = len(self.links)
+        self.parents = np.full(nlinks, -1, dtype=np.int64)
+        self.origins = np.tile(np.identity(4), (nlinks, 1, 1))
+        self.axes = np.zeros((nlinks, 3))
+        self.columns = np.full(nlinks, -1, dtype=np.int64)
+        self.prismatic = np.zeros(nlinks, dtype=bool)
+        self.joints = []
+        lower, upper = [], []
+        for i, linkname in enumerate(self.links):
+            joint = parentjoint.get(linkname)
+            if joint is None:
+                continue
+            self.parents[i] = self.index[joint['parent']]
+            self.origins[i] = poseToMatrix(model['links'][linkname].get('pose'))
+            if joint['type'] not in revoluteJointTypes + prismaticJointTypes:
+                continue
+            axis = np.asarray(joint.get('axis', (0.0, 0.0, 1.0)), dtype=np.float64)
+            self.axes[i] = axis / np.linalg.norm(axis) if np.linalg.norm(axis) > 0 else (0.0, 0.0, 1.0)
+            self.prismatic[i] = joint['type'] in prismaticJointTypes
+            self.columns[i] = len(self.joints)
+            self.joints.append(joint['name'])
+            limits = joint.get('limits', {})
+            if joint['type'] == 'continuous' or 'lower' not in limits or 'upper' not in limits:
+                lower.append(-np.pi)
+                upper.append(np.pi)
+            else:
+                lower.append(limits['lower'])
+                upper.append(limits['upper'])
+        self.lower = np.array(lower, dtype=np.float64)
+        self.upper = np.array(upper, dtype=np.float64)
+        self.jointindex = {name: k for k, name in enumerate(self.joints)}
+        # links of the same depth only depend on links of smaller depths
+        depthlist = np.array([depths[name] for name in self.links], dtype=np.int64)
+        self.levels = [np.flatnonzero(depthlist == depth) for depth in range(depthlist.max() + 1)] if nlinks else []
+        movable = np.flatnonzero(self.columns >= 0)
+        self.revolute = movable[~self.prismatic[movable]]
+        self.translating = movable[self.prismatic[movable]]
+        skew = np.zeros((nlinks, 3, 3))
+        x, y, z = self.axes.T
+        skew[:, 0, 1], skew[:, 0, 2], skew[:, 1, 2] = -z, y, -x
+        skew[:, 1, 0], skew[:, 2, 0], skew[:, 2, 1] = z, -y, x
+        skew = skew[self.revolute]
+        # with Rodrigues' formula, the rotation of a local transformation is R + sin(q) R K + (1 - cos(q)) R K^2
+        rotations = self.origins[self.revolute, :3, :3]
+        self.sines = np.matmul(rotations, skew)
+        self.cosines = np.matmul(self.sines, skew)
+        # and the translation of a prismatic joint is t + q R a
+        self.shifts = np.einsum('lij,lj->li', self.origins[self.translating, :3, :3], self.axes[self.translating])
+
+    def getConfiguration(self, positions, default=0.0):
+        """Returns the configuration vector of joint positions given by name, e.g. the 'joints' of a stored pose.
+
+        :param positions: The joint positions by joint name, joints not in joints are ignored.
+        :type positions: dict
+        :param default: The position of the joints missing in positions.
+        :type default: float
+        :return: numpy.ndarray -- of shape (number of joints,).
+
+        """
+        configuration = np.full(len(self.joints), default, dtype=np.float64)
+        for name, position in positions.items():
+            if name in self.jointindex:
+                configuration[self.jointindex[name]] = float(position)
+        return configuration
+
+    def sampleConfigurations(self, samples, seed=0):
+        """Samples joint positions uniformly within the limits of the joints.
+
+        :param samples: The number of configurations.
+        :type samples: int
+        :param seed: The seed of the random number generator.
+        :type seed: int
+        :return: numpy.ndarray -- of shape (samples, number of joints).
+
+        """
+        random = np.random.RandomState(seed)
+        return self.lower + (self.upper - self.lower) * random.random_sample((samples, len(self.joints)))
+
+    def getLocalTransforms(self, configurations):
+        """Computes the transformation of each link relative to its parent.
+
+        :param configurations: The joint positions of shape (batch, number of joints).
+        :type configurations: numpy.ndarray
+        :return: numpy.ndarray -- of shape (batch, number of links, 4, 4).
+
+        """
+        configurations = np.atleast_2d(np.asarray(configurations, dtype=np.float64))
+        transforms = np.empty((len(configurations),) + self.origins.shape)
+        transforms[:] = self.origins
+        if len(self.revolute):
+            q = configurations[:, self.columns[self.revolute], np.newaxis, np.newaxis]
+            rotations = transforms[:, :, :3, :3]
+            rotations[:, self.revolute] += np.sin(q) * self.sines + (1 - np.cos(q)) * self.cosines
+        if len(self.translating):
+            q = configurations[:, self.columns[self.translating], np.newaxis]
+            translations = transforms[:, :, :3, 3]
+            translations[:, self.translating] += q * self.shifts
+        return transforms
+
+    def getTransforms(self, configurations):
+        """Computes the transformations of all links in the frame of their root for a batch of configurations.
+
+        :param configurations: The joint positions of shape (batch, number of joints), or (number of joints,).
+        :type configurations: numpy.ndarray
+        :return: numpy.ndarray -- of shape (batch, number of links, 4, 4), ordered like links.
+
+        """
+        transforms = self.getLocalTransforms(configurations)
+        for level in self.levels[1:]:
+            transforms[:, level] = np.matmul(transforms[:, self.parents[level]], transforms[:, level])
+        return transforms
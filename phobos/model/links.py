@@ -37,6 +37,7 @@ import phobos.defs as defs
 import phobos.utils.naming as nUtils
 import phobos.utils.blender as bUtils
 import phobos.utils.selection as sUtils
+import phobos.utils.editing as eUtils
 import phobos.model.inertia as inertiamodel
 import phobos.model.geometries as geometrymodel
 from phobos.phoboslog import log
@@ -173,71 +174,90 @@ def deriveLinkfromObject(obj, scale=0.2, parenting=True, parentobjects=False,
             bpy.ops.object.parent_set(type='BONE_RELATIVE')
 
 
-def placeChildLinks(model, parent):
-    """Creates parent-child-relationship for a given parent and all existing children in Blender.
+def getLocalMatrix(element):
+    """Returns the transformation of a link or link element relative to its parent as given by its pose.
 
-    :param parent: This is the parent link you want to set the children for.
-    :type: dict
+    :param element: The dictionary of the link or element.
+    :type element: dict
+    :return: mathutils.Matrix -- the identity if element has no pose.
 
     """
-    bpy.context.scene.layers = bUtils.defLayers(defs.layerTypes['link'])
-    children = []
-    for l in model['links']:
-        if 'parent' in model['links'][l] and model['links'][l]['parent'] == parent['name']:
-            children.append(model['links'][l])
-    for child in children:
-        # 1: set parent relationship (this makes the parent inverse the inverse of the parents world transform)
-        parentLink = bpy.data.objects[parent['name']]
-        childLink = bpy.data.objects[child['name']]
-        sUtils.selectObjects([childLink, parentLink], True, 1)
-        bpy.ops.object.parent_set(type='BONE_RELATIVE')
-        # 2: move to parents origin by setting the world matrix to the parents world matrix
-        childLink.matrix_world = parentLink.matrix_world        # removing this line does not seem to make a difference
-
-        # #bpy.context.scene.objects.active = childLink
-        # if 'pivot' in child:
-        #     pivot = child['pivot']
-        #     cursor_location = bpy.context.scene.cursor_location
-        #     bpy.context.scene.cursor_location = mathutils.Vector((-pivot[0]*0.3, -pivot[1]*0.3, -pivot[2]*0.3))
-        #     bpy.ops.object.origin_set(type='ORIGIN_CURSOR')
-        #     bpy.context.scene.cursor_location = cursor_location
-
-        # 3: apply local transform as saved in model (changes matrix_local)
-        location = mathutils.Matrix.Translation(child['pose']['translation'])
-        rotation = mathutils.Euler(tuple(child['pose']['rotation_euler']), 'XYZ').to_matrix().to_4x4()
-        transform_matrix = location * rotation
-        childLink.matrix_local = transform_matrix
-        # 4: be happy, as world and basis are now the same and local is the transform to be exported to urdf
-        # 5: take care of the rest of the tree
-        placeChildLinks(model, child)
-
-
-def placeLinkSubelements(link):
+    if 'pose' not in element:
+        return mathutils.Matrix.Identity(4)
+    location = mathutils.Matrix.Translation(element['pose']['translation'])
+    rotation = mathutils.Euler(tuple(element['pose']['rotation_euler']), 'XYZ').to_matrix().to_4x4()
+    return location * rotation
+
+
+def getChildLinks(model):
+    """Returns the names of the child links of each link in a model dictionary.
+
+    :param model: The model dictionary.
+    :type model: dict
+    :return: dict -- lists of child link names by parent link name, the roots are listed under None.
+
+    """
+    children = {}
+    for linkname in sorted(model['links']):
+        children.setdefault(model['links'][linkname].get('parent'), []).append(linkname)
+    return children
+
+
+def placeLinks(model):
+    """Creates the parent-child relationships of all links of a model in Blender and moves them to their poses.
+    The links are placed in one pass from the roots to the leaves without operators. The world matrices of the
+    links are computed on the way, as Blender only updates matrix_world with the next scene update.
+
+    :param model: The model dictionary whose links have been created.
+    :type model: dict
+    :return: dict -- the world matrices of the links by name.
+
+    """
+    children = getChildLinks(model)
+    worlds = {}
+    queue = []
+    for rootname in children.get(None, []):
+        root = bpy.data.objects[rootname]
+        root.location = (0, 0, 0)
+        worlds[rootname] = root.matrix_world.copy()
+        worlds[rootname].translation = (0, 0, 0)
+        queue.append(rootname)
+    for parentname in queue:
+        parentlink = bpy.data.objects[parentname]
+        for childname in children.get(parentname, []):
+            childlink = bpy.data.objects[childname]
+            # the parent inverse cancels the parent's world transform, so matrix_local is the pose to export
+            eUtils.parentToBone(childlink, parentlink, worlds[parentname])
+            local = getLocalMatrix(model['links'][childname])
+            childlink.matrix_local = local
+            worlds[childname] = worlds[parentname] * local
+            queue.append(childname)
+    if len(worlds) < len(model['links']):
+        log("Could not place links with missing parents: " + ', '.join(sorted(set(model['links']) - set(worlds))),
+            'ERROR', 'placeLinks')
+    return worlds
+
+
+def placeLinkSubelements(link, linkworld=None):
     """Finds all subelements for a given link and sets the appropriate relations.
     In this case subelements are interials, visuals and collisions.
 
     :param link: The parent link you want to set the subelements for
     :type link: dict
+    :param linkworld: The world matrix of the link, if it changed since the last scene update.
+    :type linkworld: mathutils.Matrix
 
     """
     elements = getGeometricElements(link) + ([link['inertial']] if 'inertial' in link else [])
-    bpy.context.scene.layers = bUtils.defLayers([defs.layerTypes[t] for t in defs.layerTypes])
     parentlink = bpy.data.objects[link['name']]
     for element in elements:
-        if 'pose' in element:
-            location = mathutils.Matrix.Translation(element['pose']['translation'])
-            rotation = mathutils.Euler(tuple(element['pose']['rotation_euler']), 'XYZ').to_matrix().to_4x4()
-        else:
-            location = mathutils.Matrix.Identity(4)
-            rotation = mathutils.Matrix.Identity(4)
         try:
             obj = bpy.data.objects[element['name']]
         except KeyError:
             log('Missing link element for placement: ' + element['name'], 'ERROR', 'placeLinkSubelements')
             continue
-        sUtils.selectObjects([obj, parentlink], True, 1)
-        bpy.ops.object.parent_set(type='BONE_RELATIVE')
-        obj.matrix_local = location * rotation
+        eUtils.parentToBone(obj, parentlink, linkworld)
+        obj.matrix_local = getLocalMatrix(element)
         try:
             obj.scale = mathutils.Vector(element['geometry']['scale'])
         except KeyError:
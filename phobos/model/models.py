@@ -39,9 +39,11 @@ import bpy
 import mathutils
 
 # import from Phobos
+import phobos.defs as defs
 import phobos.model.links as linkmodel
 import phobos.model.inertia as inertiamodel
 import phobos.model.joints as jointmodel
+import phobos.model.geometries as geometrymodel
 #import phobos.model.motors as motormodel
 import phobos.model.controllers as controllermodel
 import phobos.model.sensors as sensormodel
@@ -53,6 +55,7 @@ import phobos.utils.blender as bUtils
 import phobos.utils.editing as eUtils
 import phobos.utils.io as ioUtils
 from phobos.phoboslog import log
+from phobos.utils.profiling import profiled, phase, count
 from phobos.utils.general import epsilonToZero
 from phobos.model.poses import deriveObjectPose
 from phobos.model.geometries import deriveGeometry
@@ -68,6 +71,99 @@ from phobos.model.geometries import deriveGeometry
         #print("Joint " + motor['joint'] + " does not exist", "ERROR")
 
 
+def deriveModelIndex(root, selected_only=False, include_hidden=True):
+    """Builds an index of all objects belonging to the model defined by *root* in a single pass over the scene.
+
+    The index contains the model's objects in scene order, their effective parents and phobos names as well
+    as the objects sorted by phobostype, so that the model's objects do not have to be searched for repeatedly
+    while deriving the model dictionary.
+
+    :param root: The root object of the model.
+    :type root: bpy_types.Object
+    :param selected_only: True to index only selected objects, else False.
+    :type selected_only: bool
+    :param include_hidden: True to index hidden objects as well, else False.
+    :type include_hidden: bool
+    :return: dict -- with keys 'root', 'objects', 'parents', 'names' and 'phobostypes'.
+
+    """
+    index = {'root': root, 'objects': [], 'parents': {}, 'names': {}, 'phobostypes': {}}
+    exportselected = bpy.data.worlds[0].phobosexportsettings.selectedOnly
+    roots = {}  # object name -> model root of object, see sUtils.getRoot
+    anchors = {}  # object name -> first object at or above it which can be an effective parent
+
+    def modelRoot(obj):
+        path = []
+        current = obj
+        while current.name not in roots and current.parent and not sUtils.isRoot(current):
+            path.append(current)
+            current = current.parent
+        result = roots.setdefault(current.name, current)
+        for o in path:
+            roots[o.name] = result
+        return result
+
+    def effectiveParent(obj):
+        # same criteria as sUtils.getEffectiveParent with include_hidden=False
+        path = []
+        current = obj.parent
+        while current and current.name not in anchors and (current.hide or
+                                                          (not current.select and exportselected)):
+            path.append(current)
+            current = current.parent
+        if current is None:
+            result = None
+        else:
+            result = anchors.setdefault(current.name, current)
+        for o in path:
+            anchors[o.name] = result
+        return result
+
+    for obj in bpy.context.scene.objects:
+        if (modelRoot(obj) == root and (not obj.hide or include_hidden)
+                and (obj.select or not selected_only)):
+            index['objects'].append(obj)
+            parent = effectiveParent(obj)
+            index['parents'][obj.name] = parent
+            index['names'][obj.name] = nUtils.getObjectName(obj)
+            if parent is not None and parent.name not in index['names']:
+                index['names'][parent.name] = nUtils.getObjectName(parent)
+            if obj.phobostype not in index['phobostypes']:
+                index['phobostypes'][obj.phobostype] = []
+            index['phobostypes'][obj.phobostype].append(obj)
+    return index
+
+
+def getIndexedParent(obj, index=None):
+    """Returns the effective parent of an object, using the model index if provided.
+
+    :param obj: The object to find the effective parent for.
+    :type obj: bpy_types.Object
+    :param index: The model index as created by deriveModelIndex.
+    :type index: dict
+    :return: bpy_types.Object -- the effective parent of obj.
+
+    """
+    if index is not None and obj.name in index['parents']:
+        return index['parents'][obj.name]
+    return sUtils.getEffectiveParent(obj)
+
+
+def getIndexedName(obj, index=None):
+    """Returns the phobos name of an object, using the model index if provided.
+
+    :param obj: The object to get the name for.
+    :type obj: bpy_types.Object
+    :param index: The model index as created by deriveModelIndex.
+    :type index: dict
+    :return: str -- the name of obj.
+
+    """
+    if index is not None and obj is not None and obj.name in index['names']:
+        return index['names'][obj.name]
+    return nUtils.getObjectName(obj)
+
+
 def collectMaterials(objectlist):
     """This function collects all materials from a list of objects and sorts them into a dictionary
 
@@ -128,18 +224,20 @@ def deriveMaterial(mat):
     return material
 
 
-def deriveLink(obj):
+def deriveLink(obj, index=None):
     """This function derives a link from a blender object and creates its initial phobos data structure.
 
     :param obj: The blender object to derive the link from.
     :type obj: bpy_types.Object
+    :param index: The model index as created by deriveModelIndex.
+    :type index: dict
     :return: dict
 
     """
     props = initObjectProperties(obj, phobostype='link', ignoretypes=['joint', 'motor', 'entity'])
-    parent = sUtils.getEffectiveParent(obj)
+    parent = getIndexedParent(obj, index)
     props['parent'] = parent.name if parent else None
-    props["pose"] = deriveObjectPose(obj)
+    props["pose"] = deriveObjectPose(obj, parent)
     props["collision"] = {}
     props["visual"] = {}
     props["inertial"] = {}
@@ -147,10 +245,12 @@ def deriveLink(obj):
     return props
 
 
-def deriveJoint(obj):
+def deriveJoint(obj, index=None):
     """This function derives a joint from a blender object and creates its initial phobos data structure.
 
     :param obj: The blender object to derive the joint from.
+    :param index: The model index as created by deriveModelIndex.
+    :type index: dict
     :return: dict
 
     """
@@ -158,9 +258,9 @@ def deriveJoint(obj):
         jt, crot = jointmodel.deriveJointType(obj, adjust=True)
     props = initObjectProperties(obj, phobostype='joint', ignoretypes=['link', 'motor', 'entity'])
 
-    parent = sUtils.getEffectiveParent(obj)
-    props['parent'] = nUtils.getObjectName(parent)
-    props['child'] = nUtils.getObjectName(obj)
+    parent = getIndexedParent(obj, index)
+    props['parent'] = getIndexedName(parent, index)
+    props['child'] = getIndexedName(obj, index)
     axis, minmax = jointmodel.getJointConstraints(obj)
     if axis:
         props['axis'] = list(axis)
@@ -230,58 +330,64 @@ def deriveMotor(obj, joint):
         return None  # return None if no motor is attached
 
 
-def deriveKinematics(obj):
+def deriveKinematics(obj, index=None):
     """This function takes an object and derives a link, joint and motor from it, if possible.
 
     :param obj: The object to derive its kinematics from.
     :type obj: bpy_types.Object
+    :param index: The model index as created by deriveModelIndex.
+    :type index: dict
     :return: tuple
 
     """
-    link = deriveLink(obj)
+    link = deriveLink(obj, index)
     joint = None
     motor = None
     # joints and motors of root elements are only relevant for scenes, not within models
-    if sUtils.getEffectiveParent(obj):
+    if getIndexedParent(obj, index):
         # TODO: here we have to identify root joints and write their properties to SMURF!
         # --> namespacing parent = "blub::blublink1"
         # --> how to mark separate smurfs in phobos (simply modelname?)
         # -> cut models in pieces but adding modelnames
         # -> automatic namespacing
-        joint = deriveJoint(obj)
+        joint = deriveJoint(obj, index)
         motor = deriveMotor(obj, joint)
     return link, joint, motor
 
 
-def deriveInertial(obj):
+def deriveInertial(obj, index=None):
     """This function derives the inertial from the given object.
 
     :param obj: The object to derive the inertial from.
     :type obj: bpy_types.Object
+    :param index: The model index as created by deriveModelIndex.
+    :type index: dict
     :return: dict
     """
     try:
         props = initObjectProperties(obj, phobostype='inertial')
         props['inertia'] = list(map(float, obj['inertial/inertia']))
-        props['pose'] = deriveObjectPose(obj)
+        props['pose'] = deriveObjectPose(obj, getIndexedParent(obj, index))
     except KeyError as e:
         log("Missing data in inertial object " + obj.name + str(e), "ERROR", "deriveInertial")
         return None
     return props
 
 
-def deriveVisual(obj):
+def deriveVisual(obj, index=None):
     """This function derives the visual information from an object.
 
     :param obj: The blender object to derive the visuals from.
     :type obj: bpy_types.Object
+    :param index: The model index as created by deriveModelIndex.
+    :type index: dict
     :return: dict
 
     """
     try:
         visual = initObjectProperties(obj, phobostype='visual', ignoretypes='geometry')
         visual['geometry'] = deriveGeometry(obj)
-        visual['pose'] = deriveObjectPose(obj)
+        visual['pose'] = deriveObjectPose(obj, getIndexedParent(obj, index))
         if obj.lod_levels:
             if 'lodmaxdistances' in obj:
                 maxdlist = obj['lodmaxdistances']
@@ -298,18 +404,20 @@ def deriveVisual(obj):
     return visual
 
 
-def deriveCollision(obj):
+def deriveCollision(obj, index=None):
     """This function derives the collision information from an object.
 
     :param obj: The blender object to derive the collision information from.
     :type obj: bpy_types.Object
+    :param index: The model index as created by deriveModelIndex.
+    :type index: dict
     :return: dict
 
     """
     try:
         collision = initObjectProperties(obj, phobostype='collision', ignoretypes='geometry')
         collision['geometry'] = deriveGeometry(obj)
-        collision['pose'] = deriveObjectPose(obj)
+        collision['pose'] = deriveObjectPose(obj, getIndexedParent(obj, index))
         # the bitmask is cut to length = 16 and reverted for int parsing
         try:
             collision['bitmask'] = int(''.join(['1' if group else '0' for group in obj.rigid_body.collision_groups[:16]])[::-1], 2)
@@ -367,18 +475,20 @@ def deriveCapsule(obj):
     return viscol_dict, obj.parent
 
 
-def deriveApproxsphere(obj):
+def deriveApproxsphere(obj, index=None):
     """This function derives an SRDF approximation sphere from a given blender object
 
     :param obj: The blender object to derive the approxsphere from.
     :type obj: bpy_types.Object
+    :param index: The model index as created by deriveModelIndex.
+    :type index: dict
     :return: tuple
 
     """
     try:
         sphere = initObjectProperties(obj)
         sphere['radius'] = obj.dimensions[0]/2
-        pose = deriveObjectPose(obj)
+        pose = deriveObjectPose(obj, getIndexedParent(obj, index))
         sphere['center'] = pose['translation']
     except KeyError:
         log("Missing data in collision approximation object " + obj.name, "ERROR", "deriveApproxSphere")
@@ -386,16 +496,18 @@ def deriveApproxsphere(obj):
     return sphere
 
 
-def deriveSensor(obj):
+def deriveSensor(obj, index=None):
     """This function derives a sensor from a given blender object
 
     :param obj: The blender object to derive the sensor from.
     :type obj: bpy_types.Object
+    :param index: The model index as created by deriveModelIndex.
+    :type index: dict
     :return: dict
     """
     try:
         props = initObjectProperties(obj, phobostype='sensor')
-        props['link'] = nUtils.getObjectName(sUtils.getEffectiveParent(obj))
+        props['link'] = getIndexedName(getIndexedParent(obj, index), index)
     except KeyError:
         log("Missing data in sensor " + obj.name, "ERROR", "deriveSensor")
         return None
@@ -417,11 +529,13 @@ def deriveController(obj):
     return props
 
 
-def deriveLight(obj):
+def deriveLight(obj, index=None):
     """This function derives a light from a given blender object
 
     :param obj: The blender object to derive the light from.
     :type obj: bpy_types.Object
+    :param index: The model index as created by deriveModelIndex.
+    :type index: dict
     :return: tuple
     """
     light = initObjectProperties(obj, phobostype='light')
@@ -433,7 +547,8 @@ def deriveLight(obj):
     light['type'] = light_data.type.lower()
     if light['type'] == 'SPOT':
         light['size'] = light_data.size
-    pose = deriveObjectPose(obj)
+    parent = getIndexedParent(obj, index)
+    pose = deriveObjectPose(obj, parent)
     light['position'] = pose['translation']
     light['rotation'] = pose['rotation_euler']
     try:
@@ -447,7 +562,7 @@ def deriveLight(obj):
     if light_data.energy:
         light['attenuation_constant'] = float(light_data.energy)
 
-    light['parent'] = nUtils.getObjectName(sUtils.getEffectiveParent(obj))
+    light['parent'] = getIndexedName(parent, index)
     return light
 
 
@@ -491,29 +606,31 @@ def initObjectProperties(obj, phobostype=None, ignoretypes=()):
     return props
 
 
-def deriveDictEntry(obj):
+def deriveDictEntry(obj, index=None):
     """Derives a phobos dictionary entry from the provided object.
 
     :param obj: The object to derive the dict entry (phobos data structure) from.
     :type obj: bpy_types.Object
+    :param index: The model index as created by deriveModelIndex.
+    :type index: dict
     :return: tuple
 
     """
     try:
         if obj.phobostype == 'inertial':
-            props = deriveInertial(obj)
+            props = deriveInertial(obj, index)
         elif obj.phobostype == 'visual':
-            props = deriveVisual(obj)
+            props = deriveVisual(obj, index)
         elif obj.phobostype == 'collision':
-            props = deriveCollision(obj)
+            props = deriveCollision(obj, index)
         elif obj.phobostype == 'approxsphere':
-            props = deriveApproxsphere(obj)
+            props = deriveApproxsphere(obj, index)
         elif obj.phobostype == 'sensor':
-            props = deriveSensor(obj)
+            props = deriveSensor(obj, index)
         elif obj.phobostype == 'controller':
             props = deriveController(obj)
         elif obj.phobostype == 'light':
-            props = deriveLight(obj)
+            props = deriveLight(obj, index)
     except KeyError:
         log("A KeyError occurred due to unspecifiable missing model data.", "DEBUG", "deriveDictEntry")
         return None, None
@@ -667,6 +784,7 @@ def deriveTextData(modelname):
     return datadict
 
 
+@profiled
 def buildModelDictionary(root):
     """Builds a python dictionary representation of a Phobos model.
 
@@ -701,15 +819,21 @@ def buildModelDictionary(root):
     log("Creating dictionary for robot " + model['name'] + " from object "
         + root.name, "INFO", "buildModelDictionary")
 
-    # create tuples of objects belonging to model
-    objectlist = sUtils.getChildren(root, selected_only=ioUtils.getExpSettings().selectedOnly, include_hidden=False)
-    linklist = [link for link in objectlist if link.phobostype == 'link']
+    # index all objects belonging to model in a single pass over the scene
+    phase('index')
+    index = deriveModelIndex(root, selected_only=ioUtils.getExpSettings().selectedOnly, include_hidden=False)
+    objectsbytype = index['phobostypes']
+    linklist = objectsbytype.get('link', [])
+    linknames = {link.name for link in linklist}
+    count('objects', len(index['objects']))
 
     # digest all the links to derive link and joint information
     log("Parsing links, joints and motors...", "INFO", "buildModelDictionary")
+    phase('links')
+    count('links', len(linklist))
     for link in linklist:
         # parse link and extract joint and motor information
-        linkdict, jointdict, motordict = deriveKinematics(link)
+        linkdict, jointdict, motordict = deriveKinematics(link, index)
         model['links'][linkdict['name']] = linkdict
         if jointdict:  # joint will be None if link is a root
             model['joints'][jointdict['name']] = jointdict
@@ -718,54 +842,47 @@ def buildModelDictionary(root):
         # add inertial information to link
         try:  # if this link-inertial object is no present, we ignore the inertia!
             inertial = bpy.context.scene.objects['inertial_' + linkdict['name']]
-            props = deriveDictEntry(inertial)
+            props = deriveDictEntry(inertial, index)
             if props is not None:
                 model['links'][linkdict['name']]['inertial'] = props
         except KeyError:
             log("No inertia for link " + linkdict['name'], "WARNING", "buildModelDictionary")
 
     # combine inertia if certain objects are left out, and overwrite it
-    inertials = (i for i in objectlist if i.phobostype == 'inertial' and "inertial/inertia" in i)
+    phase('inertia')
+    inertials = (i for i in objectsbytype.get('inertial', []) if "inertial/inertia" in i)
     editlinks = {}
     for i in inertials:
-        if i.parent not in linklist:
-            realparent = sUtils.getEffectiveParent(i)
+        if i.parent is None or i.parent.name not in linknames:
+            realparent = getIndexedParent(i, index)
             if realparent:
-                parentname = nUtils.getObjectName(realparent)
+                parentname = getIndexedName(realparent, index)
                 if parentname in editlinks:
                     editlinks[parentname].append(i)
                 else:
                     editlinks[parentname] = [i]
     for linkname in editlinks:
-        inertials = editlinks[linkname]
         try:
-            inertials.append(bpy.context.scene.objects['inertial_' + linkname])
+            editlinks[linkname].append(bpy.context.scene.objects['inertial_' + linkname])
         except KeyError:
             pass
-        mv, cv, iv = inertiamodel.fuseInertiaData(inertials)
-        iv = inertiamodel.inertiaMatrixToList(iv)
-        if mv is not None and cv is not None and iv is not None:
-            model['links'][linkname]['inertial'] = {'mass': mv, 'inertia': iv,
-                                                    'pose': {'translation': list(cv), 'rotation_euler': [0, 0, 0]}
-                                                    }
+    # fuse the inertials of all links at once
+    for linkname, (mv, cv, iv) in inertiamodel.fuseInertiaDataOfLinks(editlinks).items():
+        model['links'][linkname]['inertial'] = {'mass': mv, 'inertia': iv,
+                                                'pose': {'translation': cv, 'rotation_euler': [0, 0, 0]}
+                                                }
 
     # complete link information by parsing visuals and collision objects
     log("Parsing visual and collision (approximation) objects...", "INFO", "buildModelDictionary")
-    for obj in objectlist:
-        #try:
-            if obj.phobostype in ['visual', 'collision']:
-                props = deriveDictEntry(obj)
-                parentname = nUtils.getObjectName(sUtils.getEffectiveParent(obj))
-                model['links'][parentname][obj.phobostype][nUtils.getObjectName(obj)] = props
-            elif obj.phobostype == 'approxsphere':
-                props = deriveDictEntry(obj)
-                parentname = nUtils.getObjectName(sUtils.getEffectiveParent(obj))
-                model['links'][parentname]['approxcollision'].append(props)
-        #except KeyError:
-        #    try:
-        #        log(parentname + " not found", "ERROR")
-        #    except TypeError:
-        #        log("No parent found for " + obj.name, "ERROR")
+    phase('visuals and collisions')
+    for obj in objectsbytype.get('visual', []) + objectsbytype.get('collision', []):
+        props = deriveDictEntry(obj, index)
+        parentname = getIndexedName(getIndexedParent(obj, index), index)
+        model['links'][parentname][obj.phobostype][getIndexedName(obj, index)] = props
+    for obj in objectsbytype.get('approxsphere', []):
+        props = deriveDictEntry(obj, index)
+        parentname = getIndexedName(getIndexedParent(obj, index), index)
+        model['links'][parentname]['approxcollision'].append(props)
 
     # combine collision information for links
     for linkname in model['links']:
@@ -780,28 +897,29 @@ def buildModelDictionary(root):
 
     # parse sensors and controllers
     log("Parsing sensors and controllers...", "INFO", "buildModelDictionary")
-    for obj in objectlist:
-        if obj.phobostype in ['sensor', 'controller']:
-            props = deriveDictEntry(obj)
-            model[obj.phobostype+'s'][nUtils.getObjectName(obj)] = props
+    phase('sensors and controllers')
+    for obj in objectsbytype.get('sensor', []) + objectsbytype.get('controller', []):
+        props = deriveDictEntry(obj, index)
+        model[obj.phobostype+'s'][getIndexedName(obj, index)] = props
 
     # parse materials
     log("Parsing materials...", "INFO", "buildModelDictionary")
-    model['materials'] = collectMaterials(objectlist)
-    for obj in objectlist:
-        if obj.phobostype == 'visual':
-            mat = obj.active_material
-            try:
-                if mat.name not in model['materials']:
-                    model['materials'][mat.name] = deriveMaterial(mat)  # this should actually never happen
-                linkname = nUtils.getObjectName(sUtils.getEffectiveParent(obj))
-                model['links'][linkname]['visual'][nUtils.getObjectName(obj)]['material'] = mat.name
-            except AttributeError:
-                log("Could not parse material for object "+ obj.name, "ERROR", 'buildModelDictionary')
+    phase('materials')
+    model['materials'] = collectMaterials(objectsbytype.get('visual', []))
+    for obj in objectsbytype.get('visual', []):
+        mat = obj.active_material
+        try:
+            if mat.name not in model['materials']:
+                model['materials'][mat.name] = deriveMaterial(mat)  # this should actually never happen
+            linkname = getIndexedName(getIndexedParent(obj, index), index)
+            model['links'][linkname]['visual'][getIndexedName(obj, index)]['material'] = mat.name
+        except AttributeError:
+            log("Could not parse material for object "+ obj.name, "ERROR", 'buildModelDictionary')
 
     # identify unique meshes
     log("Parsing meshes...", "INFO", "buildModelDictionary")
-    for obj in objectlist:
+    phase('meshes')
+    for obj in index['objects']:
         try:
             if ((obj.phobostype == 'visual' or obj.phobostype == 'collision') and
                     (obj['geometry/type'] == 'mesh') and (obj.data.name not in model['meshes'])):
@@ -814,93 +932,157 @@ def buildModelDictionary(root):
 
     # gather information on groups of objects
     log("Parsing groups...", "INFO", "buildModelDictionary")
+    phase('groups')
     for group in bpy.data.groups:  # TODO: get rid of the "data" part and check for relation to robot
         if len(group.objects) > 0 and nUtils.getObjectName(group, 'group') != "RigidBodyWorld":
             model['groups'][nUtils.getObjectName(group, 'group')] = deriveGroupEntry(group)
 
     # gather information on chains of objects
     log("Parsing chains...", "INFO", "buildModelDictionary")
+    phase('chains')
     chains = []
-    for obj in objectlist:
-        if obj.phobostype == 'link' and 'endChain' in obj:
+    for obj in linklist:
+        if 'endChain' in obj:
             chains.extend(deriveChainEntry(obj))
     for chain in chains:
         model['chains'][chain['name']] = chain
 
     # gather information on lights
     log("Parsing lights...", "INFO", "buildModelDictionary")
-    for obj in objectlist:
-        if obj.phobostype == 'light':
-            model['lights'][nUtils.getObjectName(obj)] = deriveLight(obj)
+    phase('lights')
+    for obj in objectsbytype.get('light', []):
+        model['lights'][getIndexedName(obj, index)] = deriveLight(obj, index)
 
     # add additional data to model
+    phase('text data')
     model.update(deriveTextData(model['name']))
 
     # shorten numbers in dictionary to n decimalPlaces and return it
     log("Rounding numbers...", "INFO", "buildModelDictionary")
+    phase('rounding')
     epsilon = 10**(-ioUtils.getExpSettings().decimalPlaces)  # TODO: implement this separately
     return epsilonToZero(model, epsilon, ioUtils.getExpSettings().decimalPlaces)
 
 
+def mergeAnnotations(model, annotations):
+    """Adds annotations as gathered by io.entities.smurf.gatherAnnotations to the elements of a model dictionary.
+    Data which does not annotate elements, e.g. stored poses, is added to the model under its own name.
+
+    :param model: The model dictionary.
+    :type model: dict
+    :param annotations: The annotation data by category, each a dictionary of annotation lists by element type.
+    :type annotations: dict
+
+    """
+    elements = {}
+    for objtype in ('links', 'joints', 'sensors', 'motors', 'controllers', 'materials'):
+        for name, element in model.get(objtype, {}).items():
+            elements[(objtype[:-1], name)] = element
+    for link in model['links'].values():
+        for objtype in ('collision', 'visual'):
+            for name, element in link.get(objtype, {}).items():
+                elements[(objtype, name)] = element
+        if 'inertial' in link and 'name' in link['inertial']:
+            elements[('inertial', link['inertial']['name'])] = link['inertial']
+    elementtypes = {elementtype for elementtype, name in elements}
+    for category in sorted(annotations):
+        data = annotations[category]
+        if not isinstance(data, dict):
+            log("Skipping annotations " + category + ", which are no dictionary.", 'WARNING', 'mergeAnnotations')
+            continue
+        if category in data and category not in elementtypes:
+            # custom data is written as list of its values (see io.entities.smurf.exportSmurf)
+            values = data[category] if isinstance(data[category], list) else [data[category]]
+            model[category] = {value['name'] if isinstance(value, dict) and 'name' in value else i: value
+                               for i, value in enumerate(values)}
+            continue
+        for elementtype in data:
+            for entry in data[elementtype] if isinstance(data[elementtype], list) else []:
+                name = entry.get('name') if isinstance(entry, dict) else None
+                element = elements.get((elementtype, name)) if name is not None else None
+                if element is None:
+                    log("Could not find " + str(elementtype) + " " + str(name) + " annotated in " + category + ".",
+                        'WARNING', 'mergeAnnotations')
+                    continue
+                element['$' + category] = {key: entry[key] for key in entry if key != 'name'}
+
+
+@profiled
 def buildModelFromDictionary(model):
     """Creates the Blender representation of the imported model, using a model dictionary.
 
     """
     log("Creating Blender model...", 'INFO', 'buildModelFromDictionary')
+    geometrymodel.resetMeshImportStats()
 
     log("Creating links...", 'INFO', 'buildModelFromDictionary')
+    phase('links')
+    count('links', len(model['links']))
     for l in model['links']:
         link = model['links'][l]
         linkmodel.createLink(link)
 
     log("Creating joints...", 'INFO', 'buildModelFromDictionary')
-    for j in model['joints']:
-        joint = model['joints'][j]
-        jointmodel.createJoint(joint)
+    phase('joints')
+    count('joints', len(model['joints']))
+    jointmodel.createJoints([model['joints'][j] for j in model['joints']])
 
-    # build tree recursively and correct translation & rotation on the fly
+    # place the whole tree in one pass, so that each link's world matrix is known when its children are placed
     log("Placing links...", 'INFO', 'buildModelFromDictionary')
+    phase('placing links')
+    linkworlds = linkmodel.placeLinks(model)
     for l in model['links']:
         if 'parent' not in model['links'][l]:
-            root = model['links'][l]
-            linkmodel.placeChildLinks(model, root)
             log("Assigning model name...", 'INFO', 'buildModelFromDictionary')
             try:
-                rootlink = sUtils.getRoot(bpy.data.objects[root['name']])
-                rootlink['modelname'] = model['name']
-                rootlink.location=(0, 0, 0)
+                bpy.data.objects[l]['modelname'] = model['name']
             except KeyError:
                 log("Could not assign model name to root link.", "ERROR")
 
     log("Creating visual and collision objects...", 'INFO', 'buildModelFromDictionary')
+    phase('visuals and collisions')
     for link in model['links']:
-        linkmodel.placeLinkSubelements(model['links'][link])
+        linkmodel.placeLinkSubelements(model['links'][link], linkworlds.get(link))
+    meshstats = geometrymodel.getMeshImportStats()
+    log("Loaded " + str(meshstats['loaded']) + " mesh files for " + str(meshstats['referenced'])
+        + " mesh references (" + str(meshstats['instances']) + " unique file/scale pairs).",
+        'INFO', 'buildModelFromDictionary')
+    count('mesh files', meshstats['loaded'])
+    count('mesh references', meshstats['referenced'])
 
     try:
         log("Creating sensors...", 'INFO', 'buildModelFromDictionary')
+        phase('sensors')
         for s in model['sensors']:
-            sensormodel.createSensor(model['sensors'][s])
+            sensormodel.createSensorFromDictionary(model['sensors'][s],
+                                                   linkworlds.get(model['sensors'][s].get('link')))
     except KeyError:
         log("No sensors in model " + model['name'], 'INFO', 'buildModelFromDictionary')
 
     try:
         log("Creating motors...", 'INFO', 'buildModelFromDictionary')
+        phase('motors')
         for m in model['motors']:
+            # the motor properties are stored in the link object of the motor's joint
             eUtils.addDictionaryToObj(model['motors'][m],
-                                      model['joints'][model['motors'][m]['joint']],
+                                      bpy.data.objects[model['joints'][model['motors'][m]['joint']]['child']],
                                       category='motor')
     except KeyError:
         log("No motors in model " + model['name'], 'INFO', 'buildModelFromDictionary')
 
     try:
         log("Creating controllers...", 'INFO', 'buildModelFromDictionary')
-        for c in model['controllers']:
-            controllermodel.createController(model['controllers'][c])
+        phase('controllers')
+        if model['controllers']:
+            # TODO: create controllers, there is no operator to add them yet
+            log("Skipping " + str(len(model['controllers'])) + " controllers, which can not be created yet.",
+                'WARNING', 'buildModelFromDictionary')
     except KeyError:
         log("No controllers in model " + model['name'], 'INFO', 'buildModelFromDictionary')
 
     try:
         log("Creating groups...", 'INFO', 'buildModelFromDictionary')
+        phase('groups')
         for g in model['groups']:
             createGroup(model['groups'][g])
     except KeyError:
@@ -908,6 +1090,7 @@ def buildModelFromDictionary(model):
 
     try:
         log("Creating chains...", 'INFO', 'buildModelFromDictionary')
+        phase('chains')
         for ch in model['chains']:
             createChain(model['chains'][ch])
     except KeyError:
@@ -915,18 +1098,16 @@ def buildModelFromDictionary(model):
 
     try:
         log("Creating lights...", 'INFO', 'buildModelFromDictionary')
+        phase('lights')
         for l in model['lights']:
-            lightmodel.createLight(model['lights'][l])
+            lightmodel.addLight(model['lights'][l])
     except KeyError:
         log("No lights in model " + model['name'], 'INFO', 'buildModelFromDictionary')
 
-    # FIXME: this is a trick to force Blender to apply matrix_local
-    # AAAAAARGH: THIS DOES NOT WORK!
-    for obj in bpy.data.objects:
-        bUtils.setObjectLayersActive(obj)
-    bpy.ops.object.mode_set(mode='OBJECT')
-    bpy.ops.object.select_all(action='SELECT')
-    bpy.ops.transform.translate(value=(0, 0, 0))
+    # the matrices were set without operators, so one update computes the world matrices of the whole model
+    phase('scene update')
+    bpy.context.scene.layers = bUtils.defLayers([defs.layerTypes[t] for t in defs.layerTypes])
+    bpy.context.scene.update()
 
 
 def createGroup(group):
@@ -38,15 +38,18 @@ from phobos.phoboslog import log
 from phobos.utils.io import securepath
 
 
-def deriveObjectPose(obj):
+def deriveObjectPose(obj, effectiveparent=None):
     """Derives a pose of link, visual or collision object.
 
     :param obj: The blender object to derive the pose from.
     :type obj: bpy_types.Object
+    :param effectiveparent: The effective parent of obj, if already known. It is looked up otherwise.
+    :type effectiveparent: bpy_types.Object
     :return: dict
 
     """
-    effectiveparent = sUtils.getEffectiveParent(obj)
+    if effectiveparent is None:
+        effectiveparent = sUtils.getEffectiveParent(obj)
     matrix = eUtils.getCombinedTransform(obj, effectiveparent)
     pose = {'rawmatrix': matrix,
             'matrix': [list(vector) for vector in list(matrix)],
@@ -32,38 +32,54 @@ import mathutils
 from phobos import defs
 import phobos.utils.blender as bUtils
 import phobos.utils.selection as sUtils
+import phobos.utils.editing as eUtils
 import phobos.utils.naming as nUtils
 
 
-def createSensor(self, sensor):
+def getSensorReferences(sensor):
+    """Returns the names of the links, joints or motors a sensor dictionary refers to.
+
+    :param sensor: The sensor dictionary.
+    :type sensor: dict
+    :return: list -- of names, None if the sensor refers to nothing.
+
+    """
     if 'link' in sensor:
-        reference = [sensor['link']]
+        return [sensor['link']]
     elif 'joint' in sensor:
-        reference = [sensor['joint']]
-        pass
-    elif 'links' in sensor:
-        reference = sensor['links']
-    elif 'joints' in sensor:
-        reference = sensor['joints']
-    elif 'motors' in sensor:
-        reference = sensor['motors']
-    else:
-        reference = None
+        return [sensor['joint']]
+    for key in ('links', 'joints', 'motors'):
+        if key in sensor:
+            return sensor[key]
+    return None
 
-    # FIXME: This needs to be resolved in a generic way!
-    createSensor(sensor, reference)
-    attachSensor(sensor)
+
+def createSensorFromDictionary(sensor, linkworld=None):
+    """Creates a sensor of a model dictionary and attaches it to its link.
+
+    :param sensor: The sensor dictionary.
+    :type sensor: dict
+    :param linkworld: The world matrix of the sensor's link, if it changed since the last scene update.
+    :type linkworld: mathutils.Matrix
+    :return: bpy_types.Object -- the new sensor object.
+
+    """
+    names = getSensorReferences(sensor)
+    reference = [bpy.data.objects[name] for name in names if name in bpy.data.objects] if names else None
+    newsensor = createSensor(sensor, reference)
+    attachSensor(sensor, linkworld)
+    return newsensor
 
 
-def attachSensor(self, sensor):
+def attachSensor(sensor, linkworld=None):
     """This function attaches a given sensor to its parent link.
 
     :param sensor: The sensor you want to attach to its parent link.
     :type sensor: dict
+    :param linkworld: The world matrix of the link, if it changed since the last scene update.
+    :type linkworld: mathutils.Matrix
 
     """
-    bpy.context.scene.layers = bUtils.defLayers([defs.layerTypes[t] for t in defs.layerTypes])
-    #try:
     if 'pose' in sensor:
         urdf_geom_loc = mathutils.Matrix.Translation(sensor['pose']['translation'])
         urdf_geom_rot = mathutils.Euler(tuple(sensor['pose']['rotation_euler']), 'XYZ').to_matrix().to_4x4()
@@ -73,15 +89,11 @@ def attachSensor(self, sensor):
     sensorobj = bpy.data.objects[sensor['name']]
     if 'link' in sensor:
         parentLink = sUtils.getObjectByNameAndType(sensor['link'], 'link')
-        #parentLink = bpy.data.objects['link_' + sensor['link']]
-        sUtils.selectObjects([sensorobj, parentLink], True, 1)
-        bpy.ops.object.parent_set(type='BONE_RELATIVE')
+        eUtils.parentToBone(sensorobj, parentLink, linkworld)
     else:
         #TODO: what?
         pass
     sensorobj.matrix_local = urdf_geom_loc * urdf_geom_rot
-    #except KeyError:
-    #    log("inconsistent data on sensor: "+ sensor['name'], "ERROR")
 
 
 def cameraRotLock(object):
@@ -111,8 +123,8 @@ def createSensor(sensor, reference, origin=mathutils.Matrix()):
 
     :param sensor: The phobos representation of the new sensor.
     :type sensor: dict
-    :param reference: This is an object to add a parent relationship to.
-    :type reference: bpy_types.Object
+    :param reference: The objects the sensor refers to, it is parented to the first one.
+    :type reference: list
     :param origin: The new sensors origin.
     :type origin: mathutils.Matrix
     :return: The newly created sensor object
@@ -125,17 +137,15 @@ def createSensor(sensor, reference, origin=mathutils.Matrix()):
                            rotation=origin.to_euler(),
                            layers=bUtils.defLayers([defs.layerTypes['sensor']]))
         newsensor = bpy.context.active_object
-        if reference is not None:
-            sUtils.selectObjects([newsensor, reference], clear=True, active=1)
-            bpy.ops.object.parent_set(type='BONE_RELATIVE')
+        if reference:
+            eUtils.parentToBone(newsensor, reference[0])
     elif sensor['type'] in ['RaySensor', 'RotatingRaySensor', 'ScanningSonar', 'MultiLevelLaserRangeFinder']:
         # TODO: create a proper ray sensor scanning layer disc here
         newsensor = bUtils.createPrimitive(sensor['name'], 'disc', (0.5, 36),
                                             defs.layerTypes['sensor'], 'phobos_laserscanner',
                                             origin.to_translation(), protation=origin.to_euler())
-        if reference is not None:
-            sUtils.selectObjects([newsensor, reference], clear=True, active=1)
-            bpy.ops.object.parent_set(type='BONE_RELATIVE')
+        if reference:
+            eUtils.parentToBone(newsensor, reference[0])
     else:  # contact, force and torque sensors (or unknown sensors)
         newsensor = bUtils.createPrimitive(sensor['name'], 'sphere', 0.05,
                                             defs.layerTypes['sensor'], 'phobos_sensor',
@@ -146,9 +156,8 @@ def createSensor(sensor, reference, origin=mathutils.Matrix()):
             newsensor['sensor/nodes'] = sorted([nUtils.getObjectName(ref) for ref in reference])
         elif 'Joint' in sensor['type'] or 'Motor' in sensor['type']:
             newsensor['sensor/joints'] = sorted([nUtils.getObjectName(ref) for ref in reference])
-        if reference is not None:
-            sUtils.selectObjects([newsensor, reference], clear=True, active=1)
-            bpy.ops.object.parent_set(type='BONE_RELATIVE')
+        if reference:
+            eUtils.parentToBone(newsensor, reference[0])
     # set sensor properties
     newsensor.phobostype = 'sensor'
     newsensor.name = sensor['name']
@@ -265,6 +265,8 @@ class SyncMassesOperator(Operator):
             link['masschanged'] = t.isoformat()
             if self.updateinertial:
                 inertia.createInertials(link)
+        if self.updateinertial:
+            inertia.saveMeshInertiaCache()
         return {'FINISHED'}
 
     @classmethod
@@ -590,6 +592,10 @@ class CreateInertialOperator(Operator):
                 i += 1
         if show_progress:
             wm.progress_end()
+        inertia.saveMeshInertiaCache()
+        stats = inertia.getMeshInertiaCacheStats()
+        log("Mesh inertia cache: " + str(stats['hits']) + " hits, " + str(stats['misses']) + " misses, "
+            + str(stats['entries']) + " entries", "INFO", "CreateInertialOperator")
         return {'FINISHED'}
 
     @classmethod
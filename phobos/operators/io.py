@@ -29,12 +29,14 @@ along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
 import os
 import yaml
 import sys
+import time
 import inspect
 import shutil
 
 import bpy
 import bgl
-import glob
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from bpy.types import Operator
 from bpy.props import (EnumProperty, StringProperty, FloatProperty, IntProperty,
                       BoolProperty)
@@ -45,13 +47,16 @@ import phobos.model.models as models
 import phobos.model.links as links
 import phobos.utils.selection as sUtils
 import phobos.utils.io as ioUtils
+import phobos.utils.profiling as profiling
 from phobos.utils.io import securepath
 import phobos.io.entities as entities
 import phobos.io.meshes as meshes
 import phobos.io.scenes as scenes
 from phobos.io.entities import entity_types
 from phobos.io.entities.entities import deriveGenericEntity
+from phobos.io.meshes.meshes import getMeshBuffers, hashMeshBuffers
 from phobos.io.scenes import scene_types
+from phobos.utils.library import LibraryIndex
 
 
 class ExportSceneOperator(Operator):
@@ -148,11 +153,36 @@ class ExportModelOperator(Operator):
         return {'FINISHED'}
 
 
+@profiling.profiled
 def exportModel(root, export_path, entitytypes=None):
+    # the manifest of the previous export to this path allows to skip everything that did not change
+    ioUtils.currentManifest = ioUtils.ExportManifest(securepath(export_path))
+    try:
+        exportModelFiles(root, export_path, entitytypes)
+        manifest = ioUtils.currentManifest
+        manifest.save()
+        profiling.phase(None)
+        profiling.count('written files', len(manifest.written))
+        profiling.count('skipped files', len(manifest.skipped))
+        log("Wrote " + str(len(manifest.written)) + " files, skipped " + str(len(manifest.skipped))
+            + " unchanged files.", "INFO", "exportModel")
+    finally:
+        ioUtils.currentManifest = None
+
+
+def exportModelFiles(root, export_path, entitytypes=None):
     # derive model
+    profiling.phase('model')
     model = models.buildModelDictionary(root)
+    # keep the date of the previous export if the model did not change, so that the files stay the same
+    manifest = ioUtils.currentManifest
+    modeldigest = ioUtils.hashObject({key: model[key] for key in model if key != 'date'})
+    if manifest.inputs.get('model', {}).get('hash') == modeldigest:
+        model['date'] = manifest.inputs['model']['date']
+    manifest.inputs['model'] = {'hash': modeldigest, 'date': model['date']}
 
     # export model in selected formats
+    profiling.phase('entities')
     if entitytypes is None:
         entitytypes = entities.entity_types
     for entitytype in entitytypes:
@@ -167,7 +197,8 @@ def exportModel(root, export_path, entitytypes=None):
             model_path = export_path
         securepath(model_path)
         try:
-            entities.entity_types[entitytype]['export'](model, model_path)
+            with profiling.span('export ' + entitytype):
+                entities.entity_types[entitytype]['export'](model, model_path)
             log("Export model: " + model['name'] + ' as ' + entitytype + " to "
                 + model_path, "DEBUG", 'exportModel')
         except KeyError:
@@ -177,22 +208,23 @@ def exportModel(root, export_path, entitytypes=None):
 
     # TODO: Move mesh export to individual formats? This is practically SMURF
     # export meshes in selected formats
+    profiling.phase('meshes')
+    mesh_paths = {}
     for meshtype in meshes.mesh_types:
-        mesh_path = ioUtils.getOutputMeshpath(export_path, meshtype)
-        try:
-            typename = "export_mesh_" + meshtype
-            if getattr(bpy.data.worlds[0], typename):
-                securepath(mesh_path)
-                for meshname in model['meshes']:
-                    meshes.mesh_types[meshtype]['export'](model['meshes'][meshname], mesh_path)
-        except KeyError:
-            log("No export function available for selected mesh function: " + meshtype,
-                "ERROR", "ExportModelOperator")
-            print(sys.exc_info()[0])
+        typename = "export_mesh_" + meshtype
+        if getattr(bpy.data.worlds[0], typename, False):
+            if 'export' not in meshes.mesh_types[meshtype]:
+                log("No export function available for selected mesh function: " + meshtype,
+                    "ERROR", "ExportModelOperator")
+                continue
+            mesh_paths[meshtype] = securepath(ioUtils.getOutputMeshpath(export_path, meshtype))
+    if mesh_paths:
+        exportMeshes(model['meshes'], mesh_paths)
 
     # TODO: Move texture export to individual formats? This is practically SMURF
     # TODO: Also, this does not properly take care of textures embedded in a .blend file
     # export textures
+    profiling.phase('textures')
     if ioUtils.textureExportEnabled():
         for materialname in model['materials']:
             mat = model['materials'][materialname]
@@ -201,13 +233,97 @@ def exportModel(root, export_path, entitytypes=None):
                     sourcepath = os.path.join(os.path.expanduser(bpy.path.abspath('//')), mat[texturetype])
                     if os.path.isfile(sourcepath):
                         texture_path = securepath(os.path.join(export_path, 'textures'))
+                        targetpath = os.path.join(texture_path, os.path.basename(mat[texturetype]))
+                        if ioUtils.skipUnchanged(targetpath, ioUtils.hashFile(sourcepath)):
+                            continue
                         log("Exporting textures to " + texture_path, "INFO", "ExportModelOperator")
                         try:
-                            shutil.copy(sourcepath, os.path.join(texture_path, os.path.basename(mat[texturetype])))
+                            shutil.copy(sourcepath, targetpath)
+                            manifest.record(targetpath)
+                            profiling.count('textures')
                         except shutil.SameFileError:
                             log("{} already in place".format(texturetype), "INFO", "ExportModelOperator")
 
 
+def writeMeshFile(writer, buffers, filepath):
+    """Writes mesh buffers with a mesh type's writer and returns the time it took, used by the mesh workers.
+
+    """
+    start = time.perf_counter()
+    writer(buffers, filepath)
+    return time.perf_counter() - start
+
+
+@profiling.profiled
+def exportMeshes(meshobjects, mesh_paths):
+    """Exports meshes in several formats. The mesh buffers are read on the main thread, while the files of mesh
+    types providing a writer for them are written by a pool of threads or processes as configured in the export
+    settings. Mesh types without such a writer are exported on the main thread. Files whose mesh did not change
+    since the last export to the same directory are skipped (see utils.io.ExportManifest).
+
+    Every file is written by exactly one worker from buffers that are complete before it starts, so the files do
+    not depend on the number of workers or the order in which they finish.
+
+    :param meshobjects: The objects to export by mesh name, as in the 'meshes' of a model dictionary.
+    :type meshobjects: dict
+    :param mesh_paths: The directory to export each mesh type to.
+    :type mesh_paths: dict
+    :return: dict -- the times in seconds spent for each mesh on reading ('buffers') and on each written mesh type.
+
+    """
+    expsettings = ioUtils.getExpSettings()
+    jobs = expsettings.meshJobs or os.cpu_count() or 1
+    writetypes = [t for t in mesh_paths if 'write' in meshes.mesh_types[t]]
+    timings = {meshname: {} for meshname in meshobjects}
+    start = time.perf_counter()
+    pool = None
+    if jobs > 1 and writetypes:
+        pool = (ProcessPoolExecutor if expsettings.meshJobsProcesses else ThreadPoolExecutor)(max_workers=jobs)
+    try:
+        futures = []
+        for meshname in sorted(meshobjects):
+            obj = meshobjects[meshname]
+            typestart = time.perf_counter()
+            buffers = getMeshBuffers(obj)
+            digest = hashMeshBuffers(buffers)
+            timings[meshname]['buffers'] = time.perf_counter() - typestart
+            profiling.count('meshes')
+            profiling.count('vertices', len(buffers['vertices']) // 3)
+            for meshtype in sorted(mesh_paths):
+                meshtype_dict = meshes.mesh_types[meshtype]
+                filepath = os.path.join(mesh_paths[meshtype], meshname + '.' + meshtype_dict['extensions'][0])
+                # files exported from the same geometry before are kept
+                if ioUtils.skipUnchanged(filepath, meshtype + ':' + digest):
+                    profiling.count('skipped files')
+                    continue
+                if meshtype in writetypes:
+                    args = (meshtype_dict['write'], buffers, filepath)
+                    if pool:
+                        futures.append((meshname, meshtype, filepath, pool.submit(writeMeshFile, *args)))
+                        continue
+                    timings[meshname][meshtype] = writeMeshFile(*args)
+                else:
+                    typestart = time.perf_counter()
+                    meshtype_dict['export'](obj, mesh_paths[meshtype])
+                    timings[meshname][meshtype] = time.perf_counter() - typestart
+                if ioUtils.currentManifest is not None:
+                    ioUtils.currentManifest.record(filepath)
+        for meshname, meshtype, filepath, future in futures:
+            timings[meshname][meshtype] = future.result()
+            if ioUtils.currentManifest is not None:
+                ioUtils.currentManifest.record(filepath)
+    finally:
+        if pool:
+            pool.shutdown()
+    for meshname in sorted(timings):
+        log(meshname + ": " + ", ".join(key + " " + '{0:.3f}'.format(timings[meshname][key]) + " s"
+                                        for key in sorted(timings[meshname])), "DEBUG", "exportMeshes")
+    log("Exported " + str(len(meshobjects)) + " meshes as " + ", ".join(sorted(mesh_paths)) + " with "
+        + str(jobs if pool else 1) + " workers in " + '{0:.2f}'.format(time.perf_counter() - start) + " s",
+        "INFO", "exportMeshes")
+    return timings
+
+
 class ImportModelOperator(bpy.types.Operator):  # formerly "RobotModelImporter"
     """Import robot model file from various formats"""
     bl_idname = "phobos.import_robot_model"
@@ -231,9 +347,10 @@ class ImportModelOperator(bpy.types.Operator):  # formerly "RobotModelImporter"
     def execute(self, context):
         try:
             log("Importing " + self.filepath + ' as ' + self.entitytype, "INFO", 'ImportModelOperator')
-            model = entities.entity_types[self.entitytype]['import'](self.filepath)
-            #bUtils.cleanScene()
-            models.buildModelFromDictionary(model)
+            with profiling.span('import ' + self.entitytype):
+                model = entities.entity_types[self.entitytype]['import'](self.filepath)
+                #bUtils.cleanScene()
+                models.buildModelFromDictionary(model)
         except KeyError:
             log("No import function available for selected model type: " + self.entitytype,
                 "ERROR", "ImportModelOperator")
@@ -304,32 +421,24 @@ def generateLibEntries(param1, param2): #FIXME: parameter?
 
 
 def loadModelsAndPoses():
+    """Fills the models and poses list of the add-on preferences from the library index of the models folder,
+    which is rescanned for changes first (see utils.library.LibraryIndex).
+
+    """
     if bpy.context.user_preferences.addons["phobos"].preferences.modelsfolder:
         modelsfolder = os.path.abspath(bpy.context.user_preferences.addons["phobos"].preferences.modelsfolder)
     else:
         modelsfolder = ''
     modelsPosesColl = bpy.context.user_preferences.addons["phobos"].preferences.models_poses
-    robots_found = []
-    print(modelsfolder)
-    for root, dirs, files in os.walk(modelsfolder):
-        for file in files:
-            if os.path.splitext(file)[-1] == '.smurf':
-                robots_found.append(os.path.join(root, file))
-    robots_dict = dict()
-    for robot in robots_found:
-        with open(robot, 'r') as robot_smurf:
-            robot_yml = yaml.load(robot_smurf)
-            model_name = robot_yml["modelname"]
-            robot_files = robot_yml["files"]
-            for file in robot_files:
-                if file.split('_')[-1] == "poses.yml":
-                    if model_name not in robots_dict:
-                        robots_dict[model_name] = []
-                    with open(os.path.join(os.path.dirname(robot), file)) as poses:
-                        poses_yml = yaml.load(poses)
-                        for pose in poses_yml['poses']:
-                            robots_dict[model_name].append({"posename": pose['name']})
-                            robots_dict[model_name][-1]["robotpath"] = os.path.dirname(robot)
+    robots_dict = {}
+    if modelsfolder:
+        dbpath = os.path.join(bpy.utils.user_resource('CONFIG', path='phobos', create=True), 'library.sqlite')
+        library = LibraryIndex(dbpath)
+        try:
+            library.update(modelsfolder)
+            robots_dict = OrderedDict(library.getModels(modelsfolder))
+        finally:
+            library.close()
 
     modelsPosesColl.clear()
     for model_name in robots_dict.keys():
@@ -352,17 +461,11 @@ def loadModelsAndPoses():
             item.type   = "robot_pose"
             item.robot_name = model_name
             item.icon   = "X_VEC"
-            search_path = pose["robotpath"]
-            if os.path.split(search_path)[-1] == "smurf":
-                search_path = os.path.dirname(search_path)
-            for file in (glob.glob(search_path + "/**/" + model_name + "_" + pose['posename'] + ".*") +
-                         glob.glob(search_path + "/" + model_name + "_" + pose['posename'] + ".*")):
-                if (os.path.splitext(file)[-1].lower() == ".stl") or \
-                   (os.path.splitext(file)[-1].lower() == ".obj"):
-                        item.model_file = os.path.join(search_path, file)
-                if (os.path.splitext(file)[-1].lower() == ".png"):
-                    item.preview = os.path.join(search_path, file)
-                    item.name = os.path.split(file)[-1]
+            if pose["model_file"]:
+                item.model_file = pose["model_file"]
+            if pose["preview"]:
+                item.preview = pose["preview"]
+                item.name = os.path.split(pose["preview"])[-1]
 
 
 class ReloadModelsAndPosesOperator(bpy.types.Operator):
@@ -36,10 +36,12 @@ from bpy.props import (BoolProperty, IntProperty, StringProperty, EnumProperty,
 from bpy.types import AddonPreferences
 
 from . import defs
-from phobos.phoboslog import loglevels
+from phobos.phoboslog import loglevels, updateLogSettings
+from phobos.utils.profiling import updateProfileSettings
 from phobos.operators.io import loadModelsAndPoses
 from phobos.io import entities
 from phobos.io import meshes
+from phobos.io.plugins import registerPluginFolder
 from phobos.io import scenes
 
 
@@ -61,23 +63,49 @@ class PhobosPrefs(AddonPreferences):
     logfile = StringProperty(
         name="logfile",
         subtype="FILE_PATH",
-        default="."
+        default=".",
+        update=updateLogSettings
     )
 
     loglevel = EnumProperty(
         name="loglevel",
         items=tuple(((l,)*3 for l in loglevels)),
-        default="ERROR"
+        default="ERROR",
+        update=updateLogSettings
     )
 
     logtofile = BoolProperty(
         name="logtofile",
-        default=False
+        default=False,
+        update=updateLogSettings
     )
 
     logtoterminal = BoolProperty(
         name="logtoterminal",
-        default=True
+        default=True,
+        update=updateLogSettings
+    )
+
+    logjson = BoolProperty(
+        name="logjson",
+        default=False,
+        description="Write the log file as JSON lines with time, level, origin and message",
+        update=updateLogSettings
+    )
+
+    profiling = BoolProperty(
+        name="profiling",
+        default=False,
+        description="Time the phases of export and import and write them as Chrome trace",
+        update=updateProfileSettings
+    )
+
+    profilefolder = StringProperty(
+        name="profilefolder",
+        subtype="DIR_PATH",
+        default="",
+        description="Folder of the trace files, the temporary folder if empty",
+        update=updateProfileSettings
     )
 
     modelsfolder = StringProperty(
@@ -89,7 +117,8 @@ class PhobosPrefs(AddonPreferences):
     exportpluginsfolder = StringProperty(
         name='exportpluginsfolder',
         subtype='DIR_PATH',
-        default='.'
+        default='.',
+        description="Folder with a plugins.yml manifest of third-party plugins, registered on startup"
     )
 
     models_poses = CollectionProperty(type=ModelPoseProp)
@@ -101,6 +130,9 @@ class PhobosPrefs(AddonPreferences):
         layout.prop(self, "logtofile", text="write to logfile")
         layout.prop(self, "logtoterminal", text="only display in terminal")
         layout.prop(self, "loglevel", text="log level")
+        layout.prop(self, "logjson", text="log file as JSON lines")
+        layout.prop(self, "profiling", text="profile export and import")
+        layout.prop(self, "profilefolder", text="trace folder")
         layout.separator()
         layout.label(text="Folders")
         layout.prop(self, "modelsfolder", text="models folder")
@@ -126,6 +158,19 @@ class PhobosExportSettings(bpy.types.PropertyGroup):
     outputMeshtype = EnumProperty(items=getMeshTypeListForEnumProp,
                                   name='link',
                                   description="Mesh type to use in exported entity/scene files.")
+    meshJobs = IntProperty(name="Mesh jobs", default=1, min=0,
+                           description="Number of workers writing mesh files (0: one per CPU, 1: no workers)")
+    meshJobsProcesses = BoolProperty(name="Use processes", default=False,
+                                     description="Write mesh files in forked worker processes instead of threads")
+    srdfCollisionSamples = IntProperty(name="SRDF collision samples", default=0, min=0,
+                                       description="Number of random joint configurations sampled to disable never "
+                                                   "and always colliding link pairs in the SRDF (0: bitmasks only)")
+    srdfCollisionJobs = IntProperty(name="SRDF collision jobs", default=1, min=0,
+                                    description="Number of workers testing the sampled collisions of the SRDF "
+                                                "(0: one per CPU, 1: no workers)")
+    srdfCollisionProcesses = BoolProperty(name="Use processes", default=False,
+                                          description="Test the SRDF collisions in forked worker processes instead "
+                                                      "of threads")
 
 
 class Mesh_Export_UIList(bpy.types.UIList):
@@ -389,6 +434,9 @@ class PhobosExportPanel(bpy.types.Panel):
             if 'export' in entities.entity_types[entitytype] and 'extensions' in entities.entity_types[entitytype]:
                 typename = "export_entity_" + entitytype
                 cmodel.prop(bpy.data.worlds[0], typename)
+        cmodel.prop(bpy.data.worlds[0].phobosexportsettings, 'srdfCollisionSamples')
+        cmodel.prop(bpy.data.worlds[0].phobosexportsettings, 'srdfCollisionJobs')
+        cmodel.prop(bpy.data.worlds[0].phobosexportsettings, 'srdfCollisionProcesses')
 
         cmesh = inlayout.column(align=True)
         cmesh.label(text="Meshes")
@@ -397,6 +445,8 @@ class PhobosExportPanel(bpy.types.Panel):
                 typename = "export_mesh_" + meshtype
                 cmesh.prop(bpy.data.worlds[0], typename)
         cmesh.prop(bpy.data.worlds[0].phobosexportsettings, 'outputMeshtype')
+        cmesh.prop(bpy.data.worlds[0].phobosexportsettings, 'meshJobs')
+        cmesh.prop(bpy.data.worlds[0].phobosexportsettings, 'meshJobsProcesses')
 
         cscene = inlayout.column(align=True)
         cscene.label(text="Scenes")
@@ -492,6 +542,20 @@ def register():
         name="type",
         description="Phobos object type")
 
+    # Register classes (cannot be automatic, as panels are placed in gui in the registering order)
+    #     for key, classdef in inspect.getmembers(sys.modules[__name__], inspect.isclass):
+    #         try:
+    #             if classdef.__bases__[0] != bpy.types.Panel:
+    #                 bpy.utils.register_class(classdef)
+    #         except ValueError:
+    #             print('Error with class registration:', key, classdef)
+    bpy.utils.register_class(ModelPoseProp)
+    bpy.utils.register_class(PhobosPrefs)
+
+    # Register third-party plugins, their modules are imported when they are used
+    registerPluginFolder(bpy.context.user_preferences.addons["phobos"].preferences.exportpluginsfolder)
+    updateProfileSettings(bpy.context.user_preferences.addons["phobos"].preferences)
+
     # Add settings to world to preserve settings for every model
     for meshtype in meshes.mesh_types:
         if 'export' in meshes.mesh_types[meshtype]:
@@ -508,15 +572,6 @@ def register():
             typename = "export_scene_" + scenetype
             setattr(bpy.types.World, typename, BoolProperty(name=scenetype, default=False))
 
-    # Register classes (cannot be automatic, as panels are placed in gui in the registering order)
-    #     for key, classdef in inspect.getmembers(sys.modules[__name__], inspect.isclass):
-    #         try:
-    #             if classdef.__bases__[0] != bpy.types.Panel:
-    #                 bpy.utils.register_class(classdef)
-    #         except ValueError:
-    #             print('Error with class registration:', key, classdef)
-    bpy.utils.register_class(ModelPoseProp)
-    bpy.utils.register_class(PhobosPrefs)
     bpy.utils.register_class(PhobosExportSettings)
     #bpy.utils.register_class(Mesh_Export_UIList)
     #bpy.utils.register_class(Models_Poses_UIList)
@@ -32,11 +32,28 @@ Created on 05 Dec 2014
 
 """
 
-import bpy
+import sys
+import json
+import time
+import atexit
+import threading
 from datetime import datetime
+import bpy
 
 # levels of detail for logging
 loglevels = ('NONE', 'ERROR', 'WARNING', 'INFO', 'DEBUG')
+levelIndices = {level: index for index, level in enumerate(loglevels)}
+
+# the log preferences, read from the add-on preferences on the first message and when they are changed
+logSettings = {'loaded': False, 'level': 1, 'tofile': False, 'toterminal': True, 'json': False, 'path': None}
+
+# the open log file, which is flushed by a background thread every flushInterval seconds
+logFile = {'stream': None, 'timer': None}
+flushInterval = 1.0
+
+# the formatted date of the current minute, which is shared by all messages logged in this minute
+logDate = {'minute': None, 'date': ''}
+
 
 class col:
     """
@@ -76,12 +93,77 @@ def decorate(level):
         return level
 
 
-def log(message, level="INFO", origin=None, prefix=""):
+def updateLogSettings(prefs=None, context=None):
+    """Reads the log preferences into logSettings and reopens the log file if it changed.
+    This is the update function of the log properties of the add-on preferences.
+
+    :param prefs: The preferences of the add-on, looked up if None.
+    :type prefs: bpy.types.AddonPreferences
+    """
+    if prefs is None:
+        try:
+            prefs = bpy.context.user_preferences.addons["phobos"].preferences
+        except (AttributeError, KeyError):
+            return
+    logSettings['level'] = levelIndices[prefs.loglevel]
+    logSettings['tofile'] = prefs.logtofile
+    logSettings['toterminal'] = prefs.logtoterminal
+    logSettings['json'] = getattr(prefs, 'logjson', False)
+    if logSettings['path'] != prefs.logfile or not logSettings['tofile']:
+        closeLogFile()
+    logSettings['path'] = prefs.logfile
+    logSettings['loaded'] = True
+
+
+def closeLogFile():
+    """Flushes and closes the log file, it is opened again by the next message written to it.
+
+    """
+    stream, logFile['stream'] = logFile['stream'], None
+    if stream is not None:
+        stream.close()
+
+
+def flushLogFile():
+    while logFile['timer'] is threading.current_thread():
+        time.sleep(flushInterval)
+        stream = logFile['stream']
+        if stream is not None:
+            try:
+                stream.flush()
+            except (OSError, ValueError):
+                pass
+
+
+def writeLogFile(line):
+    if logFile['stream'] is None:
+        logFile['stream'] = open(logSettings['path'], 'a', buffering=1 << 16)
+        if logFile['timer'] is None:
+            logFile['timer'] = threading.Thread(target=flushLogFile, name='phoboslog', daemon=True)
+            logFile['timer'].start()
+    logFile['stream'].write(line)
+
+
+def getLogDate(now):
+    minute = int(now // 60)
+    if minute != logDate['minute']:
+        logDate['minute'] = minute
+        logDate['date'] = datetime.fromtimestamp(now).strftime("%Y%m%d_%H:%M")
+    return logDate['date']
+
+
+atexit.register(closeLogFile)
+
+
+def log(message, level="INFO", origin=None, prefix="", args=None):
     """Logs a given message to the blender console and logging file if present
     and if log level is low enough. The origin can be defined as string.
     The message is logged by the operator depending on the loglevel
     settings.
 
+    Messages above the log level return right away. The message is only formatted
+    with args if it is logged, so that expensive formatting can be left to the logger.
+
     :param message: The message to log.
     :type message: str.
     :param level: Valid log level for the message as defined by 'loglevels'.
@@ -90,8 +172,18 @@ def log(message, level="INFO", origin=None, prefix=""):
     :type origin: str. or obj.
     :param prefix: Any string that should be printed before message (e.g. "\n")
     :type prefix: str.
+    :param args: If set, the message is formatted with message % args.
+    :type args: tuple.
     :return: None.
     """
+    if not logSettings['loaded']:
+        updateLogSettings()
+    # Display only messages up to preferred log level
+    if levelIndices[level] > logSettings['level']:
+        return
+
+    if args is not None:
+        message = message % args
     # Generate name of origin
     if origin is None:
         originname='phoboslog'
@@ -99,47 +191,41 @@ def log(message, level="INFO", origin=None, prefix=""):
         originname = origin.bl_idname
     else:
         originname = origin
-
-    # Display only messages up to preferred log level
-    prefs = bpy.context.user_preferences.addons["phobos"].preferences
-    if loglevels.index(level) <= loglevels.index(prefs.loglevel):
-        date = datetime.now().strftime("%Y%m%d_%H:%M")
-        msg = "[" + date + "] " + level + " " + message + " (" + originname + ")"
-        terminalmsg = prefix + "[" + date + "] " + decorate(level) + " " + message +\
-                      col.DIM + " (" + originname + ")" + col.ENDC
-
-        # log to file if activated
-        if prefs.logtofile:
-            try:
-                with open(prefs.logfile, "a") as lf:
-                    lf.write(date + "  " + msg + "\n")
-            except IOError:
-                # TODO Infinite loop can occur when harddrive has an error!
-                # Thus, logging the IOError should be handled differently...
-                log("Cannot write to log file! Resetting it.", "ERROR", __name__+".log")
-
-        # log to terminal or Blender
-        if prefs.logtoterminal:
-            print(terminalmsg)
+    now = time.time()
+    date = getLogDate(now)
+    msg = "[" + date + "] " + level + " " + message + " (" + originname + ")"
+
+    # log to file if activated
+    if logSettings['tofile']:
+        if logSettings['json']:
+            line = json.dumps({'time': now, 'level': level, 'origin': originname, 'message': message}) + "\n"
         else:
-            # log in GUI depending on loglevel
-            import sys
-            # start from this function
-            frame = sys._getframe(1)
-            f_name = frame.f_code.co_name
-            # go back until operator (using execute)
-            while f_name != 'execute' and frame is not None:
-                frame = frame.f_back
-                f_name = frame.f_code.co_name
-
-            # use operator to show message in Blender
-            if 'self' in frame.f_locals:
-                origin = frame.f_locals['self']
-
-            # show message in Blender status bar.
-            if origin is not None and type(origin) is not str:
-                # format report message to remove loging level and originname
-                msg = msg.split(level)[1][1:]
-                msg = msg.split(originname)[0][:-2]
-                origin.report({level}, msg)
-
+            line = date + "  " + msg + "\n"
+        try:
+            writeLogFile(line)
+            if level == 'ERROR':
+                logFile['stream'].flush()
+        except IOError:
+            logSettings['tofile'] = False
+            log("Cannot write to log file " + logSettings['path'] + "! Logging to file is disabled.", "ERROR",
+                __name__+".log")
+
+    # log to terminal or Blender
+    if logSettings['toterminal']:
+        print(prefix + "[" + date + "] " + decorate(level) + " " + message +
+              col.DIM + " (" + originname + ")" + col.ENDC)
+    else:
+        # log in GUI depending on loglevel
+        # start from this function
+        frame = sys._getframe(1)
+        # go back until operator (using execute)
+        while frame is not None and frame.f_code.co_name != 'execute':
+            frame = frame.f_back
+
+        # use operator to show message in Blender
+        if frame is not None and 'self' in frame.f_locals:
+            origin = frame.f_locals['self']
+
+        # show message in Blender status bar.
+        if origin is not None and type(origin) is not str:
+            origin.report({level}, message)
@@ -28,7 +28,7 @@ along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
 
 
 def addDictionaryToObj(dict, obj, category=None):
-    for key, value in dict:
+    for key, value in dict.items():
         obj[(category+'/'+key) if category else key] = value
 
 
@@ -39,3 +39,25 @@ def getCombinedTransform(obj, effectiveparent):
         matrix = parent.matrix_local * matrix
         parent = parent.parent
     return matrix
+
+
+def parentToBone(obj, parent, parentworld=None):
+    """Parents an object to the bone of an armature like bpy.ops.object.parent_set(type='BONE_RELATIVE'), but without
+    operators, so neither the selection nor the scene has to be updated.
+
+    :param obj: The object to parent.
+    :type obj: bpy_types.Object
+    :param parent: The link or joint armature to parent the object to.
+    :type parent: bpy_types.Object
+    :param parentworld: The world matrix of parent, which is read from parent if None. As matrix_world is only updated
+        with the scene, pass it when the parent has been moved since the last scene update.
+    :type parentworld: mathutils.Matrix
+
+    """
+    bone = parent.data.bones.active or parent.data.bones[0]
+    bone.use_relative_parent = True
+    obj.parent = parent
+    obj.parent_type = 'BONE'
+    obj.parent_bone = bone.name
+    # keep the world transform of obj, like the operator does
+    obj.matrix_parent_inverse = (parent.matrix_world if parentworld is None else parentworld).inverted()
@@ -1,6 +1,15 @@
 
+import os
+import re
 import os.path
+import json
+import filecmp
+import hashlib
 import subprocess
+from functools import lru_cache
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+import yaml
 import bpy
 from phobos import defs
 from phobos.phoboslog import log
@@ -27,13 +36,319 @@ def xmlline(ind, tag, names, values):
     :return: String -- Generated xml line.
 
     """
-    line = [indent * max(0, ind) + '<' + tag]
-    for i in range(len(names)):
-        line.append(' ' + names[i] + '="' + str(values[i]) + '"')
+    return xmltemplate(ind, tag, tuple(names)).format(*map(str, values))
+
+
+@lru_cache(maxsize=None)
+def xmltemplate(ind, tag, names):
+    """Returns a format string for an xml line with the given indentation, tag and attribute names.
+    The templates are cached, so each combination is only built once.
+
+    :param ind: Indentation level
+    :type ind: int
+    :param tag: xml element tag
+    :type tag: str
+    :param names: Names of xml element's attributes
+    :type names: tuple
+    :return: str -- format string with one field per attribute value.
+
+    """
+    line = [indent * max(0, ind) + '<' + tag.replace('{', '{{').replace('}', '}}')]
+    for name in names:
+        line.append(' ' + name.replace('{', '{{').replace('}', '}}') + '="{}"')
     line.append('/>\n')
     return ''.join(line)
 
 
+# the serializers of libyaml are several times faster than the pure Python ones, but not part of every PyYAML
+try:
+    from yaml import CSafeDumper as SafeYAMLDumper, CSafeLoader as SafeYAMLLoader
+except ImportError:
+    from yaml import SafeDumper as SafeYAMLDumper, SafeLoader as SafeYAMLLoader
+
+
+class TupleDumper(SafeYAMLDumper):
+    """Safe YAML dumper which writes tuples with the python/tuple tag, like the default dumper of yaml.dump.
+    The representation of '$true' and '$false' is added by phobos/__init__.py, like for the default dumper.
+
+    """
+    def represent_tuple(self, data):
+        return self.represent_sequence('tag:yaml.org,2002:python/tuple', data)
+
+
+TupleDumper.add_representer(tuple, TupleDumper.represent_tuple)
+
+
+class YAMLLoader(SafeYAMLLoader):
+    """Safe YAML loader which reads the tuples TupleDumper writes, and booleans as '$true' and '$false' once
+    phobos/__init__.py extended it.
+
+    """
+    def construct_tuple(self, node):
+        return tuple(self.construct_sequence(node))
+
+
+YAMLLoader.add_constructor('tag:yaml.org,2002:python/tuple', YAMLLoader.construct_tuple)
+
+
+# characters for which strings are written in double quotes, which libyaml escapes and breaks differently
+doubleQuotedCharacters = re.compile('[^\x20-\x7e]')
+
+
+def hasDoubleQuotedStrings(data):
+    """Checks whether data contains strings which could be written in double quotes or empty keys.
+
+    """
+    if isinstance(data, str):
+        return doubleQuotedCharacters.search(data) is not None
+    if isinstance(data, dict):
+        return any(key == '' or hasDoubleQuotedStrings(key) or hasDoubleQuotedStrings(value)
+                   for key, value in data.items())
+    if isinstance(data, (list, tuple)):
+        return any(hasDoubleQuotedStrings(value) for value in data)
+    return False
+
+
+def dumpYAML(data, **kwargs):
+    """Serializes data as YAML exactly like yaml.dump(data, **kwargs), but with libyaml if it is available.
+
+    The safe dumper is used for the types a model dictionary is made of. Data containing other Python objects or
+    strings which the two emitters would break differently is written by yaml.dump itself, so the output is the
+    same as that of yaml.dump in any case.
+
+    :param data: The data to serialize.
+    :return: str -- the YAML document.
+
+    """
+    if not hasDoubleQuotedStrings(data):
+        try:
+            return yaml.dump(data, Dumper=TupleDumper, **kwargs)
+        except yaml.representer.RepresenterError:
+            pass
+    return yaml.dump(data, **kwargs)
+
+
+def loadYAML(stream):
+    """Parses a YAML document with the safe loader, using libyaml if it is available.
+
+    :param stream: The document as string or open file.
+    :return: The parsed data.
+
+    """
+    return yaml.load(stream, Loader=YAMLLoader)
+
+
+class LazyYAMLFile(Mapping):
+    """A YAML file which is only parsed when its content is accessed for the first time.
+
+    """
+    def __init__(self, path):
+        self.path = path
+        self.content = None
+
+    def load(self):
+        """Returns the parsed content of the file, parsing it on the first call.
+
+        :return: dict -- the content of the file, empty if the file holds no mapping.
+
+        """
+        if self.content is None:
+            with open(self.path, 'r') as yamlfile:
+                content = loadYAML(yamlfile)
+            self.content = content if isinstance(content, dict) else {}
+        return self.content
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self):
+        return len(self.load())
+
+
+class StreamWriter(object):
+    """Writes the strings appended to it directly to a file.
+
+    Exporters which collect their output with *append* can use it in place of a list, so
+    that their output is streamed to the file instead of being joined in memory first.
+    The file is written to a temporary path and only moved to its final path when the
+    writer is closed without error, so a failed export does not leave a partial file.
+    An existing file with the same content is kept as it is (see commitFile).
+
+    """
+    def __init__(self, path, buffersize=1 << 20):
+        self.path = path
+        self.temppath = path + '.part'
+        self.stream = open(self.temppath, 'w', buffering=buffersize)
+        self.append = self.stream.write
+        self.write = self.stream.write
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream.close()
+        if exc_type is None:
+            commitFile(self.temppath, self.path)
+        else:
+            os.remove(self.temppath)
+        return False
+
+
+def writeTextFiles(files, jobs=0):
+    """Writes text files concurrently, each with its own StreamWriter.
+
+    The contents are created by the workers as well, so serializing the data of one file overlaps with writing the
+    others. Every file is created by exactly one function, so the files do not depend on the number of workers.
+
+    :param files: Tuples of the path of each file and a function returning its content.
+    :type files: list
+    :param jobs: The number of threads, 0 for one per CPU.
+    :type jobs: int
+
+    """
+    def writeTextFile(path, content):
+        with StreamWriter(path) as outputfile:
+            outputfile.write(content())
+
+    jobs = min(jobs or os.cpu_count() or 1, len(files))
+    if jobs < 2:
+        for path, content in files:
+            writeTextFile(path, content)
+        return
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(writeTextFile, path, content) for path, content in files]
+        # raise the first error in the order of the files
+        for future in futures:
+            future.result()
+
+
+class ExportManifest(object):
+    """Remembers the files of previous exports to an export directory, to skip the parts of an export whose
+    output would not change.
+
+    For every file, the manifest stores the hash of the inputs it was created from and the hash, size
+    and modification time of its content. A file can be skipped if its inputs did not change and it was
+    not modified since. The manifest is stored as .phobos_manifest.json in the export directory.
+
+    """
+    filename = '.phobos_manifest.json'
+
+    def __init__(self, path):
+        self.root = path
+        self.path = os.path.join(path, self.filename)
+        self.inputs = {}
+        self.files = {}
+        self.written = []
+        self.skipped = []
+        try:
+            with open(self.path, 'r') as manifestfile:
+                manifest = json.load(manifestfile)
+            self.inputs, self.files = manifest['inputs'], manifest['files']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def key(self, filepath):
+        return os.path.relpath(filepath, self.root)
+
+    def skip(self, filepath, digest):
+        """Returns True if the file at filepath was created from inputs with the same hash and not modified since,
+        otherwise stores the new hash for the file, which is expected to be written next.
+
+        """
+        key = self.key(filepath)
+        entry = self.files.get(key)
+        if self.inputs.get(key) == digest and entry:
+            try:
+                stat = os.stat(filepath)
+                if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime']:
+                    self.skipped.append(key)
+                    return True
+            except OSError:
+                pass
+        self.inputs[key] = digest
+        return False
+
+    def record(self, filepath, written=True):
+        """Records the current content of the file at filepath and whether it was written or kept by this export.
+
+        """
+        key = self.key(filepath)
+        stat = os.stat(filepath)
+        self.files[key] = {'sha1': hashFile(filepath), 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+        (self.written if written else self.skipped).append(key)
+
+    def save(self):
+        temppath = self.path + '.part'
+        with open(temppath, 'w') as manifestfile:
+            json.dump({'inputs': self.inputs, 'files': self.files}, manifestfile, indent=1, sort_keys=True)
+        os.replace(temppath, self.path)
+
+
+# the manifest of the export in progress, set by operators.io.exportModel
+currentManifest = None
+
+
+def hashFile(path):
+    """Returns the SHA-1 hash of a file's content.
+
+    """
+    sha = hashlib.sha1()
+    with open(path, 'rb') as hashedfile:
+        for block in iter(lambda: hashedfile.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def hashObject(data):
+    """Returns a hash of the content of a dictionary or list as used to describe the inputs of an exported file.
+
+    """
+    try:
+        text = json.dumps(data, sort_keys=True, default=repr)
+    except TypeError:
+        # keys of different types can not be sorted
+        text = repr(data)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def skipUnchanged(filepath, digest):
+    """Checks whether the export of a file can be skipped, as its inputs have the hash digest as in the previous
+    export to the same directory. Always returns False if there is no export manifest.
+
+    :param filepath: The path of the file to export.
+    :type filepath: str
+    :param digest: The hash of the inputs the file is created from.
+    :type digest: str
+    :return: bool -- True if the file is up to date.
+
+    """
+    return currentManifest is not None and currentManifest.skip(filepath, digest)
+
+
+def commitFile(temppath, path):
+    """Moves a newly written file to its path, unless the file at path already has exactly the same content.
+    In that case the existing file is left untouched, so its modification time does not change.
+
+    :param temppath: The path of the newly written file.
+    :type temppath: str
+    :param path: The final path of the file.
+    :type path: str
+    :return: bool -- True if the file was replaced.
+
+    """
+    written = not (os.path.isfile(path) and filecmp.cmp(temppath, path, shallow=False))
+    if written:
+        os.replace(temppath, path)
+    else:
+        os.remove(temppath)
+    if currentManifest is not None:
+        currentManifest.record(path, written)
+    return written
+
+
 def l2str(items, start=0, end=-1):
     """Generates string from (part of) a list.
 
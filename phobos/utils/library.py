@@ -0,0 +1,221 @@
+#!/usr/bin/python
+# coding=utf-8
+
+"""
+.. module:: phobos.utils.library
+    :platform: Unix, Windows, Mac
+    :synopsis: This module contains a persistent index of the models, poses, previews and baked meshes in the models folder
+
+.. moduleauthor:: Kai von Szadkowski, Simon Reichel
+
+Copyright 2017, University of Bremen & DFKI GmbH Robotics Innovation Center
+
+This file is part of Phobos, a Blender Add-On to edit robot models.
+
+Phobos is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation, either version 3
+of the License, or (at your option) any later version.
+
+Phobos is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import sqlite3
+import yaml
+from phobos.phoboslog import log
+
+# file types which are indexed and the kind of entry they are
+libraryFileTypes = {'.smurf': 'model', '.yml': 'yaml', '.png': 'preview', '.stl': 'bake', '.obj': 'bake'}
+
+librarySchema = """
+CREATE TABLE IF NOT EXISTS directories (path TEXT PRIMARY KEY, parent TEXT, mtime INTEGER);
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, directory TEXT, stem TEXT, kind TEXT, mtime INTEGER);
+CREATE TABLE IF NOT EXISTS models (smurf TEXT PRIMARY KEY, name TEXT, mtime INTEGER);
+CREATE TABLE IF NOT EXISTS poses (smurf TEXT, number INTEGER, name TEXT, posesfile TEXT, mtime INTEGER);
+CREATE INDEX IF NOT EXISTS directories_parent ON directories (parent);
+CREATE INDEX IF NOT EXISTS files_directory ON files (directory);
+CREATE INDEX IF NOT EXISTS files_stem ON files (stem);
+CREATE INDEX IF NOT EXISTS poses_smurf ON poses (smurf);
+"""
+
+# version of the indexed models and poses, older indices are parsed again
+libraryVersion = 1
+
+
+class LibraryIndex(object):
+    """An SQLite index of the model library in the models folder.
+
+    The index stores every directory with its modification time and the indexed files in it. A rescan only
+    lists the directories whose modification time changed and only parses the .smurf and poses files whose
+    own modification time changed, so the library can be reloaded without reading any YAML if nothing changed.
+
+    """
+    def __init__(self, dbpath):
+        self.connection = sqlite3.connect(dbpath)
+        self.connection.executescript(librarySchema)
+        if self.connection.execute('PRAGMA user_version').fetchone()[0] < libraryVersion:
+            # indices before version 1 did not record poses files without poses
+            with self.connection:
+                self.connection.execute('DELETE FROM models')
+                self.connection.execute('DELETE FROM poses')
+                self.connection.execute('PRAGMA user_version = ' + str(libraryVersion))
+
+    def close(self):
+        self.connection.close()
+
+    def update(self, root):
+        """Rescans the library below root and parses the models and poses which changed since the last scan.
+
+        :param root: The models folder.
+        :type root: str
+        :return: tuple -- the numbers of listed directories and of parsed models.
+
+        """
+        root = os.path.abspath(root)
+        with self.connection:
+            listed = self.scanDirectory(root, None)
+            parsed = self.updateModels(root)
+        log("Library index of " + root + ": listed " + str(listed) + " changed directories, parsed "
+            + str(parsed) + " models.", "DEBUG", "LibraryIndex.update")
+        return listed, parsed
+
+    def scanDirectory(self, path, parent):
+        cursor = self.connection.cursor()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self.removeDirectory(path)
+            return 0
+        row = cursor.execute('SELECT mtime FROM directories WHERE path = ?', (path,)).fetchone()
+        listed = 0
+        if row is not None and row[0] == mtime:
+            # the entries of the directory did not change, only its subdirectories might have
+            subdirectories = [r[0] for r in cursor.execute('SELECT path FROM directories WHERE parent = ?', (path,))]
+        else:
+            listed = 1
+            subdirectories, files = [], []
+            try:
+                entries = list(os.scandir(path))
+            except OSError:
+                entries = []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                else:
+                    stem, extension = os.path.splitext(entry.name)
+                    kind = libraryFileTypes.get(extension.lower())
+                    if kind:
+                        files.append((entry.path, path, stem, kind, entry.stat().st_mtime_ns))
+            for removed in cursor.execute('SELECT path FROM directories WHERE parent = ?', (path,)).fetchall():
+                if removed[0] not in subdirectories:
+                    self.removeDirectory(removed[0])
+            cursor.execute('DELETE FROM files WHERE directory = ?', (path,))
+            cursor.executemany('INSERT INTO files VALUES (?, ?, ?, ?, ?)', files)
+            cursor.execute('INSERT OR REPLACE INTO directories VALUES (?, ?, ?)', (path, parent, mtime))
+        for subdirectory in subdirectories:
+            listed += self.scanDirectory(subdirectory, path)
+        return listed
+
+    def removeDirectory(self, path):
+        cursor = self.connection.cursor()
+        for subdirectory in cursor.execute('SELECT path FROM directories WHERE parent = ?', (path,)).fetchall():
+            self.removeDirectory(subdirectory[0])
+        cursor.execute('DELETE FROM files WHERE directory = ?', (path,))
+        cursor.execute('DELETE FROM directories WHERE path = ?', (path,))
+
+    def updateModels(self, root):
+        cursor = self.connection.cursor()
+        prefix = os.path.join(root, '')
+        smurfs = dict(cursor.execute("SELECT path, mtime FROM files WHERE kind = 'model' AND substr(path, 1, ?) = ?",
+                                     (len(prefix), prefix)).fetchall())
+        models = dict(cursor.execute('SELECT smurf, mtime FROM models WHERE substr(smurf, 1, ?) = ?',
+                                     (len(prefix), prefix)).fetchall())
+        for smurf in models:
+            if smurf not in smurfs:
+                cursor.execute('DELETE FROM models WHERE smurf = ?', (smurf,))
+                cursor.execute('DELETE FROM poses WHERE smurf = ?', (smurf,))
+        parsed = 0
+        for smurf in smurfs:
+            # files can be changed in place without changing the modification time of their directory
+            mtime = getMtime(smurf)
+            posesfiles = cursor.execute('SELECT DISTINCT posesfile, mtime FROM poses WHERE smurf = ?',
+                                        (smurf,)).fetchall()
+            if models.get(smurf) == mtime and all(getMtime(path) == posesmtime for path, posesmtime in posesfiles):
+                continue
+            parsed += 1
+            cursor.execute('DELETE FROM poses WHERE smurf = ?', (smurf,))
+            cursor.execute('DELETE FROM models WHERE smurf = ?', (smurf,))
+            try:
+                with open(smurf, 'r') as smurffile:
+                    smurfdict = yaml.load(smurffile)
+                modelname = smurfdict['modelname']
+                poses = []
+                for filename in smurfdict['files']:
+                    if filename.split('_')[-1] == "poses.yml":
+                        posesfile = os.path.join(os.path.dirname(smurf), filename)
+                        with open(posesfile, 'r') as posesyaml:
+                            posesentries = yaml.load(posesyaml)['poses'] or []
+                        for pose in posesentries:
+                            poses.append((smurf, len(poses), pose['name'], posesfile, getMtime(posesfile)))
+                        if not posesentries:
+                            # a poses file without poses still lists its model, its row has no pose name
+                            poses.append((smurf, len(poses), None, posesfile, getMtime(posesfile)))
+            except (OSError, yaml.YAMLError, KeyError, TypeError) as error:
+                log("Could not read model " + smurf + ": " + str(error), "WARNING", "LibraryIndex.updateModels")
+                continue
+            cursor.execute('INSERT INTO models VALUES (?, ?, ?)', (smurf, modelname, mtime))
+            cursor.executemany('INSERT INTO poses VALUES (?, ?, ?, ?, ?)', poses)
+        return parsed
+
+    def getModels(self, root):
+        """Returns the models with poses below root and their poses with preview images and baked meshes.
+
+        :param root: The models folder.
+        :type root: str
+        :return: list -- of (model name, list of pose dictionaries with 'posename', 'robotpath', 'model_file'
+            and 'preview') tuples sorted by model name, the list being empty for poses files without poses.
+
+        """
+        prefix = os.path.join(os.path.abspath(root), '')
+        cursor = self.connection.cursor()
+        robots = {}
+        for smurf, modelname, posesfile, posename in cursor.execute(
+                'SELECT models.smurf, models.name, poses.posesfile, poses.name FROM models '
+                'LEFT JOIN poses ON models.smurf = poses.smurf '
+                'WHERE substr(models.smurf, 1, ?) = ? ORDER BY models.name, models.smurf, poses.number',
+                (len(prefix), prefix)).fetchall():
+            # like before the index, models are listed if they have a poses file, even if it holds no poses
+            if posesfile is None:
+                continue
+            robots.setdefault(modelname, [])
+            if posename is None:
+                continue
+            pose = {'posename': posename, 'robotpath': os.path.dirname(smurf), 'model_file': '', 'preview': ''}
+            searchpath = pose['robotpath']
+            if os.path.split(searchpath)[-1] == "smurf":
+                searchpath = os.path.dirname(searchpath)
+            # previews and baked meshes are searched in the model's directory and its subdirectories
+            for path, kind in cursor.execute(
+                    'SELECT files.path, files.kind FROM files JOIN directories ON files.directory = directories.path '
+                    'WHERE files.stem = ? AND (directories.path = ? OR directories.parent = ?) ORDER BY files.path',
+                    (modelname + '_' + posename, searchpath, searchpath)).fetchall():
+                if kind == 'bake':
+                    pose['model_file'] = path
+                elif kind == 'preview':
+                    pose['preview'] = path
+            robots[modelname].append(pose)
+        return sorted(robots.items())
+
+
+def getMtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
@@ -0,0 +1,273 @@
+#!/usr/bin/python
+# coding=utf-8
+
+"""
+.. module:: phobos.utils.profiling
+    :platform: Unix, Windows, Mac
+    :synopsis: This module contains nested timing spans for the export and import pipelines
+
+.. moduleauthor:: Kai von Szadkowski, Simon Reichel
+
+Copyright 2017, University of Bremen & DFKI GmbH Robotics Innovation Center
+
+This file is part of Phobos, a Blender Add-On to edit robot models.
+
+Phobos is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation, either version 3
+of the License, or (at your option) any later version.
+
+Phobos is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
+
+Profiling is switched on by the 'profiling' option of the add-on preferences or by setting the environment
+variable PHOBOS_PROFILE to anything but 0. Spans are opened as context managers or by decorating functions:
+
+    @profiled
+    def buildModelDictionary(root):
+        phase('links')
+        ...
+        count('links', len(linklist))
+        phase('materials')
+        ...
+
+    with span('export urdf'):
+        exportUrdf(model, path)
+
+A phase is a span which lasts until the next phase or the end of its enclosing span. When the outermost span of
+the main thread ends, the recorded spans are written as Chrome trace (open it in chrome://tracing or
+https://ui.perfetto.dev) to the folder set in the preferences, in PHOBOS_PROFILE_DIR or the temporary folder,
+and a summary table is logged. While profiling is off, every call returns after checking a single flag.
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+from functools import wraps
+from datetime import datetime
+import bpy
+from phobos.phoboslog import log
+
+profileSettings = {'enabled': os.environ.get('PHOBOS_PROFILE', '0') not in ('', '0'),
+                   'folder': os.environ.get('PHOBOS_PROFILE_DIR', '')}
+
+# the finished spans as (name, thread id, start, duration, depth, path, counters) tuples
+profileEvents = []
+profileStacks = threading.local()
+
+
+class NoSpan(object):
+    """The span returned while profiling is off, which does nothing.
+
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+noSpan = NoSpan()
+
+
+class Span(object):
+    """A timed section of code, which is nested in the span that was open when it was entered.
+
+    """
+    def __init__(self, name, counters=None, parent=None):
+        self.name = name
+        self.counters = counters or {}
+        self.parent = parent
+        self.phase = None
+        self.path = None
+        self.start = None
+
+    def __enter__(self):
+        stack = getStack()
+        self.path = (stack[-1].path if stack else ()) + (self.name,)
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        if self.phase is not None:
+            self.phase.__exit__()
+        end = time.perf_counter()
+        stack = getStack()
+        stack.remove(self)
+        if self.parent is not None:
+            self.parent.phase = None
+        profileEvents.append((self.name, threading.get_ident(), self.start, end - self.start, len(self.path) - 1,
+                              self.path, self.counters))
+        if not stack and threading.current_thread() is threading.main_thread():
+            writeProfile(self.name)
+        return False
+
+
+def getStack():
+    if not hasattr(profileStacks, 'stack'):
+        profileStacks.stack = []
+    return profileStacks.stack
+
+
+def updateProfileSettings(prefs=None, context=None):
+    """Reads the profiling preferences into profileSettings. The environment variable PHOBOS_PROFILE switches
+    profiling on regardless of the preferences.
+    This is the update function of the profiling properties of the add-on preferences.
+
+    :param prefs: The preferences of the add-on.
+    :type prefs: bpy.types.AddonPreferences
+    """
+    environment = os.environ.get('PHOBOS_PROFILE', '0') not in ('', '0')
+    profileSettings['enabled'] = environment or prefs.profiling
+    profileSettings['folder'] = os.environ.get('PHOBOS_PROFILE_DIR') or bpy.path.abspath(prefs.profilefolder)
+
+
+def span(name, **counters):
+    """Returns a span to time the code in its with block.
+
+    :param name: The name of the span.
+    :type name: str
+    :param counters: Initial counters of the span, which are shown in the trace.
+    :return: Span -- or an empty span if profiling is off.
+    """
+    if not profileSettings['enabled']:
+        return noSpan
+    return Span(name, counters)
+
+
+def profiled(function):
+    """Decorates a function to time each of its calls in a span named after it.
+
+    """
+    @wraps(function)
+    def profiledFunction(*args, **kwargs):
+        if not profileSettings['enabled']:
+            return function(*args, **kwargs)
+        with Span(function.__name__):
+            return function(*args, **kwargs)
+    return profiledFunction
+
+
+def phase(name):
+    """Ends the current phase of the innermost span and starts the phase name in it.
+
+    :param name: The name of the phase, None only ends the current phase.
+    :type name: str
+    """
+    if not profileSettings['enabled']:
+        return
+    stack = getStack()
+    if not stack:
+        return
+    parent = stack[-1]
+    if parent.parent is not None:
+        # the innermost span is the previous phase itself
+        parent = parent.parent
+    if parent.phase is not None:
+        parent.phase.__exit__()
+    if name is not None:
+        parent.phase = Span(name, parent=parent).__enter__()
+
+
+def count(name, value=1):
+    """Adds value to the counter name of the innermost span.
+
+    :param name: The name of the counter.
+    :type name: str
+    :param value: The value to add.
+    :type value: int
+    """
+    if not profileSettings['enabled']:
+        return
+    stack = getStack()
+    if stack:
+        counters = stack[-1].counters
+        counters[name] = counters.get(name, 0) + value
+
+
+def getTrace(events):
+    """Returns the spans as Chrome trace event dictionary.
+
+    :param events: The recorded spans.
+    :type events: list
+    :return: dict
+    """
+    origin = min(event[2] for event in events) if events else 0
+    threads = sorted({event[1] for event in events}, key=lambda t: t != threading.main_thread().ident)
+    return {'displayTimeUnit': 'ms',
+            'traceEvents': [{'name': name, 'cat': 'phobos', 'ph': 'X', 'pid': os.getpid(),
+                             'tid': threads.index(thread), 'ts': (start - origin) * 1e6, 'dur': duration * 1e6,
+                             'args': counters}
+                            for name, thread, start, duration, depth, path, counters in events]}
+
+
+def getSummary(events):
+    """Sums up the calls, total time, time spent outside of nested spans and counters of each span path.
+
+    :param events: The recorded spans.
+    :type events: list
+    :return: list -- of (path, summary dictionary) tuples as tree in the order of the paths' first occurence.
+    """
+    summary = {}
+    first = {}
+    for name, thread, start, duration, depth, path, counters in sorted(events, key=lambda e: e[2]):
+        entry = summary.setdefault(path, {'calls': 0, 'total': 0.0, 'self': 0.0, 'counters': {}})
+        first.setdefault(path, start)
+        entry['calls'] += 1
+        entry['total'] += duration
+        entry['self'] += duration
+        for key, value in counters.items():
+            entry['counters'][key] = entry['counters'].get(key, 0) + value
+    for path, entry in summary.items():
+        if path[:-1] in summary:
+            summary[path[:-1]]['self'] -= entry['total']
+    return sorted(summary.items(),
+                  key=lambda item: tuple(first.get(item[0][:i + 1], 0) for i in range(len(item[0]))))
+
+
+def formatSummary(summary):
+    """Formats the summary of the spans as table.
+
+    :param summary: The summary as returned by getSummary.
+    :type summary: list
+    :return: str
+    """
+    lines = ['{0:<48} {1:>7} {2:>10} {3:>10}  {4}'.format('span', 'calls', 'total [s]', 'self [s]', 'counters')]
+    for path, entry in summary:
+        name = '  ' * (len(path) - 1) + path[-1]
+        lines.append('{0:<48} {1:>7} {2:>10.4f} {3:>10.4f}  {4}'.format(
+            name[:48], entry['calls'], entry['total'], max(entry['self'], 0.0),
+            ', '.join(key + '=' + str(entry['counters'][key]) for key in sorted(entry['counters']))))
+    return '\n'.join(lines)
+
+
+def writeProfile(name):
+    """Writes the recorded spans as Chrome trace and logs their summary, then clears them.
+
+    :param name: The name of the outermost span, which is used in the trace's file name.
+    :type name: str
+    :return: str -- the path of the trace file.
+    """
+    events = profileEvents[:]
+    del profileEvents[:]
+    folder = profileSettings['folder'] or tempfile.gettempdir()
+    tracepath = os.path.join(folder, 'phobos_' + name.replace(' ', '_') + '_'
+                             + datetime.now().strftime('%Y%m%d_%H%M%S') + '.json')
+    try:
+        os.makedirs(folder, exist_ok=True)
+        with open(tracepath, 'w') as tracefile:
+            json.dump(getTrace(events), tracefile)
+    except OSError as error:
+        log("Could not write trace " + tracepath + ": " + str(error), "ERROR", "writeProfile")
+        tracepath = None
+    log("Profile of " + name + (" written to " + tracepath if tracepath else "") + ":\n"
+        + formatSummary(getSummary(events)), "INFO", "writeProfile")
+    return tracepath
@@ -26,10 +26,14 @@ Created on 26 March 2015
 @author: Ole Schwiegert
 """
 
-from copy import deepcopy as dc
+checkMessages = {"NoObject": []}
 
+# compiled validators by the representation of the validation they were compiled from, see get_compiled_validator
+compiledValidators = {}
+
+# maximum number of compiled validators kept in compiledValidators
+maxCompiledValidators = 8
 
-checkMessages = {"NoObject": []}
 
 def generateCheckMessages(param1, param2):  # FIXME: Parameter?
     """This function is just for generating a blender friendly list for an operator.
@@ -42,6 +46,8 @@ def check_dict(dic, validator, messages):
     """ This function validates a given dictionary against a validation.
     It writes all messages to the given messages list
 
+    The validation is compiled once (see compile_validator) and reused as long as it does not change.
+
     :param dic: The dictionary you want to validate.
     :type dic: dict.
     :param validator: The validation you want to validate against.
@@ -50,11 +56,11 @@ def check_dict(dic, validator, messages):
     :type messages: dict.
 
     """
-    check_dict_alg(dic, validator, [], messages, validator, "NoObject")
+    run_validator(get_compiled_validator(validator), dic, (), messages, "NoObject")
 
 
 def check_dict_alg(dic, validator, entry_list, messages, whole_validator, current_elem):
-    """This function does the real validation work by working through the validation.
+    """This function validates the value found with entry_list in the dictionary against a part of the validation.
 
     :param dic: The dictionary you want to validate.
     :type dic: dict.
@@ -70,19 +76,115 @@ def check_dict_alg(dic, validator, entry_list, messages, whole_validator, curren
     :type current_elem: str.
 
     """
+    check = compile_validator(validator, len(entry_list), whole_validator, {})
+    value = dic if len(entry_list) == 0 else traverse_dict(dic, entry_list)
+    run_validator(check, value, tuple(entry_list), messages, current_elem)
+
+
+def get_compiled_validator(validator):
+    """Returns the compiled validator of a validation, compiling it if it changed since it was last used.
+
+    :param validator: The validation to compile.
+    :type validator: dict.
+    :return: function -- see compile_validator.
+
+    """
+    # the validations are linked and extended at runtime (see defs), so they are identified by their content
+    key = repr(validator)
+    if key not in compiledValidators:
+        if len(compiledValidators) >= maxCompiledValidators:
+            compiledValidators.clear()
+        compiledValidators[key] = compile_validator(validator, 0, validator, {})
+    return compiledValidators[key]
+
+
+def run_validator(check, value, path, messages, current_elem):
+    """Runs a compiled validator and adds the messages it reports to the messages dictionary.
+
+    :param check: The compiled validator.
+    :type check: function.
+    :param value: The value to validate, i.e. the whole dictionary for a validator of depth 0.
+    :param path: The keys leading to value.
+    :type path: tuple.
+    :param messages: The dictionary to add the messages to.
+    :type messages: dict.
+    :param current_elem: The element the messages are added for.
+    :type current_elem: str.
+
+    """
+    reports = []
+    try:
+        check(value, path, current_elem, reports)
+    finally:
+        for key, message in reports:
+            add_message(messages, key, message)
+
+
+def compile_validator(validator, depth, whole_validator, references):
+    """This function compiles a validation into a function which checks a value against it.
+
+    The compiled function is called as check(value, path, current_elem, reports) with the value found at path in
+    the validated dictionary, and appends (element, message) tuples to reports. It walks the dictionary and the
+    validation in step, so that no value is looked up from the root of the dictionary again. The messages are
+    the same the validation reports when it is interpreted node by node.
+
+    :param validator: The validation you want to compile.
+    :type validator: dict.
+    :param depth: The number of keys leading to the validated value, 0 for the whole dictionary.
+    :type depth: int.
+    :param whole_validator: The whole validation to reach top level keys in case of a reference operator.
+    :type whole_validator: dict.
+    :param references: The compiled references of whole_validator, shared by all parts of it.
+    :type references: dict.
+    :return: function.
+
+    """
+    checks = []
     for node in validator:
-        new_list = dc(entry_list)
         node_value = validator[node]
-        if node != 'isReference':
-            if not ('isReference' in node_value and len(entry_list) == 0):
-                if is_operator(node):
-                    handle_operator(node, dic, validator, new_list, messages, whole_validator, current_elem)
-                elif is_leaf(node_value):
-                    new_list.append(node)
-                    check_leaf(node_value, dic, new_list, messages, current_elem)
-                else:
-                    new_list.append(node)
-                    check_dict_alg(dic, node_value, new_list, messages, whole_validator, current_elem)
+        if node == 'isReference' or (depth == 0 and 'isReference' in node_value):
+            continue
+        if is_operator(node):
+            operatorcheck = compile_operator(node, validator, depth, whole_validator, references)
+            if operatorcheck is not None:
+                checks.append(operatorcheck)
+        elif is_leaf(node_value):
+            checks.append(compile_leaf(node, node_value))
+        else:
+            checks.append(compile_child(node, compile_validator(node_value, depth + 1, whole_validator, references)))
+
+    def check(value, path, current_elem, reports):
+        for nodecheck in checks:
+            nodecheck(value, path, current_elem, reports)
+    return check
+
+
+def compile_child(node, childcheck):
+    """Compiles the check of the value found with node in the validated value.
+
+    """
+    def check(value, path, current_elem, reports):
+        childcheck(value[node] if isinstance(value, dict) and node in value else None, path + (node,),
+                   current_elem, reports)
+    return check
+
+
+def compile_leaf(node, leaf_value):
+    """Compiles the check of a validation leaf, i.e. whether the value found with node exists and has the type of
+    the leaf's default value.
+
+    """
+    required_type = type(leaf_value['default'])
+    required = leaf_value['required']
+
+    def check(value, path, current_elem, reports):
+        value = value[node] if isinstance(value, dict) and node in value else None
+        if required and value is None:
+            reports.append((current_elem, "The required value in " + str(list(path + (node,))) + " cannot be found!"))
+        if value is not None and not isinstance(value, required_type):
+            reports.append((current_elem, "The required value in " + str(list(path + (node,)))
+                            + " doesn't match expected type " + str(required_type)))
+    return check
 
 
 def is_leaf(node_value):
@@ -107,72 +209,59 @@ def is_operator(node):
     return node.startswith('$')
 
 
-def check_leaf(leaf_value, dic, entry_list, messages, current_elem):
-    """This function checks the dictionary against a specific validation leaf and entry_list. Writing the
-    messages into the given list.
+def compile_operator(node, validator, depth, whole_validator, references):
+    """This function compiles an operator, which decides how to continue the validation process.
 
-    :param leaf_value: The leaf value used for validation.
-    :type leaf_value: dict.
-    :param dic: The dictionary you want to validate.
-    :type dic: dict.
-    :param entry_list: The keys navigating you to the dictionary value to validate against the validation leaf.
-    :type entry_list: list.
-    :param messages: The list you want to append the messages to.
-    :type messages: dict.
-
-    """
-    value = traverse_dict(dic, entry_list)
-    default_value = leaf_value['default']
-    required_type = type(default_value)
-    required = leaf_value['required']
-    # messages.append("Checking leaf " + str(entry_list))
-    if required and value is None:
-        add_message(messages, current_elem, "The required value in " + str(entry_list) + " cannot be found!")
-    if value is not None and not isinstance(value, required_type):
-        add_message(messages, current_elem, "The required value in " + str(entry_list) + " doesn't match expected type " + str(required_type))
-
-
-def handle_operator(node, dic, validator, entry_list, messages, whole_validator, current_elem):
-    """This function handles an operator and decides how to continue the validation process.
-
-    :param node: The operator to handle.
+    :param node: The operator to compile.
     :type node: str.
-    :param dic: The dict you want to validate.
-    :type dic: dict.
-    :param validator: The validation you want to validate the dic with.
+    :param validator: The validation containing the operator.
     :type validator: dict.
-    :param entry_list: The list of keys to navigate to the value in the dictionary.
-    :type entry_list: list.
-    :param messages: The list to append the messages to.
-    :type messages: dict.
+    :param depth: The number of keys leading to the validated value.
+    :type depth: int.
     :param whole_validator: The whole validation to reach top level keys in case of a reference operator.
     :type whole_validator: dict.
+    :param references: The compiled references of whole_validator.
+    :type references: dict.
+    :return: function -- None if the operator does not check anything.
 
     """
     if node == '$reference':
-        new_list = dc(entry_list)
-        new_list.append(validator[node])
-        check_dict_alg(dic, whole_validator[validator[node]], new_list, messages, whole_validator, current_elem)
+        name = validator[node]
+
+        def check(value, path, current_elem, reports):
+            # references are compiled when they are first used, so that they may refer to themselves
+            if name not in references:
+                references[name] = compile_validator(whole_validator[name], 1, whole_validator, references)
+            references[name](value[name] if isinstance(value, dict) and name in value else None, path + (name,),
+                             current_elem, reports)
+        return check
     elif node == '$forElem':
-        traversed_dic = traverse_dict(dic, entry_list)
-        if traversed_dic is not None:
-            for elem in traversed_dic:
-                new_list = dc(entry_list)
-                new_list.append(elem)
-                check_dict_alg(dic, validator['$forElem'], new_list, messages, whole_validator, elem)
-        else:
-            add_message(messages, current_elem, "Error in traversing dict!")
+        elemcheck = compile_validator(validator[node], depth + 1, whole_validator, references)
+
+        def check(value, path, current_elem, reports):
+            if value is None or depth == 0:
+                reports.append((current_elem, "Error in traversing dict!"))
+                return
+            isdict = isinstance(value, dict)
+            for elem in value:
+                elemcheck(value[elem] if isdict else None, path + (elem,), elem, reports)
+        return check
     elif node.startswith('$selection__'):
         select_type = node.split('__')[1]
-        select_dic = traverse_dict(dic, entry_list)
-        if select_type in select_dic:
-            select = select_dic[select_type]
-            rest_validator = validator[node][select]
-            check_dict_alg(dic, rest_validator, entry_list, messages, whole_validator, current_elem)
-        else:
-            add_message(messages, current_elem, "Could not find " + select_type + " in " + str(entry_list))
-    elif node.startswith('$exists__'):
-        pass
+        options = {}
+
+        def check(value, path, current_elem, reports):
+            # the top level value can not be selected from, as there is no key leading to it
+            if select_type in (None if depth == 0 else value):
+                select = value[select_type]
+                if select not in options:
+                    options[select] = compile_validator(validator[node][select], depth, whole_validator, references)
+                options[select](value, path, current_elem, reports)
+            else:
+                reports.append((current_elem, "Could not find " + select_type + " in " + str(list(path))))
+        return check
+    # $exists__ and unknown operators do not check anything
+    return None
 
 
 def traverse_dict(dic, entry_list):
@@ -0,0 +1,51 @@
+#!/usr/bin/python
+# coding=utf-8
+
+"""
+Copyright 2017, University of Bremen & DFKI GmbH Robotics Innovation Center
+
+This file is part of Phobos, a Blender Add-On to edit robot models.
+
+Phobos is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation, either version 3
+of the License, or (at your option) any later version.
+
+Phobos is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
+
+File test_meshes.py
+
+Checks the mesh import and export of phobos.io.meshes.meshes. Phobos can only be imported in Blender, so run with
+the Python of a Blender with Phobos installed as add-on:
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+import pytest
+
+bpy = pytest.importorskip('bpy')
+import phobos
+import phobos.io.meshes.meshes as meshes
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import synthetic
+
+
+def test_importMesh_stl(tmpdir):
+    vertices, faces = synthetic.createIcosphere(1)
+    filepath = str(tmpdir.join('icosphere.stl'))
+    synthetic.writeStl(vertices, faces, filepath)
+    obj = meshes.importMesh(filepath, 'stl')
+    assert obj is not None
+    try:
+        assert len(obj.data.polygons) == len(faces)
+    finally:
+        bpy.data.objects.remove(obj, do_unlink=True)
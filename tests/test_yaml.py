@@ -0,0 +1,72 @@
+#!/usr/bin/python
+# coding=utf-8
+
+"""
+Copyright 2017, University of Bremen & DFKI GmbH Robotics Innovation Center
+
+This file is part of Phobos, a Blender Add-On to edit robot models.
+
+Phobos is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License
+as published by the Free Software Foundation, either version 3
+of the License, or (at your option) any later version.
+
+Phobos is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with Phobos.  If not, see <http://www.gnu.org/licenses/>.
+
+File test_yaml.py
+
+Checks that the libyaml based dumpYAML and loadYAML of phobos.utils.io read and write the same YAML as
+yaml.dump and yaml.load with the conventions registered by phobos/__init__.py. Phobos can only be imported in
+Blender, so run with the Python of a Blender with Phobos installed as add-on:
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+import pytest
+
+pytest.importorskip('bpy')
+import yaml
+import phobos
+import phobos.utils.io as ioUtils
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import synthetic
+
+strings = ['plain', 'a long string with: colons, "quotes" and ümlauts ' * 5, 'é' * 50, '\t'.join(['ab'] * 40),
+           'line1\nline2\n', ' lead', '#x', '- a', 'yes', 'no', '~', 'null', '0x1F', '1.0', '2017-01-01', '']
+
+
+@pytest.mark.parametrize('data', [{'passive': '$true', 'active': '$false', 'values': ['$true', 'a']},
+                                  {'strings': strings},
+                                  {'tuple': (1, 2.5, None, '$false')},
+                                  {'numbers': [True, 1e-20, float('inf'), -0.0]},
+                                  {'': 1},
+                                  {'link': {'annotations': {'': 'empty', 'key': [{'': None}]}}}])
+@pytest.mark.parametrize('kwargs', [{}, {'default_flow_style': False}])
+def test_dumpYAML_matches_yaml_dump(data, kwargs):
+    assert ioUtils.dumpYAML(data, **kwargs) == yaml.dump(data, **kwargs)
+
+
+def test_dumpYAML_matches_yaml_dump_for_models():
+    model = synthetic.createRobotModel(50, branching=2, nvisuals=2, nsensors=5, nmotors=5)
+    model['links']['link1']['passive'] = '$true'
+    assert ioUtils.dumpYAML(model, default_flow_style=False) == yaml.dump(model, default_flow_style=False)
+
+
+def test_loadYAML_matches_yaml_load():
+    document = yaml.dump({'passive': '$true', 'values': ['$false', 'a', 1.5], 'tuple': (1, '$true')})
+    assert 'passive: true' in document
+    assert ioUtils.loadYAML(document) == yaml.load(document, Loader=yaml.Loader)
+
+
+def test_booleans_round_trip():
+    data = {'passive': '$true', 'active': '$false', 'values': ['$true', 'true', 'false'], 'tuple': (1.0, 2.0)}
+    assert ioUtils.loadYAML(ioUtils.dumpYAML(data)) == data